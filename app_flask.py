@@ -1,41 +1,162 @@
-from flask import Flask, render_template, request, send_file, jsonify
-import pandas as pd
+from flask import Blueprint, Flask, current_app, g, has_app_context, render_template, request, send_file, jsonify
 from pathlib import Path
 from datetime import datetime, date
+import asyncio
 import re
 import io
+import multiprocessing
 import zipfile
 import os
 import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
-
-app = Flask(__name__)
-
-# Database configuration
+from functools import partial
+
+from assets import init_assets
+from chunked_upload import create_session, discard_session, session_status, take_file, write_chunk
+from email_dispatch import (DEFAULT_CONNECTIONS, DEFAULT_MAX_ATTEMPTS, DEFAULT_RATE_PER_DOMAIN, Dispatcher,
+                            init_dispatch_schema, plan_notices, recent_dispatches)
+from escalation import apply_decisions, escalation_candidates, management_summary, resolve_decisions
+from input_formats import REQUIRED_COLUMNS, read_sheets, unsupported_message
+from responses import columnar, init_compression, materialize, stream_json, wants_compact
+from retention import (DEFAULT_ARCHIVE_AFTER_DAYS, archive_resolved, convert_to_incremental, incremental_vacuum,
+                       init_archive_schema, restore_archived)
+from search import init_search_schema, search_violations
+from severity import init_severity_schema, top_sellers, top_violations, update_severity
+from snapshot import Snapshot
+from upload_archive import (DEFAULT_BUDGET_BYTES, DEFAULT_RETENTION_DAYS, init_upload_archive_schema,
+                            link_upload, prune, remove_files, store_blob)
+from upload_metrics import (StageMetrics, init_upload_metrics_schema, measure, recent_upload_metrics,
+                            record_upload_metrics, stage_summary)
+from violation_diff import (apply_diff, compute_diff, diff_report, incoming_keys, init_diff_schema,
+                            load_snapshot, record_diff)
+from violation_store import ViolationStore, summarize_seller
+
+# pandas/openpyxl are only needed on the ingest path and are imported inside
+# the functions that use them, so read-only endpoints and tooling start fast.
+
+bp = Blueprint('dashboard', __name__)
+
+# Database configuration (default, overridden per app by create_app)
 DB_PATH = 'violations_tracker.db'
 
 # Configure upload folder
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output'
-Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
-Path(OUTPUT_FOLDER).mkdir(exist_ok=True)
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# RESOLVED violations not seen for this many days move to violations_archive
+ARCHIVE_AFTER_DAYS = DEFAULT_ARCHIVE_AFTER_DAYS
+
+# Archived workbooks (see upload_archive.py): kept this long, within this size
+UPLOAD_RETENTION_DAYS = DEFAULT_RETENTION_DAYS
+UPLOAD_BUDGET_BYTES = DEFAULT_BUDGET_BYTES
+
+# SMTP relay for sending the Day 1 / Day 2 notices (see email_dispatch.py)
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 25))
+SMTP_SENDER = os.environ.get('SMTP_SENDER', 'map-enforcement@localhost')
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', '') == '1'
+EMAIL_RATE_PER_DOMAIN = DEFAULT_RATE_PER_DOMAIN
+EMAIL_CONNECTIONS = DEFAULT_CONNECTIONS
+EMAIL_MAX_ATTEMPTS = DEFAULT_MAX_ATTEMPTS
+
+# Per-stage upload metrics (see upload_metrics.py). Tracing peak memory slows
+# parsing down a few times, so it is opt-in; RELEASE tags them for comparison
+UPLOAD_TRACE_MEMORY = os.environ.get('MAP_UPLOAD_TRACE_MEMORY', '') == '1'
+RELEASE = os.environ.get('MAP_RELEASE')
+
+
+def create_app(config=None):
+    """Application factory
+
+    Args:
+        config (dict): Overrides for DB_PATH, UPLOAD_FOLDER, OUTPUT_FOLDER,
+            ARCHIVE_AFTER_DAYS, UPLOAD_RETENTION_DAYS, UPLOAD_BUDGET_BYTES,
+            SMTP_HOST, SMTP_PORT, ...
+
+    The database schema is NOT touched here; run init_database() (or
+    `flask --app app_flask init-db`) explicitly before serving.
+    """
+    app = Flask(__name__)
+    app.config['DB_PATH'] = DB_PATH
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
+    app.config['ARCHIVE_AFTER_DAYS'] = ARCHIVE_AFTER_DAYS
+    app.config['UPLOAD_RETENTION_DAYS'] = UPLOAD_RETENTION_DAYS
+    app.config['UPLOAD_BUDGET_BYTES'] = UPLOAD_BUDGET_BYTES
+    app.config['SMTP_HOST'] = SMTP_HOST
+    app.config['SMTP_PORT'] = SMTP_PORT
+    app.config['SMTP_SENDER'] = SMTP_SENDER
+    app.config['SMTP_USERNAME'] = SMTP_USERNAME
+    app.config['SMTP_PASSWORD'] = SMTP_PASSWORD
+    app.config['SMTP_STARTTLS'] = SMTP_STARTTLS
+    app.config['EMAIL_RATE_PER_DOMAIN'] = EMAIL_RATE_PER_DOMAIN
+    app.config['EMAIL_CONNECTIONS'] = EMAIL_CONNECTIONS
+    app.config['EMAIL_MAX_ATTEMPTS'] = EMAIL_MAX_ATTEMPTS
+    app.config['UPLOAD_TRACE_MEMORY'] = UPLOAD_TRACE_MEMORY
+    app.config['RELEASE'] = RELEASE
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    if config:
+        app.config.update(config)
+
+    Path(app.config['UPLOAD_FOLDER']).mkdir(exist_ok=True)
+    Path(app.config['OUTPUT_FOLDER']).mkdir(exist_ok=True)
+
+    # In-memory cache of the active violation set (see violation_store.py)
+    app.extensions['violation_store'] = ViolationStore(app.config['DB_PATH'])
+
+    # gzip/brotli for large JSON responses (see responses.py)
+    init_compression(app)
+
+    # Bundled, content-hashed CSS/JS with immutable caching (see assets.py)
+    init_assets(app)
+
+    app.register_blueprint(bp)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create or migrate the tracker database schema"""
+        init_database(app.config['DB_PATH'])
+        with get_db(app.config['DB_PATH']) as conn:
+            if convert_to_incremental(conn):
+                print('Converted to auto_vacuum=INCREMENTAL (one-time full VACUUM)')
+        print(f"Database ready: {app.config['DB_PATH']}")
+
+    return app
 
 
 # ============================================================================
 # DATABASE FUNCTIONS - VIOLATION TRACKER
 # ============================================================================
 
+def get_db_path():
+    """Database path of the current app, or the module default outside a request"""
+    if has_app_context():
+        return current_app.config['DB_PATH']
+    return DB_PATH
+
+# Seconds a connection waits on a lock held by another worker before failing
+BUSY_TIMEOUT = 10
+
 @contextmanager
-def get_db():
-    """Database connection context manager"""
-    conn = sqlite3.connect(DB_PATH)
+def get_db(db_path=None):
+    """Database connection context manager
+
+    A transaction that changed any row also bumps the shared data version
+    (see bump_data_version) before committing, so other worker processes
+    notice the write.
+    """
+    conn = sqlite3.connect(db_path or get_db_path(), timeout=BUSY_TIMEOUT)
     conn.row_factory = sqlite3.Row
     try:
         yield conn
+        if conn.total_changes:
+            bump_data_version(conn)
         conn.commit()
     except Exception:
         conn.rollback()
@@ -43,11 +164,76 @@ def get_db():
     finally:
         conn.close()
 
-def init_database():
-    """Initialize database tables if they don't exist"""
-    with get_db() as conn:
+def get_snapshot(copy=False):
+    """Read-only, point-in-time view of the tracker for reports and exports
+
+    Use as `with get_snapshot() as conn:`; every statement sees the same
+    committed state and writers are never blocked (see snapshot.py).
+    """
+    return Snapshot(get_db_path(), copy=copy, timeout=BUSY_TIMEOUT, row_factory=sqlite3.Row)
+
+def bump_data_version(conn):
+    """Increment the data version stamp inside the caller's transaction
+
+    Every process compares this stamp with the one its ViolationStore was
+    loaded at; the new value is kept on flask.g so notify_violations_changed
+    can tell whether this process made the only change since.
+    """
+    conn.execute("UPDATE app_meta SET value = value + 1 WHERE key = 'data_version'")
+    version = conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()[0]
+    if has_app_context():
+        g.data_version = version
+    return version
+
+@contextmanager
+def file_lock(lock_path):
+    """Exclusive lock on lock_path shared by every process on this host (blocking)"""
+    with open(lock_path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def init_database(db_path=None):
+    """Initialize database tables if they don't exist
+
+    Safe to call from every worker on startup: the migration runs under a file
+    lock next to the database, so only one process creates the schema at a time.
+    """
+    db_path = db_path or get_db_path()
+    with file_lock(db_path + '.lock'), get_db(db_path) as conn:
         cursor = conn.cursor()
 
+        # Lets retention return archived pages to the filesystem (new
+        # databases; existing ones are converted by `map_cli.py archive` or
+        # `flask init-db`, see convert_to_incremental)
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+        # WAL lets readers in other workers proceed while one worker writes
+        # (persistent setting of the database file)
+        cursor.execute('PRAGMA journal_mode=WAL')
+
+        # Shared data version, bumped by every write transaction
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', 0)")
+
         # Violations tracking table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS violations (
@@ -81,6 +267,33 @@ def init_database():
             )
         ''')
 
+        # Hot ACTIVE queries filter on status and order by seller
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_violations_status_seller
+            ON violations (status, seller_name)
+        ''')
+
+        # Severity score column + index (see severity.py)
+        init_severity_schema(conn)
+
+        # Archive of old RESOLVED rows + violations_all view (see retention.py)
+        init_archive_schema(conn)
+
+        # Full-text index over tracker + archive, kept in sync by triggers (see search.py)
+        init_search_schema(conn)
+
+        # Content-addressed archive of uploaded workbooks (see upload_archive.py)
+        init_upload_archive_schema(conn)
+
+        # Per-upload diff of the violation set (see violation_diff.py)
+        init_diff_schema(conn)
+
+        # Idempotency log of the notices sent over SMTP (see email_dispatch.py)
+        init_dispatch_schema(conn)
+
+        # Wall time / peak memory per ingest stage (see upload_metrics.py)
+        init_upload_metrics_schema(conn)
+
 def check_upload_today():
     """Check if file was already uploaded today"""
     today = date.today().isoformat()
@@ -105,98 +318,101 @@ def log_upload(filename, violations_count):
             VALUES (?, ?, ?, ?)
         ''', (today, now, filename, violations_count))
 
-def update_violations_tracker(violations_df):
+def update_violations_tracker(violations_df, today=None):
     """Update tracker with new violations data
     
     GENERAL RULE: Multiple sellers can have the same SKU - each combination (seller, sku) 
     is handled independently. Only violations that do NOT appear in current Excel are marked 
     as RESOLVED. Ensures complete synchronization with daily Excel.
+
+    Args:
+        violations_df (DataFrame): Today's included violations
+        today (date): Sync date (default date.today(); replay passes the upload's date)
     """
-    today = date.today().isoformat()
+    today = today or date.today()
 
     with get_db() as conn:
-        cursor = conn.cursor()
+        counts = _sync_violations(conn, violations_df, today)
 
-        # PASO 1: Procesar todas las violaciones actuales del Excel
-        current_violations = set()
-        new_violations = 0
-        updated_violations = 0
-
-        for _, row in violations_df.iterrows():
-            seller = row['sellers']
-            sku = row['SAP Material']
-            key = (seller, sku)
-            current_violations.add(key)
-
-            # Check if violation exists in tracker
-            existing = cursor.execute(
-                'SELECT * FROM violations WHERE seller_name = ? AND sku = ?',
-                (seller, sku)
-            ).fetchone()
-
-            if existing:
-                # Update existing violation - ALWAYS reactivate to ACTIVE if in Excel
-                first_date = existing['first_detected_date']
-                days = (date.today() - date.fromisoformat(first_date)).days
-
-                cursor.execute('''
-                    UPDATE violations
-                    SET last_seen_date = ?,
-                        days_active = ?,
-                        current_price = ?,
-                        map_price = ?,
-                        product_description = ?,
-                        seller_link = ?,
-                        status = 'ACTIVE'
-                    WHERE seller_name = ? AND sku = ?
-                ''', (
-                    today, days,
-                    float(row['prices']), float(row['U.S. MAP']),
-                    row['Description'], row.get('seller_links', ''),
-                    seller, sku
-                ))
-                updated_violations += 1
-            else:
-                # Insert new violation
-                cursor.execute('''
-                    INSERT INTO violations
-                    (seller_name, sku, product_description, current_price, map_price,
-                     first_detected_date, last_seen_date, days_active, status,
-                     seller_link, pending_approval)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, 0, 'ACTIVE', ?, 0)
-                ''', (
-                    seller, sku, row['Description'],
-                    float(row['prices']), float(row['U.S. MAP']),
-                    today, today, row.get('seller_links', '')
-                ))
-                new_violations += 1
-
-        # STEP 2: Mark as RESOLVED only violations that are NOT in current Excel
-        cursor.execute(
-            'SELECT seller_name, sku FROM violations WHERE status = "ACTIVE"'
-        )
-        tracked_violations = cursor.fetchall()
-
-        resolved_violations = 0
-        for violation in tracked_violations:
-            key = (violation['seller_name'], violation['sku'])
-            if key not in current_violations:
-                cursor.execute('''
-                    UPDATE violations
-                    SET status = 'RESOLVED'
-                    WHERE seller_name = ? AND sku = ?
-                ''', key)
-                resolved_violations += 1
+        # STEP 3: Re-score active violations (price gap, age, repeat offenses);
+        # only scores that changed are written
+        update_severity(conn)
         
         # Sync log for debugging
         print(f"Synchronization completed:")
-        print(f"  - New violations: {new_violations}")
-        print(f"  - Updated violations: {updated_violations}")  
-        print(f"  - Resolved violations: {resolved_violations}")
-        print(f"  - Total violations in Excel: {len(current_violations)}")
+        print(f"  - New violations: {counts['new']}")
+        print(f"  - Updated violations: {counts['updated']}")  
+        print(f"  - Resolved violations: {counts['resolved']}")
+        print(f"  - Total violations in Excel: {counts['total']}")
+
+    notify_violations_changed()
+
+def _sync_violations(conn, violations_df, today):
+    """Apply one day's violations to the tracker inside the caller's transaction
+
+    The day is diffed against the tracker in one pandas merge (see
+    violation_diff.py); only new, reactivated, changed and resolved rows are
+    written individually (plus the once-a-day aging of active rows), and the
+    diff is kept in upload_diffs for /api/diff-report.
+
+    Returns:
+        dict: new, updated, resolved and total counts, plus per-class `changes`
+    """
+    # STEP 1: Bring back archived seller/SKUs that are in today's file, then
+    # classify every seller/SKU against the current tracker snapshot
+    restore_archived(conn, incoming_keys(violations_df))
+    diff = compute_diff(violations_df, load_snapshot(conn))
+
+    # STEP 2: Insert new rows, (re)activate and rewrite changed rows, resolve
+    # violations that are NOT in current Excel
+    changes = apply_diff(conn, diff, today)
+    record_diff(conn, today.isoformat(), diff, changes)
+
+    updated = changes['reactivated'] + changes['price_changed'] + changes['persisting']
+    return {
+        'new': changes['new'],
+        'updated': updated,
+        'resolved': changes['resolved'],
+        'total': changes['new'] + updated,
+        'changes': changes,
+    }
+
+def get_store():
+    """ViolationStore of the current app (None outside an app context, e.g. the CLI)"""
+    if has_app_context():
+        return current_app.extensions.get('violation_store')
+    return None
+
+def notify_violations_changed(sellers=None, violation_ids=None):
+    """Keep the in-memory store in step with a committed write
+
+    Call after the write's transaction has committed. With no arguments (bulk
+    writes such as a tracker sync) the whole active set is reloaded on next read;
+    otherwise only the affected sellers are re-read, unless another process
+    wrote in between (then the store reloads everything).
+    """
+    store = get_store()
+    if store is None:
+        return
+    data_version = g.pop('data_version', None)
+    if sellers is None and violation_ids is None:
+        store.invalidate()
+        return
+    if violation_ids:
+        store.refresh_ids(violation_ids, sellers or (), data_version=data_version)
+    elif sellers:
+        store.refresh_sellers(sellers, data_version=data_version)
 
 def get_active_violations_grouped():
-    """Get active violations grouped by seller"""
+    """Get active violations grouped by seller
+
+    Served from the app's ViolationStore when running inside the app; the CLI
+    (no app context) reads the database directly.
+    """
+    store = get_store()
+    if store is not None:
+        return store.grouped()
+
     with get_db() as conn:
         cursor = conn.cursor()
         violations = cursor.execute('''
@@ -215,8 +431,164 @@ def get_active_violations_grouped():
 
         return grouped
 
-# Initialize database on startup
-init_database()
+# Product keys in build_sellers_payload, in the column order of ?shape=compact
+PRODUCT_FIELDS = (
+    'id', 'sku', 'description', 'current_price', 'map_price', 'first_detected',
+    'days_active', 'day_status', 'first_email_sent', 'second_email_sent',
+    'pending_approval', 'in_dns', 'seller_link', 'first_email_sent_date',
+    'second_email_sent_date', 'dns_added_date', 'severity',
+)
+
+def product_payload(v):
+    """Dashboard product row of one violation (PRODUCT_FIELDS)"""
+    # Determine day status
+    if v['days_active'] == 0:
+        day_status = 'DAY_1'
+    elif v['days_active'] == 1:
+        day_status = 'DAY_2'
+    else:  # days_active >= 2
+        day_status = 'DAY_3'
+
+    return {
+        'id': v['id'],
+        'sku': v['sku'],
+        'description': v['product_description'],
+        'current_price': v['current_price'],
+        'map_price': v['map_price'],
+        'first_detected': v['first_detected_date'],
+        'days_active': v['days_active'],
+        'day_status': day_status,
+        'first_email_sent': bool(v['first_email_sent_date']),
+        'second_email_sent': bool(v['second_email_sent_date']),
+        'pending_approval': bool(v.get('pending_approval', 0)),
+        'in_dns': bool(v.get('dns_added_date')),
+        'seller_link': v['seller_link'],
+        'first_email_sent_date': v['first_email_sent_date'],
+        'second_email_sent_date': v['second_email_sent_date'],
+        'dns_added_date': v['dns_added_date'],
+        'severity': v['severity']
+    }
+
+def build_sellers_payload(grouped):
+    """Build the per-seller dashboard payload and day metrics from grouped violations
+
+    Full shape, every seller with all its product rows (?products=1 on the
+    dashboard endpoints). Email tracking totals are computed from the grouped
+    rows instead of one query per seller.
+    """
+    sellers_data = []
+    total_day1 = total_day2 = total_day3 = 0
+    total_active = 0
+
+    for seller_name, violations_list in grouped.items():
+        contact_info = get_seller_contact(seller_name)
+
+        # Process each product violation
+        products = [product_payload(v) for v in violations_list]
+        for p in products:
+            total_active += 1
+            if p['day_status'] == 'DAY_1':
+                total_day1 += 1
+            elif p['day_status'] == 'DAY_2':
+                total_day2 += 1
+            else:
+                total_day3 += 1
+
+        # Check if ANY product in this seller has pending_approval
+        has_pending = any(p['pending_approval'] for p in products)
+        has_in_dns = any(p['in_dns'] for p in products)
+
+        # Email tracking status for this seller
+        first_dates = [p['first_email_sent_date'] for p in products if p['first_email_sent_date'] is not None]
+        second_dates = [p['second_email_sent_date'] for p in products if p['second_email_sent_date'] is not None]
+        dns_dates = [p['dns_added_date'] for p in products if p['dns_added_date'] is not None]
+
+        sellers_data.append({
+            'name': seller_name,
+            'contact': contact_info,
+            'products': products,
+            'pending_approval': has_pending,
+            'in_dns': has_in_dns,
+            'first_emails_sent': len(first_dates),
+            'second_emails_sent': len(second_dates),
+            'first_email_date': max(first_dates, default=None),
+            'second_email_date': max(second_dates, default=None),
+            'dns_added_date': max(dns_dates, default=None)
+        })
+
+    return {
+        'total_active_violations': total_active,
+        'unique_violators': len(grouped),  # Number of unique violators
+        'day_1_count': total_day1,
+        'day_2_count': total_day2,
+        'day_3_count': total_day3,
+        'sellers': sellers_data
+    }
+
+def build_seller_summaries(grouped):
+    """Build the dashboard's seller list: one summary row per seller, no products
+
+    Same metrics as build_sellers_payload, but the size and cost depend on the
+    number of sellers only (summaries are cached by the ViolationStore). A
+    seller's product rows are loaded when its card is opened, from
+    /api/sellers/<name>/violations.
+    """
+    store = get_store()
+    summaries = store.summaries() if store is not None else {}
+
+    sellers_data = []
+    totals = {'day_1_count': 0, 'day_2_count': 0, 'day_3_count': 0}
+    for seller_name, violations_list in grouped.items():
+        summary = summaries.get(seller_name) or summarize_seller(violations_list)
+        for key in totals:
+            totals[key] += summary[key]
+        sellers_data.append({'name': seller_name, 'contact': get_seller_contact(seller_name), **summary})
+
+    return {
+        'total_active_violations': sum(totals.values()),
+        'unique_violators': len(grouped),
+        **totals,
+        'sellers': sellers_data
+    }
+
+def dashboard_payload(grouped):
+    """Seller summaries, or every product row when the request has ?products=1"""
+    if request.args.get('products') == '1':
+        return build_sellers_payload(grouped)
+    return build_seller_summaries(grouped)
+
+def sellers_response(fields):
+    """Stream a dashboard payload (dashboard_payload() plus extra fields)
+
+    Sellers are serialized one by one; with ?shape=compact every seller's
+    products (if included) come as {'columns': PRODUCT_FIELDS, 'rows': [...]}.
+    """
+    fields = dict(fields)
+    sellers = fields.pop('sellers')
+    if wants_compact() and request.args.get('products') == '1':
+        fields['shape'] = 'compact'
+        sellers = (dict(seller, products=columnar(seller['products'], PRODUCT_FIELDS))
+                   for seller in sellers)
+    return stream_json(fields, 'sellers', sellers)
+
+# Parsed config files keyed by path -> ((mtime_ns, size), value). The key is
+# the file's stat, so an edit is picked up by every worker on its next request
+# instead of each process keeping whatever it read first.
+_config_cache = {}
+
+def cached_config(config_file, loader):
+    """Return loader(), re-running it only when config_file changed on disk"""
+    try:
+        st = os.stat(config_file)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    cached = _config_cache.get(config_file)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    value = loader()
+    _config_cache[config_file] = (stamp, value)
+    return value
 
 # ============================================================================
 # EXCLUDED SELLERS CONFIGURATION
@@ -227,10 +599,13 @@ init_database()
 # TO ADD NEW EXCLUDED SELLERS:
 # 1. Add the seller name to the list below (case variations supported)
 # 2. Save this file
-# 3. Restart the application
+# 3. Changes are picked up on the next request (no restart needed)
 #
 def load_excluded_sellers():
     """Load excluded sellers from configuration file"""
+    return cached_config('excluded_sellers.txt', _read_excluded_sellers)
+
+def _read_excluded_sellers():
     excluded_sellers = []
     config_file = 'excluded_sellers.txt'
     
@@ -264,6 +639,9 @@ def get_excluded_sellers_lower():
 # ============================================================================
 def load_seller_contacts():
     """Load seller contacts from configuration file"""
+    return cached_config('seller_contacts.txt', _read_seller_contacts)
+
+def _read_seller_contacts():
     contacts = {}
     config_file = 'seller_contacts.txt'
 
@@ -302,60 +680,277 @@ def get_seller_contact(seller_name):
 
 def validate_excel_columns(df):
     """Validate that all required columns are present"""
-    required_columns = ['sellers', 'prices', 'U.S. MAP', 'price_difference', 'Description', 'SAP Material', 'seller_links']
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     
     if missing_columns:
         raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
     
     return True
 
-def read_violations(file_path):
-    """Read Excel and filter violations with validation"""
+def filter_violations(df, source=''):
+    """Validate a sheet and return the rows that violate MAP"""
+    import pandas as pd
+
+    prefix = f"{source}: " if source else ''
+
+    # Validate columns exist
     try:
-        df = pd.read_excel(file_path)
-        
-        # Validate columns exist
         validate_excel_columns(df)
-        
-        # Check for empty dataframe
-        if df.empty:
-            raise ValueError("Excel file is empty")
-        
-        # Validate data types and values
-        if not pd.api.types.is_numeric_dtype(df['prices']):
-            raise ValueError("'prices' column must contain numeric values")
-        
-        if not pd.api.types.is_numeric_dtype(df['U.S. MAP']):
-            raise ValueError("'U.S. MAP' column must contain numeric values")
-            
-        if not pd.api.types.is_numeric_dtype(df['price_difference']):
-            raise ValueError("'price_difference' column must contain numeric values")
-        
-        # Filter violations (price_difference < 0 means current price < MAP price)
-        violations = df[df['price_difference'] < 0].copy()
-        
-        # Validate that we have actual violations
-        if len(violations) == 0:
-            return violations, len(df)  # No violations found, but data is valid
-        
-        # Additional validation for violations
-        for idx, row in violations.iterrows():
-            if pd.isna(row['sellers']) or str(row['sellers']).strip() == '':
-                raise ValueError(f"Row {idx + 1}: Seller name is empty")
-            
-            if pd.isna(row['Description']) or str(row['Description']).strip() == '':
-                raise ValueError(f"Row {idx + 1}: Description is empty")
-            
-            if pd.isna(row['SAP Material']) or str(row['SAP Material']).strip() == '':
-                raise ValueError(f"Row {idx + 1}: SAP Material is empty")
-        
-        return violations, len(df)
-        
+    except ValueError as e:
+        raise ValueError(f"{prefix}{e}")
+
+    # Validate data types and values
+    if not pd.api.types.is_numeric_dtype(df['prices']):
+        raise ValueError(f"{prefix}'prices' column must contain numeric values")
+
+    if not pd.api.types.is_numeric_dtype(df['U.S. MAP']):
+        raise ValueError(f"{prefix}'U.S. MAP' column must contain numeric values")
+
+    if not pd.api.types.is_numeric_dtype(df['price_difference']):
+        raise ValueError(f"{prefix}'price_difference' column must contain numeric values")
+
+    # Filter violations (price_difference < 0 means current price < MAP price)
+    violations = df[df['price_difference'] < 0].copy()
+
+    # Additional validation for violations (column-wise; reports the first bad
+    # row and, within it, the first failing check)
+    checks = [('sellers', 'Seller name is empty'),
+              ('Description', 'Description is empty'),
+              ('SAP Material', 'SAP Material is empty')]
+    empty = {column: violations[column].isna() | (violations[column].astype(str).str.strip() == '')
+             for column, _ in checks}
+    any_empty = empty['sellers'] | empty['Description'] | empty['SAP Material']
+
+    if any_empty.any():
+        idx = any_empty.idxmax()
+        message = next(message for column, message in checks if empty[column][idx])
+        raise ValueError(f"{prefix}Row {idx + 1}: {message}")
+
+    return violations
+
+def read_violations(file_path, metrics=None):
+    """Read every sheet of a violations export and filter violations with validation
+
+    Vendors split Excel exports per marketplace/brand across sheets, so all
+    sheets are read; CSV, gzipped CSV and Parquet exports are one sheet (see
+    input_formats.py). Completely empty sheets are skipped; any other sheet
+    must match the expected layout.
+
+    metrics (StageMetrics) times parsing as 'read' and filtering as 'validate'.
+    """
+    try:
+        with measure(metrics, 'read'):
+            import pandas as pd
+            sheets = read_sheets(file_path)
+
+        name = os.path.basename(str(file_path))
+
+        # Check for empty workbook
+        if not sheets:
+            raise ValueError("File is empty")
+
+        with measure(metrics, 'validate'):
+            frames = []
+            total_rows = 0
+            for sheet, df in sheets.items():
+                source = f"{name} [{sheet}]" if len(sheets) > 1 else ''
+                frames.append(filter_violations(df, source))
+                total_rows += len(df)
+
+            violations = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return violations, total_rows
+
     except Exception as e:
-        print(f"Error reading Excel file: {str(e)}")
+        print(f"Error reading file: {str(e)}")
         raise
 
+def dedupe_violations(violations_df):
+    """Keep one row per (seller, SKU), preferring the lowest advertised price"""
+    if violations_df.empty:
+        return violations_df
+    return (violations_df
+            .sort_values('prices', kind='stable')
+            .drop_duplicates(subset=['sellers', 'SAP Material'], keep='first')
+            .sort_index())
+
+
+def read_violations_measured(file_path, trace_memory=False):
+    """read_violations() in a worker process, returning its stage metrics too"""
+    metrics = StageMetrics(trace_memory)
+    try:
+        violations, total_rows = read_violations(file_path, metrics)
+    finally:
+        metrics.close()
+    return violations, total_rows, metrics.stages
+
+def read_violations_many(file_paths, metrics=None):
+    """Read several workbooks in parallel and merge them into one violation set
+
+    Each workbook is parsed in its own process, so total ingest time follows the
+    largest file instead of the sum of all files. The processes are spawned,
+    not forked: a fork of a threaded gunicorn worker can inherit locks held
+    by its other threads.
+
+    Returns:
+        tuple: (deduplicated violations DataFrame, total rows read)
+    """
+    file_paths = list(file_paths)
+    if len(file_paths) == 1:
+        violations, total_rows = read_violations(file_paths[0], metrics)
+        with measure(metrics, 'validate'):
+            return dedupe_violations(violations), total_rows
+
+    workers = min(len(file_paths), os.cpu_count() or 1)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        if metrics is None:
+            results = [result + (None,) for result in pool.map(read_violations, file_paths)]
+        else:
+            results = list(pool.map(partial(read_violations_measured, trace_memory=metrics.trace_memory),
+                                    file_paths))
+    if metrics is not None:
+        metrics.merge_parallel([stages for _, _, stages in results], (time.perf_counter() - start) * 1000)
+
+    import pandas as pd
+
+    with measure(metrics, 'validate'):
+        frames = [violations for violations, _, _ in results if not violations.empty]
+        total_rows = sum(rows for _, rows, _ in results)
+        if not frames:
+            return results[0][0], total_rows
+
+        merged = pd.concat(frames, ignore_index=True)
+        return dedupe_violations(merged), total_rows
+
+
+def ingest_workbooks(file_paths, filename, metrics=None):
+    """Run the ingest pipeline: read workbooks, drop excluded sellers, sync tracker, log upload
+
+    Shared by the /upload route and the command line tools. With metrics
+    (StageMetrics) every stage is timed; see save_upload_metrics.
+
+    Returns:
+        dict: status ('no_violations', 'excluded_only' or 'synced'), total_rows,
+              violations and included_violations counts
+    """
+    violations_df, total_rows = read_violations_many(file_paths, metrics)
+    result = {
+        'status': 'no_violations',
+        'total_rows': total_rows,
+        'violations': len(violations_df),
+        'included_violations': 0,
+    }
+
+    if len(violations_df) == 0:
+        return result
+
+    # Separate included and excluded sellers
+    with measure(metrics, 'separate'):
+        included_violations, _ = separate_sellers(violations_df)
+    result['included_violations'] = len(included_violations)
+
+    if len(included_violations) == 0:
+        result['status'] = 'excluded_only'
+        return result
+
+    with measure(metrics, 'sync'):
+        # UPDATE TRACKER with violations
+        update_violations_tracker(included_violations)
+
+        # LOG UPLOAD
+        log_upload(filename, len(included_violations))
+
+    with measure(metrics, 'archive'):
+        # Keep the synced workbooks (deduplicated, compressed) linked to the upload
+        result['upload_archive'] = archive_workbooks(file_paths)
+
+        # Daily retention pass: archive old RESOLVED rows, release the space
+        result['retention'] = apply_retention()
+
+    result['status'] = 'synced'
+    return result
+
+def save_upload_metrics(metrics, filename, files, result):
+    """Store an upload's stage metrics (see upload_metrics.py); returns the row id
+
+    Metrics are not tracker data, so this write does not bump the data version
+    (workers keep their cached violation set), and a failure to store them
+    never fails the upload.
+    """
+    try:
+        conn = sqlite3.connect(get_db_path(), timeout=BUSY_TIMEOUT)
+        try:
+            with conn:
+                return record_upload_metrics(conn, metrics, filename, files, result, get_setting('RELEASE'))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Could not store upload metrics: {e}")
+        return None
+
+def get_setting(name):
+    """Config value of the current app, or the module default outside a request"""
+    if has_app_context():
+        return current_app.config[name]
+    return globals()[name]
+
+def get_archive_after_days():
+    """Retention age of the current app, or the module default outside a request"""
+    return get_setting('ARCHIVE_AFTER_DAYS')
+
+def archive_workbooks(file_paths, upload_date=None):
+    """Store an upload's workbooks in the upload archive, link them, prune the archive
+
+    Files are linked under their own base name (the /upload route keeps the
+    original filename when it stages them).
+
+    Returns:
+        dict: stored (new blobs), deduplicated and pruned counts
+    """
+    folder = get_setting('UPLOAD_FOLDER')
+    Path(folder).mkdir(exist_ok=True)
+    upload_date = upload_date or date.today().isoformat()
+
+    with get_db() as conn:
+        blobs = [store_blob(conn, folder, path) for path in file_paths]
+        link_upload(conn, upload_date, [(Path(path).name, blob['sha256'])
+                                        for path, blob in zip(file_paths, blobs)])
+        pruned = prune(conn, folder, get_setting('UPLOAD_RETENTION_DAYS'),
+                       get_setting('UPLOAD_BUDGET_BYTES'))
+
+    # Blob files go only once their rows are gone for good
+    remove_files(pruned['paths'])
+
+    deduplicated = sum(blob['deduplicated'] for blob in blobs)
+    return {'stored': len(blobs) - deduplicated, 'deduplicated': deduplicated,
+            'pruned': pruned['removed']}
+
+def apply_retention(db_path=None, older_than_days=None, vacuum=True, convert=False):
+    """Archive RESOLVED rows older than the retention age, then vacuum incrementally
+
+    convert also runs the one-time full VACUUM of a database that is not in
+    auto_vacuum=INCREMENTAL mode yet (command line only: it rewrites the whole
+    file under the write lock).
+
+    Returns:
+        dict: archived (rows moved), freed_pages and converted
+    """
+    if older_than_days is None:
+        older_than_days = get_archive_after_days()
+
+    with get_db(db_path) as conn:
+        archived = archive_resolved(conn, older_than_days)
+
+    freed_pages = 0
+    converted = False
+    if vacuum:
+        with get_db(db_path) as conn:
+            if convert:
+                converted = convert_to_incremental(conn)
+            freed_pages = incremental_vacuum(conn)
+
+    return {'archived': archived, 'freed_pages': freed_pages, 'converted': converted}
+
 # ============================================================================
 # UTILITY FUNCTIONS FOR CODE OPTIMIZATION
 # ============================================================================
@@ -384,6 +979,13 @@ def filter_excluded_sellers_from_grouped(grouped_data):
     
     return filtered_grouped, excluded_count
 
+class BatchAborted(Exception):
+    """Raised inside /api/batch to roll back the transaction at a failing operation"""
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.index = index
+
 def create_error_response(message, status_code=500):
     """
     Utility function to create standardized error responses.
@@ -416,6 +1018,7 @@ def create_success_response(data=None):
 def separate_sellers(violations_df):
     """Separate violations into included and excluded sellers"""
     if violations_df.empty:
+        import pandas as pd
         return pd.DataFrame(), pd.DataFrame()
     
     excluded_sellers_lower = get_excluded_sellers_lower()
@@ -558,272 +1161,524 @@ def generate_emails(grouped_violations):
 
     return emails
 
-@app.route('/')
-def index():
-    """Main page"""
-    return render_template('index.html')
+def render_day_email(violations_list, day):
+    """Render the Day 1 (first warning) or Day 2 (second notice) email for a seller
 
-@app.route('/upload', methods=['POST'])
-def upload_file():
-    """Handle file upload and process violations with tracking"""
-    if 'file' not in request.files:
-        return create_error_response('No file uploaded', 400)
+    Args:
+        violations_list (list): Violation dicts for one seller and one day bucket
+        day (int): 0 for DAY_1, 1 for DAY_2
 
-    file = request.files['file']
+    Returns:
+        dict: {"subject": ..., "body": ...} or None for Day 3+ (no email is sent)
+    """
+    # Determine email type and build body based on day
+    if day == 0:
+        # First Warning (Day 1)
+        subject = f"IMMEDIATE ACTION REQUIRED - Glen Dimplex MAP Violation ({len(violations_list)} Product{'s' if len(violations_list) > 1 else ''})"
+        warning_text = "first warning"
+
+        # Build product list
+        product_list_html = []
+        for v in violations_list:
+            map_html = f"<span style='font-size:15px; font-weight:700;'>${v['map_price']:.2f}</span>"
+            current_html = f"<span style='font-size:16px; font-weight:800; color:#e53e3e;'>${v['current_price']:.2f}</span>"
+            product_html = f"<li><strong>SKU {v['sku']}</strong> ({v['product_description']})<br>"
+            product_html += f"<strong>MAP:</strong> {map_html} &nbsp;|&nbsp; <strong>Your Price:</strong> {current_html}"
+            if v['seller_link'] and v['seller_link'] != 'N/A':
+                product_html += f"<br><strong>Product Link:</strong> <a href='{v['seller_link']}'>{v['seller_link']}</a>"
+            product_html += "</li>"
+            product_list_html.append(product_html)
+
+        products_html = "<ul>" + "".join(product_list_html) + "</ul>"
+
+        body = f"""<div style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+<p>Hello,</p>
 
-    if file.filename == '':
-        return create_error_response('No file selected', 400)
+<p>Your company is in violation of <strong>Glen Dimplex Americas Minimum Advertised Price (MAP) Policy</strong>.</p>
 
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        return create_error_response('Please upload an Excel file (.xlsx or .xls)', 400)
+<p>This is your <strong>{warning_text}</strong> for the following product(s):</p>
 
-    try:
-        # Check if already uploaded today
-        existing_upload = check_upload_today()
-        force_upload = request.form.get('force_upload') == 'true'
+{products_html}
 
-        if existing_upload and not force_upload:
-            # Return existing tracker data with complete structure
-            grouped = get_active_violations_grouped()
-            
-            # APPLY EXCLUSIONS TO EXISTING TRACKER DATA
-            grouped, excluded_count = filter_excluded_sellers_from_grouped(grouped)
-            
-            # Prepare complete response data like in normal flow
-            sellers_data = []
-            total_day1 = 0
-            total_day2 = 0
-            total_day3 = 0
-            total_active = 0
-            unique_violators = len(grouped)  # Number of unique violators
-
-            with get_db() as conn:
-                cursor = conn.cursor()
-                
-                for seller_name, violations_list in grouped.items():
-                    contact_info = get_seller_contact(seller_name)
-
-                    # Process each product violation
-                    products = []
-                    for v in violations_list:
-                        total_active += 1
-                        # Determine day status
-                        if v['days_active'] == 0:
-                            day_status = 'DAY_1'
-                            total_day1 += 1
-                        elif v['days_active'] == 1:
-                            day_status = 'DAY_2'
-                            total_day2 += 1
-                        else:  # days_active >= 2
-                            day_status = 'DAY_3'
-                            total_day3 += 1
-
-                        products.append({
-                            'id': v['id'],
-                            'sku': v['sku'],
-                            'description': v['product_description'],
-                            'current_price': v['current_price'],
-                            'map_price': v['map_price'],
-                            'first_detected': v['first_detected_date'],
-                            'days_active': v['days_active'],
-                            'day_status': day_status,
-                            'first_email_sent': bool(v['first_email_sent_date']),
-                            'second_email_sent': bool(v['second_email_sent_date']),
-                            'pending_approval': bool(v.get('pending_approval', 0)),
-                            'in_dns': bool(v.get('dns_added_date')),
-                            'seller_link': v['seller_link'],
-                            'first_email_sent_date': v['first_email_sent_date'],
-                            'second_email_sent_date': v['second_email_sent_date'],
-                            'dns_added_date': v['dns_added_date']
-                        })
-
-                    # Check if ANY product in this seller has pending_approval
-                    has_pending = any(p['pending_approval'] for p in products)
-                    has_in_dns = any(p['in_dns'] for p in products)
-                    
-                    # Get email tracking status for this seller
-                    cursor.execute("""
-                        SELECT 
-                            COUNT(CASE WHEN first_email_sent_date IS NOT NULL THEN 1 END) as first_emails_sent,
-                            COUNT(CASE WHEN second_email_sent_date IS NOT NULL THEN 1 END) as second_emails_sent,
-                            MAX(first_email_sent_date) as first_email_date,
-                            MAX(second_email_sent_date) as second_email_date,
-                            MAX(dns_added_date) as dns_added_date
-                        FROM violations 
-                        WHERE seller_name = ? AND status = 'ACTIVE'
-                    """, (seller_name,))
-                    
-                    tracking_data = cursor.fetchone()
-
-                    sellers_data.append({
-                        'name': seller_name,
-                        'contact': contact_info,
-                        'products': products,
-                        'pending_approval': has_pending,
-                        'in_dns': has_in_dns,
-                        'first_emails_sent': tracking_data[0] or 0,
-                        'second_emails_sent': tracking_data[1] or 0,
-                        'first_email_date': tracking_data[2],
-                        'second_email_date': tracking_data[3],
-                        'dns_added_date': tracking_data[4]
-                    })
+<p>Per our MAP policy, you are required to update the pricing in line with our MAP policy <strong style='color: #c53030;'>within 24 hours</strong>. If this violation is not corrected, GDA reserves the right to refuse purchase orders, stop future shipments, and/or suspend accounts at our discretion which may or may not be permanent.</p>
 
-            return jsonify({
-                'success': True,
-                'duplicate_detected': True,
-                'tracking_enabled': True,
-                'existing_upload': existing_upload,
-                'total_active_violations': total_active,
-                'unique_violators': unique_violators,
-                'day_1_count': total_day1,
-                'day_2_count': total_day2,
-                'day_3_count': total_day3,
-                'sellers': sellers_data,
-                'uploaded_filename': file.filename,
-                'upload_date': existing_upload['upload_date'],
-                'message': f"File already uploaded today at {existing_upload['upload_time']}. Showing current tracker data."
-            })
+<p>Please note that we have had a price change effective from <strong>October 1st, 2025</strong>, and the updated price lists have been provided to your distributors.</p>
 
-        # Save uploaded file
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
+<p>If you have any questions about this MAP violation, please respond directly to this email. If you are not the correct person to receive this notice, please reply with the name, title, and contact information of the correct individual.</p>
 
-        # Process violations
-        violations_df, total_rows = read_violations(filepath)
+<p>Sincerely,<br>
+<strong>Glen Dimplex Americas MAP Enforcement Team</strong></p>
+</div>"""
 
-        if len(violations_df) == 0:
-            return jsonify({
-                'success': True,
-                'no_violations': True,
-                'total_rows': total_rows,
-                'uploaded_filename': file.filename,
-                'upload_date': date.today().isoformat(),
-                'message': 'No violations found! All sellers are complying with MAP policy.'
-            })
+    elif day == 1:
+        # Second Warning (Day 2) - Follow-up Notice
+        subject = f"Glen Dimplex MAP Policy - Second Notice ({len(violations_list)} Product{'s' if len(violations_list) > 1 else ''})"
+
+        # Build product list
+        product_list_html = []
+        for v in violations_list:
+            map_html = f"<span style='font-size:15px; font-weight:700;'>${v['map_price']:.2f}</span>"
+            current_html = f"<span style='font-size:16px; font-weight:800; color:#e53e3e;'>${v['current_price']:.2f}</span>"
+            product_html = f"<li><strong>SKU {v['sku']}</strong> ({v['product_description']})<br>"
+            product_html += f"<strong>MAP:</strong> {map_html} &nbsp;|&nbsp; <strong>Your Price:</strong> {current_html}"
+            if v['seller_link'] and v['seller_link'] != 'N/A':
+                product_html += f"<br><strong>Product Link:</strong> <a href='{v['seller_link']}'>{v['seller_link']}</a>"
+            product_html += "</li>"
+            product_list_html.append(product_html)
+
+        products_html = "<ul>" + "".join(product_list_html) + "</ul>"
+
+        body = f"""<div style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+<p>Hello,</p>
 
-        # Separate included and excluded sellers
-        included_violations, _ = separate_sellers(violations_df)
+<p>We wanted to follow up on our previous communication regarding <strong>Glen Dimplex Americas Minimum Advertised Price (MAP) Policy</strong> compliance.</p>
 
-        # Check if we have any processable violations after excluding sellers
-        if len(included_violations) == 0:
-            return jsonify({
-                'success': True,
-                'no_violations': True,
-                'total_rows': total_rows,
-                'message': 'All violations are from excluded sellers.'
-            })
+<p><strong style='font-size: 16px;'>We have identified that the following product(s) remain in violation of our MAP policy:</strong></p>
 
-        # UPDATE TRACKER with violations
-        update_violations_tracker(included_violations)
+{products_html}
 
-        # LOG UPLOAD
-        log_upload(file.filename, len(included_violations))
+<p><strong>Action Required:</strong> To maintain your account in good standing, please correct these pricing violations <strong>within the next 24 hours</strong>. 
 
-        # GET TRACKED VIOLATIONS (grouped by seller)
-        grouped_tracked = get_active_violations_grouped()
+<p>We understand that pricing adjustments may take time to implement, and we appreciate your cooperation in maintaining MAP compliance. This helps ensure fair competition among all our retail partners.</p>
 
-        # Prepare response data with tracking info
-        sellers_data = []
-        total_day1 = 0
-        total_day2 = 0
-        total_day3 = 0
-        unique_violators = len(grouped_tracked)  # Number of unique violators
+<p>Per our MAP policy, continued non-compliance may result in account restrictions. GDA reserves the right to refuse purchase orders, stop future shipments, and/or suspend accounts at our discretion to maintain policy integrity.</p>
 
-        with get_db() as conn:
-            cursor = conn.cursor()
-            
-            for seller_name, violations_list in grouped_tracked.items():
-                contact_info = get_seller_contact(seller_name)
-
-                # Process each product violation
-                products = []
-                for v in violations_list:
-                    # Determine day status
-                    if v['days_active'] == 0:
-                        day_status = 'DAY_1'
-                        total_day1 += 1
-                    elif v['days_active'] == 1:
-                        day_status = 'DAY_2'
-                        total_day2 += 1
-                    else:  # days_active >= 2
-                        day_status = 'DAY_3'
-                        total_day3 += 1
-
-                    products.append({
-                        'id': v['id'],
-                        'sku': v['sku'],
-                        'description': v['product_description'],
-                        'current_price': v['current_price'],
-                        'map_price': v['map_price'],
-                        'first_detected': v['first_detected_date'],
-                        'days_active': v['days_active'],
-                        'day_status': day_status,
-                        'first_email_sent': bool(v['first_email_sent_date']),
-                        'second_email_sent': bool(v['second_email_sent_date']),
-                        'pending_approval': bool(v.get('pending_approval', 0)),
-                        'in_dns': bool(v.get('dns_added_date')),
-                        'seller_link': v['seller_link']
-                    })
-
-                # Check if ANY product in this seller has pending_approval
-                has_pending = any(p['pending_approval'] for p in products)
-                has_in_dns = any(p['in_dns'] for p in products)
-
-                # Get email tracking status for this seller
-                cursor.execute("""
-                    SELECT 
-                        COUNT(CASE WHEN first_email_sent_date IS NOT NULL THEN 1 END) as first_emails_sent,
-                        COUNT(CASE WHEN second_email_sent_date IS NOT NULL THEN 1 END) as second_emails_sent,
-                        MAX(first_email_sent_date) as first_email_date,
-                        MAX(second_email_sent_date) as second_email_date,
-                        MAX(dns_added_date) as dns_added_date
-                    FROM violations 
-                    WHERE seller_name = ? AND status = 'ACTIVE'
-                """, (seller_name,))
-                
-                tracking_data = cursor.fetchone()
-
-                sellers_data.append({
-                    'name': seller_name,
-                    'contact': contact_info,
-                    'products': products,
-                    'pending_approval': has_pending,
-                    'in_dns': has_in_dns,
-                    'first_emails_sent': tracking_data[0] or 0,
-                    'second_emails_sent': tracking_data[1] or 0,
-                    'first_email_date': tracking_data[2],
-                    'second_email_date': tracking_data[3],
-                    'dns_added_date': tracking_data[4]
-                })
+<p>Please note that we have had a price change effective from <strong>October 1st, 2025</strong>, and the updated price lists have been provided to your distributors.</p>
+
+<p>We value our partnership and hope to resolve this matter promptly. If you have any questions about this MAP violation or need assistance with compliance, please respond directly to this email.</p>
 
+<p>If you are not the correct person to receive this notice, please reply with the name, title, and contact information of the appropriate individual.</p>
 
+<p>Thank you for your attention to this matter.</p>
 
-        return jsonify({
+<p>Sincerely,<br>
+<strong>Glen Dimplex Americas MAP Enforcement Team</strong></p>
+</div>"""
+    else:
+        return None
+
+    return {"subject": subject, "body": body}
+
+def dispatch_notices(days=(0, 1), sellers=None, dry_run=False, background=False):
+    """Send the pending Day 1 / Day 2 notices through the SMTP relay
+
+    Each seller and day bucket is sent once (idempotency key per notice, see
+    email_dispatch.py); delivered notices set first/second_email_sent_date.
+
+    Args:
+        days (tuple): Day buckets to send (0 = Day 1, 1 = Day 2)
+        sellers (list): Only these sellers (default every active seller)
+        dry_run (bool): Plan the notices without sending anything
+        background (bool): Record the notices as queued and send them from a
+            thread of this process (needs an app context); the outcome is in
+            the dispatch log
+
+    Returns:
+        dict: Planned notices, skipped sellers and (unless dry_run or
+              background) the delivery report
+    """
+    notices, skipped = plan_notices(get_active_violations_grouped(), get_seller_contact, render_day_email,
+                                    get_excluded_sellers_lower(), days, sellers)
+    result = {'planned': len(notices), 'skipped': skipped}
+    if dry_run:
+        result['notices'] = [{key: n[key] for key in ('seller_name', 'day', 'recipients', 'subject', 'violation_ids')}
+                             for n in notices]
+        return result
+
+    dispatcher = Dispatcher(
+        partial(get_db, get_db_path()),
+        host=get_setting('SMTP_HOST'), port=get_setting('SMTP_PORT'), sender=get_setting('SMTP_SENDER'),
+        username=get_setting('SMTP_USERNAME'), password=get_setting('SMTP_PASSWORD'),
+        starttls=get_setting('SMTP_STARTTLS'), rate_per_domain=get_setting('EMAIL_RATE_PER_DOMAIN'),
+        connections=get_setting('EMAIL_CONNECTIONS'), max_attempts=get_setting('EMAIL_MAX_ATTEMPTS'),
+    )
+    if background:
+        dispatcher.enqueue(notices)
+        threading.Thread(target=_send_in_background, name='email-dispatch', daemon=True,
+                         args=(current_app._get_current_object(), dispatcher, notices)).start()
+        result['queued'] = len(notices)
+        return result
+
+    result.update(asyncio.run(dispatcher.run(notices)))
+    _notify_delivered(result)
+    return result
+
+def _notify_delivered(report):
+    delivered = sorted({r['seller_name'] for r in report['results'] if r['status'] == 'sent'})
+    if delivered:
+        notify_violations_changed(sellers=delivered)
+
+def _send_in_background(app, dispatcher, notices):
+    """Thread target of dispatch_notices(background=True)
+
+    If the worker exits first, unsent notices stay queued (and one being sent
+    stays claimed for CLAIM_TIMEOUT); the next run picks them up.
+    """
+    with app.app_context():
+        try:
+            report = asyncio.run(dispatcher.run(notices))
+        except Exception as e:
+            print(f"ERROR in email dispatch: {str(e)}")
+            return
+        print(f"Email dispatch: {report['sent']} sent, {report['failed']} failed, "
+              f"{report['duplicates']} duplicates")
+        _notify_delivered(report)
+
+def build_tracker_csv(include_archived=False):
+    """Build the tracker CSV export (all violations, every column)
+
+    With include_archived the archived RESOLVED rows are appended (extra
+    archived_date column, empty for rows still in the tracker).
+    """
+    table = 'violations_all' if include_archived else 'violations'
+    with get_snapshot() as conn:
+        cursor = conn.cursor()
+        violations = cursor.execute(f'SELECT * FROM {table}').fetchall()
+
+    # Create CSV in memory
+    output = io.StringIO()
+    if violations:
+        headers = violations[0].keys()
+        output.write(','.join(headers) + '\n')
+        for v in violations:
+            output.write(','.join(str(v[h]) for h in headers) + '\n')
+
+    return output.getvalue()
+
+# ============================================================================
+# TRACKER ACTIONS
+# ============================================================================
+# Each action applies one dashboard operation on an open cursor and returns the
+# number of rows it changed. The single-action routes and /api/batch share them;
+# the caller owns the transaction and the store notification.
+
+def action_mark_email(cursor, data):
+    """Mark first/second email as sent for one violation"""
+    violation_id = data.get('violation_id')
+    email_type = data.get('email_type')  # 'first' or 'second'
+
+    if email_type == 'first':
+        cursor.execute('UPDATE violations SET first_email_sent_date = date("now") WHERE id = ?', (violation_id,))
+    elif email_type == 'second':
+        cursor.execute('UPDATE violations SET second_email_sent_date = date("now") WHERE id = ?', (violation_id,))
+    else:
+        return 0
+    return cursor.rowcount
+
+def action_mark_all_emails(cursor, data):
+    """Mark all Day 1 (day=0) or Day 2 (day=1) emails of a seller as sent"""
+    seller_name = data.get('seller_name')
+    day = data.get('day')  # 0 for DAY_1, 1 for DAY_2
+
+    if day == 0:
+        # Mark all DAY 1 violations as first email sent
+        cursor.execute('''
+            UPDATE violations
+            SET first_email_sent_date = date("now")
+            WHERE seller_name = ? AND days_active = 0 AND status = 'ACTIVE'
+        ''', (seller_name,))
+    elif day == 1:
+        # Mark all DAY 2 violations as second email sent
+        cursor.execute('''
+            UPDATE violations
+            SET second_email_sent_date = date("now")
+            WHERE seller_name = ? AND days_active = 1 AND status = 'ACTIVE'
+        ''', (seller_name,))
+    else:
+        raise ValueError(f'Invalid day value: {day}')
+    return cursor.rowcount
+
+def action_mark_dns(cursor, data):
+    """Mark individual violation as added to DNS"""
+    cursor.execute('UPDATE violations SET dns_added_date = date("now") WHERE id = ?', (data.get('violation_id'),))
+    return cursor.rowcount
+
+def action_delete_violation(cursor, data):
+    """Delete violation from tracker"""
+    cursor.execute('DELETE FROM violations WHERE id = ?', (data.get('violation_id'),))
+    return cursor.rowcount
+
+def action_send_to_boss(cursor, data):
+    """Mark a seller's Day 3+ violations as pending approval (sent to Daniel)"""
+    cursor.execute('''
+        UPDATE violations
+        SET pending_approval = 1
+        WHERE seller_name = ? AND days_active >= 2 AND status = 'ACTIVE'
+    ''', (data.get('seller_name'),))
+    return cursor.rowcount
+
+def action_approve_dns(cursor, data):
+    """Approve and add to DNS (boss approved)"""
+    cursor.execute('''
+        UPDATE violations
+        SET dns_added_date = date("now"), pending_approval = 0
+        WHERE seller_name = ? AND pending_approval = 1 AND status = 'ACTIVE'
+    ''', (data.get('seller_name'),))
+    return cursor.rowcount
+
+def action_reject_dns(cursor, data):
+    """Reject DNS addition (boss rejected) or remove from DNS"""
+    # Reset both pending_approval and dns_added_date
+    cursor.execute('''
+        UPDATE violations
+        SET pending_approval = 0, dns_added_date = NULL
+        WHERE seller_name = ? AND status = 'ACTIVE'
+    ''', (data.get('seller_name'),))
+    return cursor.rowcount
+
+# Operations accepted by /api/batch
+BATCH_ACTIONS = {
+    'mark-email': action_mark_email,
+    'mark-all-emails': action_mark_all_emails,
+    'mark-dns': action_mark_dns,
+    'delete-violation': action_delete_violation,
+    'send-to-boss': action_send_to_boss,
+    'approve-dns': action_approve_dns,
+    'reject-dns': action_reject_dns,
+}
+
+@bp.route('/')
+def index():
+    """Main page"""
+    return render_template('index.html')
+
+def upload_response(uploaded_filename, stage_files, force_upload=False):
+    """Sync staged workbooks and build the dashboard response (shared by /upload
+    and chunked uploads)
+
+    Args:
+        uploaded_filename (str): Display name of the upload (comma-separated files)
+        stage_files (list): One callable per file: place_file(file_dir) puts the
+            workbook in file_dir under its original name and returns its path
+        force_upload (bool): Sync even if an upload was already logged today
+    """
+    # Check if already uploaded today
+    existing_upload = check_upload_today()
+
+    if existing_upload and not force_upload:
+        # Return existing tracker data with complete structure
+        grouped = get_active_violations_grouped()
+        
+        # APPLY EXCLUSIONS TO EXISTING TRACKER DATA
+        grouped, excluded_count = filter_excluded_sellers_from_grouped(grouped)
+        
+        # Prepare complete response data like in normal flow
+        payload = dashboard_payload(grouped)
+
+        return sellers_response({
             'success': True,
+            'duplicate_detected': True,
             'tracking_enabled': True,
+            'existing_upload': existing_upload,
+            **payload,
+            'uploaded_filename': uploaded_filename,
+            'upload_date': existing_upload['upload_date'],
+            'message': f"File already uploaded today at {existing_upload['upload_time']}. Showing current tracker data."
+        })
+
+    # Wall time and peak memory of every stage, stored with the upload
+    metrics = StageMetrics(get_setting('UPLOAD_TRACE_MEMORY'))
+    try:
+        # Stage uploaded files under their original names; once synced they are
+        # kept in the content-addressed upload archive, so staging is discarded
+        with tempfile.TemporaryDirectory(dir=current_app.config['UPLOAD_FOLDER']) as staging:
+            filepaths = []
+            for i, place_file in enumerate(stage_files):
+                file_dir = os.path.join(staging, str(i))
+                os.mkdir(file_dir)
+                filepaths.append(place_file(file_dir))
+
+            # Process violations (workbooks are parsed in parallel and merged)
+            result = ingest_workbooks(filepaths, uploaded_filename, metrics)
+
+        # The body is serialized and compressed inside the stage (not lazily
+        # while it is sent), so the stage measures the whole response cost
+        with metrics.stage('respond'):
+            response = materialize(ingest_response(result, uploaded_filename),
+                                   current_app.config['COMPRESS_MIN_SIZE'])
+    finally:
+        metrics.close()
+
+    save_upload_metrics(metrics, uploaded_filename, len(stage_files), result)
+    return response
+
+def ingest_response(result, uploaded_filename):
+    """Dashboard response for an ingest_workbooks() result"""
+    total_rows = result['total_rows']
+
+    if result['status'] == 'no_violations':
+        return jsonify({
+            'success': True,
+            'no_violations': True,
             'total_rows': total_rows,
-            'total_active_violations': len(included_violations),
-            'unique_violators': unique_violators,
-            'day_1_count': total_day1,
-            'day_2_count': total_day2,
-            'day_3_count': total_day3,
-            'sellers': sellers_data,
-            'uploaded_filename': file.filename,
+            'uploaded_filename': uploaded_filename,
             'upload_date': date.today().isoformat(),
-            'message': f'Tracker updated: {total_day1} new, {total_day2} at 24h, {total_day3} at 48h+'
+            'message': 'No violations found! All sellers are complying with MAP policy.'
+        })
+
+    # Check if we have any processable violations after excluding sellers
+    if result['status'] == 'excluded_only':
+        return jsonify({
+            'success': True,
+            'no_violations': True,
+            'total_rows': total_rows,
+            'message': 'All violations are from excluded sellers.'
         })
 
+    # GET TRACKED VIOLATIONS (grouped by seller)
+    grouped_tracked = get_active_violations_grouped()
+
+    # Prepare response data with tracking info
+    payload = dashboard_payload(grouped_tracked)
+    total_day1, total_day2, total_day3 = payload['day_1_count'], payload['day_2_count'], payload['day_3_count']
+
+    return sellers_response({
+        'success': True,
+        'tracking_enabled': True,
+        'total_rows': total_rows,
+        **payload,
+        'total_active_violations': result['included_violations'],
+        'uploaded_filename': uploaded_filename,
+        'upload_date': date.today().isoformat(),
+        'message': f'Tracker updated: {total_day1} new, {total_day2} at 24h, {total_day3} at 48h+'
+    })
+
+def save_upload(file, file_dir):
+    """Save a multipart upload in file_dir under its original name"""
+    filepath = os.path.join(file_dir, os.path.basename(file.filename))
+    file.save(filepath)
+    return filepath
+
+@bp.route('/upload', methods=['POST'])
+def upload_file():
+    """Handle file upload and process violations with tracking"""
+    if 'file' not in request.files:
+        return create_error_response('No file uploaded', 400)
+
+    # Several workbooks can be submitted together (one per marketplace/brand)
+    files = [f for f in request.files.getlist('file') if f.filename != '']
+
+    if not files:
+        return create_error_response('No file selected', 400)
+
+    for file in files:
+        message = unsupported_message(file.filename)
+        if message:
+            return create_error_response(message, 400)
+
+    uploaded_filename = ', '.join(file.filename for file in files)
+
+    try:
+        force_upload = request.form.get('force_upload') == 'true'
+        stage_files = [partial(save_upload, file) for file in files]
+        return upload_response(uploaded_filename, stage_files, force_upload)
+
     except Exception as e:
         print(f"ERROR in /upload: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': f'Error processing file: {str(e)}'}), 500
 
-@app.route('/get-email-content/<filename>')
+# ============================================================================
+# CHUNKED UPLOADS (resumable, for workbooks above MAX_CONTENT_LENGTH)
+# ============================================================================
+# Protocol (see chunked_upload.py):
+#   POST   /api/uploads                      {filename, size}  -> upload_id, chunk_size, total_chunks
+#   GET    /api/uploads/<id>                 acknowledged chunks (resume after a dropped connection)
+#   PUT    /api/uploads/<id>/chunks/<n>      raw chunk body, X-Chunk-CRC32 header
+#   POST   /api/uploads/complete             {upload_ids, force_upload} -> same response as /upload
+#   DELETE /api/uploads/<id>                 abandon an upload
+
+@bp.route('/api/uploads', methods=['POST'])
+def create_chunked_upload():
+    """Open a chunked upload session for one workbook"""
+    data = request.get_json(silent=True) or {}
+    try:
+        status = create_session(current_app.config['UPLOAD_FOLDER'], data.get('filename'),
+                                data.get('size'), data.get('chunk_size'))
+        return jsonify({'success': True, **status}), 201
+    except ValueError as e:
+        return create_error_response(str(e), 400)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """Acknowledged chunks of an upload session"""
+    try:
+        return jsonify({'success': True, **session_status(current_app.config['UPLOAD_FOLDER'], upload_id)})
+    except FileNotFoundError as e:
+        return create_error_response(str(e), 404)
+
+@bp.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """Store one chunk, streamed from the request body to disk"""
+    try:
+        status = write_chunk(current_app.config['UPLOAD_FOLDER'], upload_id, index,
+                             request.stream, request.headers.get('X-Chunk-CRC32'))
+        return jsonify({'success': True, 'chunk': index,
+                        'received': len(status['received']), 'complete': status['complete']})
+    except FileNotFoundError as e:
+        return create_error_response(str(e), 404)
+    except ValueError as e:
+        return create_error_response(str(e), 400)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def delete_chunked_upload(upload_id):
+    """Abandon an upload session"""
+    try:
+        discard_session(current_app.config['UPLOAD_FOLDER'], upload_id)
+        return jsonify({'success': True})
+    except FileNotFoundError as e:
+        return create_error_response(str(e), 404)
+
+@bp.route('/api/uploads/complete', methods=['POST'])
+def complete_chunked_upload():
+    """Sync completed chunked uploads as one upload (same response as /upload)"""
+    data = request.get_json(silent=True) or {}
+    upload_ids = data.get('upload_ids') or []
+    if not upload_ids:
+        return create_error_response('No upload_ids given', 400)
+
+    # Unknown or incomplete sessions are kept: the client resumes them (or
+    # prune_sessions() drops them once abandoned)
+    folder = current_app.config['UPLOAD_FOLDER']
+    try:
+        sessions = [session_status(folder, upload_id) for upload_id in upload_ids]
+    except FileNotFoundError as e:
+        return create_error_response(str(e), 404)
+
+    incomplete = [s['upload_id'] for s in sessions if not s['complete']]
+    if incomplete:
+        return create_error_response(f"Uploads not complete yet: {', '.join(incomplete)}", 409)
+
+    uploaded_filename = ', '.join(s['filename'] for s in sessions)
+
+    try:
+        # The assembled data file is renamed into staging: no copy of the body
+        stage_files = [partial(take_file, folder, upload_id) for upload_id in upload_ids]
+        return upload_response(uploaded_filename, stage_files, bool(data.get('force_upload')))
+    except Exception as e:
+        print(f"ERROR in /api/uploads/complete: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Error processing file: {str(e)}'}), 500
+    finally:
+        # Sessions the ingest did not take (already uploaded today, failed
+        # sync) are closed as well: a completed upload is never completed again
+        for upload_id in upload_ids:
+            try:
+                discard_session(folder, upload_id)
+            except FileNotFoundError:
+                pass
+
+@bp.route('/get-email-content/<filename>')
 def get_email_content(filename):
     """Get email content as JSON for clipboard copy with HTML format"""
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+        file_path = os.path.join(current_app.config['OUTPUT_FOLDER'], filename)
         
         # Check if file exists
         if not os.path.exists(file_path):
@@ -857,11 +1712,11 @@ def get_email_content(filename):
     except Exception as e:
         return jsonify({'error': f'Error reading file: {str(e)}'}), 500
 
-@app.route('/verify-data/<filename>')
+@bp.route('/verify-data/<filename>')
 def verify_data(filename):
     """Get detailed verification data for a seller"""
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+        file_path = os.path.join(current_app.config['OUTPUT_FOLDER'], filename)
         if not os.path.exists(file_path):
             return jsonify({'error': 'File not found'}), 404
         
@@ -873,16 +1728,16 @@ def verify_data(filename):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/download/<filename>')
+@bp.route('/download/<filename>')
 def download_file(filename):
     """Download individual email file"""
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+        file_path = os.path.join(current_app.config['OUTPUT_FOLDER'], filename)
         return send_file(file_path, as_attachment=True, download_name=filename)
     except Exception as e:
         return jsonify({'error': f'File not found: {str(e)}'}), 404
 
-@app.route('/download-all')
+@bp.route('/download-all')
 def download_all():
     """Download all emails as ZIP"""
     try:
@@ -890,7 +1745,7 @@ def download_all():
         memory_file = io.BytesIO()
 
         with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            output_path = Path(app.config['OUTPUT_FOLDER'])
+            output_path = Path(current_app.config['OUTPUT_FOLDER'])
             for file_path in output_path.glob('*.txt'):
                 zf.write(file_path, file_path.name)
 
@@ -906,295 +1761,393 @@ def download_all():
     except Exception as e:
         return jsonify({'error': f'Error creating ZIP: {str(e)}'}), 500
 
-@app.route('/api/mark-email', methods=['POST'])
+@bp.route('/api/mark-email', methods=['POST'])
 def mark_email_sent():
     """Mark email as sent for a violation"""
     try:
         data = request.json
-        violation_id = data.get('violation_id')
-        email_type = data.get('email_type')  # 'first' or 'second'
 
         with get_db() as conn:
-            cursor = conn.cursor()
-            if email_type == 'first':
-                cursor.execute('UPDATE violations SET first_email_sent_date = date("now") WHERE id = ?', (violation_id,))
-            elif email_type == 'second':
-                cursor.execute('UPDATE violations SET second_email_sent_date = date("now") WHERE id = ?', (violation_id,))
+            action_mark_email(conn.cursor(), data)
+
+        notify_violations_changed(violation_ids=[data.get('violation_id')])
 
         return create_success_response()
     except Exception as e:
         return create_error_response(str(e))
 
-@app.route('/api/mark-all-emails', methods=['POST'])
+@bp.route('/api/mark-all-emails', methods=['POST'])
 def mark_all_emails_sent():
     """Mark all emails as sent for a seller by day"""
     try:
         data = request.json
-        seller_name = data.get('seller_name')
-        day = data.get('day')  # 0 for DAY_1, 1 for DAY_2
-        
 
         with get_db() as conn:
-            cursor = conn.cursor()
-            rows_affected = 0
-            
-            if day == 0:
-                # Mark all DAY 1 violations as first email sent
-                cursor.execute('''
-                    UPDATE violations
-                    SET first_email_sent_date = date("now")
-                    WHERE seller_name = ? AND days_active = 0 AND status = 'ACTIVE'
-                ''', (seller_name,))
-                rows_affected = cursor.rowcount
-                
-            elif day == 1:
-                # Mark all DAY 2 violations as second email sent
-                cursor.execute('''
-                    UPDATE violations
-                    SET second_email_sent_date = date("now")
-                    WHERE seller_name = ? AND days_active = 1 AND status = 'ACTIVE'
-                ''', (seller_name,))
-                rows_affected = cursor.rowcount
-            else:
-                return jsonify({'error': f'Invalid day value: {day}'}), 400
-            
-            conn.commit()
+            rows_affected = action_mark_all_emails(conn.cursor(), data)
+
+        notify_violations_changed(sellers=[data.get('seller_name')])
 
         return jsonify({'success': True, 'rows_affected': rows_affected})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/mark-dns', methods=['POST'])
+@bp.route('/api/mark-dns', methods=['POST'])
 def mark_violation_dns():
     """Mark individual violation as added to DNS"""
     try:
         data = request.json
-        violation_id = data.get('violation_id')
 
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('UPDATE violations SET dns_added_date = date("now") WHERE id = ?', (violation_id,))
+            action_mark_dns(conn.cursor(), data)
+
+        notify_violations_changed(violation_ids=[data.get('violation_id')])
 
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/tracker-violations', methods=['GET'])
-def get_tracker_violations():
-    """Get all violations from tracker for management"""
+@bp.route('/api/batch', methods=['POST'])
+def batch_actions():
+    """Apply an ordered list of dashboard operations in ONE transaction
+
+    Body: {"operations": [{"op": "mark-email", "violation_id": 1, "email_type": "first"},
+                          {"op": "mark-all-emails", "seller_name": "X", "day": 0},
+                          {"op": "send-to-boss", "seller_name": "X"}, ...]}
+
+    All operations commit together or not at all; the response carries one
+    result per operation, and the store is refreshed once for the whole batch.
+    """
+    data = request.json or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return create_error_response('operations must be a non-empty list', 400)
+
+    results = []
+    sellers = set()
+    violation_ids = set()
+
     try:
         with get_db() as conn:
             cursor = conn.cursor()
-            violations = cursor.execute('''
-                SELECT * FROM violations
-                ORDER BY status, seller_name, days_active DESC
-            ''').fetchall()
+            for index, operation in enumerate(operations):
+                op = operation.get('op') if isinstance(operation, dict) else None
+                action = BATCH_ACTIONS.get(op)
+                try:
+                    if action is None:
+                        raise ValueError(f'Unknown operation: {op}')
+                    rows_affected = action(cursor, operation)
+                except Exception as e:
+                    results.append({'index': index, 'op': op, 'success': False, 'error': str(e)})
+                    raise BatchAborted(index)
+
+                results.append({'index': index, 'op': op, 'success': True, 'rows_affected': rows_affected})
+                if operation.get('seller_name') is not None:
+                    sellers.add(operation['seller_name'])
+                if operation.get('violation_id') is not None:
+                    violation_ids.add(operation['violation_id'])
+    except BatchAborted as aborted:
+        # Whole transaction rolled back: report the failing op and skip the rest
+        for result in results[:aborted.index]:
+            result.update(success=False, rows_affected=0,
+                          error=f'Rolled back: operation {aborted.index} failed')
+        for index in range(aborted.index + 1, len(operations)):
+            results.append({'index': index, 'op': operations[index].get('op') if isinstance(operations[index], dict) else None,
+                            'success': False, 'error': f'Not run: operation {aborted.index} failed'})
+        return jsonify({'success': False, 'error': results[aborted.index]['error'], 'results': results}), 400
+    except Exception as e:
+        return create_error_response(str(e))
+
+    # One store refresh (and one data version bump) for the whole batch
+    notify_violations_changed(sellers=sellers, violation_ids=violation_ids)
+
+    return jsonify({'success': True, 'results': results})
+
+@bp.route('/api/tracker-violations', methods=['GET'])
+def get_tracker_violations():
+    """Get all violations from tracker for management
+
+    Rows are streamed straight from the cursor; ?shape=compact sends
+    {'columns': [...], 'rows': [[...], ...]} instead of one object per row.
+    ?include_archived=1 adds the archived RESOLVED rows (see retention.py).
+
+    The rows come from a read transaction pinned when the request starts, so
+    a slow client never sees a sync half applied and writers are not blocked.
+    """
+    table = 'violations_all' if request.args.get('include_archived') == '1' else 'violations'
+    try:
+        snapshot = Snapshot(get_db_path(), timeout=BUSY_TIMEOUT)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    try:
+        cursor = snapshot.execute(f'''
+            SELECT * FROM {table}
+            ORDER BY status, seller_name, days_active DESC
+        ''')
+        columns = [c[0] for c in cursor.description]
+    except Exception as e:
+        snapshot.close()
+        return jsonify({'error': str(e)}), 500
+
+    compact = wants_compact()
+
+    rows = (list(row) if compact else dict(zip(columns, row)) for row in cursor)
+    if compact:
+        response = stream_json({'success': True, 'shape': 'compact', 'columns': columns}, 'rows', rows)
+    else:
+        response = stream_json({'success': True}, 'violations', rows)
+    # The pinned transaction is released once the response has been sent (or aborted)
+    response.call_on_close(snapshot.close)
+    return response
+
+@bp.route('/api/search', methods=['GET'])
+def search():
+    """Ranked full-text search over sellers, SKUs, descriptions and links
+
+    Query args: q (required), limit (default 50, max 200), active_only=1.
+    Searches tracked and archived violations; matches come highlighted with <mark>.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return create_error_response('Missing search text (q)', 400)
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except ValueError:
+        return create_error_response('limit must be a number', 400)
+
+    try:
+        with get_db() as conn:
+            results = search_violations(conn, query, limit,
+                                        active_only=request.args.get('active_only') == '1')
+        return jsonify({'success': True, 'query': query, 'count': len(results), 'results': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/top-offenders', methods=['GET'])
+def top_offenders():
+    """Worst ACTIVE sellers and SKUs by severity score
+
+    Query args: n (default 20, max 200). Served from the severity index, so
+    the cost depends on n, not on the size of the tracker.
+    """
+    try:
+        limit = min(max(int(request.args.get('n', 20)), 1), 200)
+    except ValueError:
+        return create_error_response('n must be a number', 400)
+
+    try:
+        # Both lists from the same state of the tracker
+        with get_snapshot() as conn:
+            return jsonify({
+                'success': True,
+                'sellers': top_sellers(conn, limit),
+                'violations': top_violations(conn, limit),
+            })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        violations_list = [dict(v) for v in violations]
-        return jsonify({'success': True, 'violations': violations_list})
+@bp.route('/api/diff-report', methods=['GET'])
+def get_diff_report():
+    """What changed with one upload: new, reactivated, price-changed and
+    resolved violations, plus sellers that cleaned up completely
+
+    Query args: date (YYYY-MM-DD, default the latest upload)
+    """
+    upload_date = request.args.get('date')
+    if upload_date:
+        try:
+            upload_date = date.fromisoformat(upload_date).isoformat()
+        except ValueError:
+            return create_error_response('date must be YYYY-MM-DD', 400)
+
+    try:
+        with get_snapshot() as conn:
+            report = diff_report(conn, upload_date)
+        if report is None:
+            return create_error_response('No diff recorded for that upload', 404)
+        return jsonify({'success': True, **report})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/delete-violation', methods=['POST'])
+@bp.route('/api/upload-metrics', methods=['GET'])
+def get_upload_metrics():
+    """Wall time and peak memory per ingest stage of the latest uploads, plus
+    per-release averages of each stage (synced uploads)
+
+    Query args: limit (uploads, default 30), since (YYYY-MM-DD, summary only)
+    """
+    since = request.args.get('since')
+    if since:
+        try:
+            since = date.fromisoformat(since).isoformat()
+        except ValueError:
+            return create_error_response('since must be YYYY-MM-DD', 400)
+
+    try:
+        limit = min(request.args.get('limit', 30, type=int), 1000)
+        with get_snapshot() as conn:
+            uploads = recent_upload_metrics(conn, limit)
+            summary = stage_summary(conn, since)
+        return jsonify({'success': True, 'uploads': uploads, 'summary': summary})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/delete-violation', methods=['POST'])
 def delete_violation():
     """Delete violation from tracker"""
     try:
         data = request.json
-        violation_id = data.get('violation_id')
 
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM violations WHERE id = ?', (violation_id,))
+            action_delete_violation(conn.cursor(), data)
+
+        notify_violations_changed(violation_ids=[data.get('violation_id')])
 
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/send-to-boss', methods=['POST'])
+@bp.route('/api/send-to-boss', methods=['POST'])
 def send_to_boss():
     """Mark violations as pending approval (sent to Daniel)"""
     try:
         data = request.json
-        seller_name = data.get('seller_name')
 
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE violations
-                SET pending_approval = 1
-                WHERE seller_name = ? AND days_active >= 2 AND status = 'ACTIVE'
-            ''', (seller_name,))
-            conn.commit()
+            action_send_to_boss(conn.cursor(), data)
+
+        notify_violations_changed(sellers=[data.get('seller_name')])
 
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/approve-dns', methods=['POST'])
+@bp.route('/api/approve-dns', methods=['POST'])
 def approve_dns():
     """Approve and add to DNS (boss approved)"""
     try:
         data = request.json
-        seller_name = data.get('seller_name')
 
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE violations
-                SET dns_added_date = date("now"), pending_approval = 0
-                WHERE seller_name = ? AND pending_approval = 1 AND status = 'ACTIVE'
-            ''', (seller_name,))
-            conn.commit()
+            action_approve_dns(conn.cursor(), data)
+
+        notify_violations_changed(sellers=[data.get('seller_name')])
 
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reject-dns', methods=['POST'])
+@bp.route('/api/reject-dns', methods=['POST'])
 def reject_dns():
     """Reject DNS addition (boss rejected) or remove from DNS"""
     try:
         data = request.json
-        seller_name = data.get('seller_name')
 
         with get_db() as conn:
-            cursor = conn.cursor()
-            # Reset both pending_approval and dns_added_date
-            cursor.execute('''
-                UPDATE violations
-                SET pending_approval = 0, dns_added_date = NULL
-                WHERE seller_name = ? AND status = 'ACTIVE'
-            ''', (seller_name,))
-            conn.commit()
+            action_reject_dns(conn.cursor(), data)
+
+        notify_violations_changed(sellers=[data.get('seller_name')])
 
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/get-current-violations', methods=['GET'])
-def get_current_violations():
-    """Get current violations without re-processing file"""
+@bp.route('/api/escalations/preview', methods=['GET'])
+def preview_escalations():
+    """Every seller needing an escalation decision, found with one grouped query
+
+    send_to_boss: Day 3+ violations not yet pending nor in DNS
+    awaiting: violations pending approval (approve or reject)
+    """
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            violations = cursor.execute('''
-                SELECT * FROM violations
-                WHERE status = 'ACTIVE'
-                ORDER BY seller_name, days_active DESC
-            ''').fetchall()
+            candidates = escalation_candidates(conn, get_excluded_sellers_lower())
+        return jsonify({'success': True, **candidates,
+                        'counts': {name: len(sellers) for name, sellers in candidates.items()}})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Group by seller (same logic as /upload)
-        grouped = {}
-        for v in violations:
-            seller = v['seller_name']
-            if seller not in grouped:
-                grouped[seller] = []
-            grouped[seller].append(dict(v))
+@bp.route('/api/escalations/apply', methods=['POST'])
+def apply_escalations():
+    """Apply escalation decisions for many sellers in ONE transaction
 
-        # Build sellers data
-        sellers_data = []
-        total_day1 = total_day2 = total_day3 = 0
-        total_active_violations = 0
-        unique_violators = len(grouped)  # Número de violadores únicos
+    Body: {"send_to_boss": [...] | "all", "approve": [...] | "all", "reject": [...] | "all"}
+
+    Returns the rows changed per decision and one management summary of the
+    batch; the store is refreshed once for all affected sellers.
+    """
+    data = request.json or {}
+    excluded = get_excluded_sellers_lower()
 
+    try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            
-            for seller_name, violations_list in grouped.items():
-                contact_info = get_seller_contact(seller_name)
-
-                products = []
-                for v in violations_list:
-                    total_active_violations += 1  # Contar violaciones totales
-                    # Determine day status
-                    if v['days_active'] == 0:
-                        day_status = 'DAY_1'
-                        total_day1 += 1
-                    elif v['days_active'] == 1:
-                        day_status = 'DAY_2'
-                        total_day2 += 1
-                    else:
-                        day_status = 'DAY_3'
-                        total_day3 += 1
-
-                    products.append({
-                        'id': v['id'],
-                        'sku': v['sku'],
-                        'description': v['product_description'],
-                        'current_price': v['current_price'],
-                        'map_price': v['map_price'],
-                        'first_detected': v['first_detected_date'],
-                        'days_active': v['days_active'],
-                        'day_status': day_status,
-                        'first_email_sent': bool(v['first_email_sent_date']),
-                        'second_email_sent': bool(v['second_email_sent_date']),
-                        'pending_approval': bool(v.get('pending_approval', 0)),
-                        'in_dns': bool(v.get('dns_added_date')),
-                        'seller_link': v['seller_link']
-                    })
-
-                has_pending = any(p['pending_approval'] for p in products)
-                has_in_dns = any(p['in_dns'] for p in products)
-
-                # Get email tracking status for this seller
-                cursor.execute("""
-                    SELECT 
-                        COUNT(CASE WHEN first_email_sent_date IS NOT NULL THEN 1 END) as first_emails_sent,
-                        COUNT(CASE WHEN second_email_sent_date IS NOT NULL THEN 1 END) as second_emails_sent,
-                        MAX(first_email_sent_date) as first_email_date,
-                        MAX(second_email_sent_date) as second_email_date,
-                        MAX(dns_added_date) as dns_added_date
-                    FROM violations 
-                    WHERE seller_name = ? AND status = 'ACTIVE'
-                """, (seller_name,))
-                
-                tracking_data = cursor.fetchone()
-
-                sellers_data.append({
-                    'name': seller_name,
-                    'contact': contact_info,
-                    'products': products,
-                    'pending_approval': has_pending,
-                    'in_dns': has_in_dns,
-                    'first_emails_sent': tracking_data[0] or 0,
-                    'second_emails_sent': tracking_data[1] or 0,
-                    'first_email_date': tracking_data[2],
-                    'second_email_date': tracking_data[3],
-                    'dns_added_date': tracking_data[4]
-                })
+            candidates = escalation_candidates(conn, excluded)
+            decisions = resolve_decisions(candidates, data)
+            rows = apply_decisions(conn, decisions)
+            remaining = escalation_candidates(conn, excluded)
+    except ValueError as e:
+        return create_error_response(str(e), 400)
+    except Exception as e:
+        return create_error_response(str(e))
 
-        return jsonify({
+    notify_violations_changed(sellers=[seller for sellers in decisions.values() for seller in sellers])
+
+    return jsonify({
+        'success': True,
+        'decisions': decisions,
+        'rows_affected': rows,
+        'summary': management_summary(candidates, decisions, rows, remaining),
+    })
+
+@bp.route('/api/get-current-violations', methods=['GET'])
+def get_current_violations():
+    """Get current violations without re-processing file
+
+    One summary row per seller; ?products=1 embeds every product row.
+    """
+    try:
+        payload = dashboard_payload(get_active_violations_grouped())
+        return sellers_response({
             'success': True,
             'tracking_enabled': True,
-            'total_active_violations': total_active_violations,
-            'unique_violators': unique_violators,
-            'day_1_count': total_day1,
-            'day_2_count': total_day2,
-            'day_3_count': total_day3,
-            'sellers': sellers_data
+            **payload
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/export-tracker', methods=['GET'])
-def export_tracker():
-    """Export tracker to CSV"""
-    try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            violations = cursor.execute('SELECT * FROM violations').fetchall()
+@bp.route('/api/sellers/<path:seller_name>/violations', methods=['GET'])
+def get_seller_violations(seller_name):
+    """Product rows of one seller, loaded when its card is opened
 
-        # Create CSV in memory
-        output = io.StringIO()
-        if violations:
-            headers = violations[0].keys()
-            output.write(','.join(headers) + '\n')
-            for v in violations:
-                output.write(','.join(str(v[h]) for h in headers) + '\n')
+    The weak ETag is a hash of the payload, so a client re-opening a seller
+    that did not change gets a 304, whatever was written for other sellers.
+    ?shape=compact returns the products as {'columns': PRODUCT_FIELDS, 'rows': [...]}.
+    """
+    try:
+        violations_list = get_active_violations_grouped().get(seller_name)
+        if not violations_list:
+            return create_error_response(f'No active violations for {seller_name}', 404)
+
+        products = [product_payload(v) for v in violations_list]
+        if wants_compact():
+            response = jsonify({'success': True, 'seller': seller_name, 'shape': 'compact',
+                                'products': columnar(products, PRODUCT_FIELDS)})
+        else:
+            response = jsonify({'success': True, 'seller': seller_name, 'products': products})
+        response.headers['Cache-Control'] = 'no-cache'
+        response.add_etag(weak=True)
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        output.seek(0)
+@bp.route('/api/export-tracker', methods=['GET'])
+def export_tracker():
+    """Export tracker to CSV (?include_archived=1 adds archived violations)"""
+    try:
+        include_archived = request.args.get('include_archived') == '1'
         return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
+            io.BytesIO(build_tracker_csv(include_archived).encode('utf-8')),
             mimetype='text/csv',
             as_attachment=True,
             download_name=f'violations_tracker_{datetime.now().strftime("%Y%m%d")}.csv'
@@ -1202,228 +2155,177 @@ def export_tracker():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/get-email-by-day/<path:seller_name>/<int:day>', methods=['GET'])
+@bp.route('/api/get-email-by-day/<path:seller_name>/<int:day>', methods=['GET'])
 def get_email_by_day(seller_name, day):
     """Generate email for specific seller filtered by day status"""
     try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            violations = cursor.execute('''
-                SELECT * FROM violations
-                WHERE seller_name = ? AND days_active = ? AND status = 'ACTIVE'
-            ''', (seller_name, day)).fetchall()
+        # Served from the in-memory store (active violations of this seller)
+        violations_list = [v for v in get_store().seller(seller_name) if v.days_active == day]
 
-        if not violations:
+        if not violations_list:
             return jsonify({'error': 'No violations found'}), 404
 
-        violations_list = [dict(v) for v in violations]
-
-        # Determine email type and build body based on day
-        if day == 0:
-            # First Warning (Day 1)
-            subject = f"IMMEDIATE ACTION REQUIRED - Glen Dimplex MAP Violation ({len(violations_list)} Product{'s' if len(violations_list) > 1 else ''})"
-            warning_text = "first warning"
-
-            # Build product list
-            product_list_html = []
-            for v in violations_list:
-                map_html = f"<span style='font-size:15px; font-weight:700;'>${v['map_price']:.2f}</span>"
-                current_html = f"<span style='font-size:16px; font-weight:800; color:#e53e3e;'>${v['current_price']:.2f}</span>"
-                product_html = f"<li><strong>SKU {v['sku']}</strong> ({v['product_description']})<br>"
-                product_html += f"<strong>MAP:</strong> {map_html} &nbsp;|&nbsp; <strong>Your Price:</strong> {current_html}"
-                if v['seller_link'] and v['seller_link'] != 'N/A':
-                    product_html += f"<br><strong>Product Link:</strong> <a href='{v['seller_link']}'>{v['seller_link']}</a>"
-                product_html += "</li>"
-                product_list_html.append(product_html)
-
-            products_html = "<ul>" + "".join(product_list_html) + "</ul>"
-
-            body = f"""<div style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-<p>Hello,</p>
-
-<p>Your company is in violation of <strong>Glen Dimplex Americas Minimum Advertised Price (MAP) Policy</strong>.</p>
-
-<p>This is your <strong>{warning_text}</strong> for the following product(s):</p>
-
-{products_html}
-
-<p>Per our MAP policy, you are required to update the pricing in line with our MAP policy <strong style='color: #c53030;'>within 24 hours</strong>. If this violation is not corrected, GDA reserves the right to refuse purchase orders, stop future shipments, and/or suspend accounts at our discretion which may or may not be permanent.</p>
-
-<p>Please note that we have had a price change effective from <strong>October 1st, 2025</strong>, and the updated price lists have been provided to your distributors.</p>
-
-<p>If you have any questions about this MAP violation, please respond directly to this email. If you are not the correct person to receive this notice, please reply with the name, title, and contact information of the correct individual.</p>
-
-<p>Sincerely,<br>
-<strong>Glen Dimplex Americas MAP Enforcement Team</strong></p>
-</div>"""
-
-        elif day == 1:
-            # Second Warning (Day 2) - Follow-up Notice
-            subject = f"Glen Dimplex MAP Policy - Second Notice ({len(violations_list)} Product{'s' if len(violations_list) > 1 else ''})"
-
-            # Build product list
-            product_list_html = []
-            for v in violations_list:
-                map_html = f"<span style='font-size:15px; font-weight:700;'>${v['map_price']:.2f}</span>"
-                current_html = f"<span style='font-size:16px; font-weight:800; color:#e53e3e;'>${v['current_price']:.2f}</span>"
-                product_html = f"<li><strong>SKU {v['sku']}</strong> ({v['product_description']})<br>"
-                product_html += f"<strong>MAP:</strong> {map_html} &nbsp;|&nbsp; <strong>Your Price:</strong> {current_html}"
-                if v['seller_link'] and v['seller_link'] != 'N/A':
-                    product_html += f"<br><strong>Product Link:</strong> <a href='{v['seller_link']}'>{v['seller_link']}</a>"
-                product_html += "</li>"
-                product_list_html.append(product_html)
-
-            products_html = "<ul>" + "".join(product_list_html) + "</ul>"
-
-            body = f"""<div style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-<p>Hello,</p>
-
-<p>We wanted to follow up on our previous communication regarding <strong>Glen Dimplex Americas Minimum Advertised Price (MAP) Policy</strong> compliance.</p>
-
-<p><strong style='font-size: 16px;'>We have identified that the following product(s) remain in violation of our MAP policy:</strong></p>
-
-{products_html}
-
-<p><strong>Action Required:</strong> To maintain your account in good standing, please correct these pricing violations <strong>within the next 24 hours</strong>. 
-
-<p>We understand that pricing adjustments may take time to implement, and we appreciate your cooperation in maintaining MAP compliance. This helps ensure fair competition among all our retail partners.</p>
-
-<p>Per our MAP policy, continued non-compliance may result in account restrictions. GDA reserves the right to refuse purchase orders, stop future shipments, and/or suspend accounts at our discretion to maintain policy integrity.</p>
+        email_data = render_day_email(violations_list, day)
+        if email_data is None:
+            return jsonify({'error': 'Day 3+ should not generate emails'}), 400
 
-<p>Please note that we have had a price change effective from <strong>October 1st, 2025</strong>, and the updated price lists have been provided to your distributors.</p>
+        return jsonify({'success': True, 'subject': email_data['subject'], 'body': email_data['body']})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-<p>We value our partnership and hope to resolve this matter promptly. If you have any questions about this MAP violation or need assistance with compliance, please respond directly to this email.</p>
+@bp.route('/api/email-dispatch', methods=['POST'])
+def send_email_notices():
+    """Queue pending Day 1 / Day 2 notices for sending over SMTP
 
-<p>If you are not the correct person to receive this notice, please reply with the name, title, and contact information of the appropriate individual.</p>
+    Body: {"days": [1, 2], "sellers": [...], "dry_run": false} (all optional;
+    days default to both, sellers to every active seller with an address)
 
-<p>Thank you for your attention to this matter.</p>
+    Sending is paced per recipient domain and can take longer than a request
+    may run, so the notices are recorded as queued and sent in the background
+    (202); follow them with GET /api/email-dispatch. dry_run answers at once.
+    """
+    data = request.json or {}
+    try:
+        days = tuple(int(day) - 1 for day in data.get('days', (1, 2)))
+    except (TypeError, ValueError):
+        days = ()
+    if not days or any(day not in (0, 1) for day in days):
+        return create_error_response('days must be 1 and/or 2', 400)
 
-<p>Sincerely,<br>
-<strong>Glen Dimplex Americas MAP Enforcement Team</strong></p>
-</div>"""
-        else:
-            return jsonify({'error': 'Day 3+ should not generate emails'}), 400
+    try:
+        dry_run = bool(data.get('dry_run'))
+        result = dispatch_notices(days, data.get('sellers'), dry_run, background=not dry_run)
+        return jsonify({'success': True, **result}), 200 if dry_run else 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({'success': True, 'subject': subject, 'body': body})
+@bp.route('/api/email-dispatch', methods=['GET'])
+def get_email_dispatches():
+    """Latest dispatch log entries (status, attempts, last error per notice)"""
+    try:
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        with get_db() as conn:
+            dispatches = recent_dispatches(conn, limit)
+        return jsonify({'success': True, 'dispatches': dispatches})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/mark-first-email/<seller_name>', methods=['POST'])
+@bp.route('/api/mark-first-email/<seller_name>', methods=['POST'])
 def mark_first_email(seller_name):
     """Mark Day 1 emails as sent for a seller"""
     try:
-        conn = sqlite3.connect('violations_tracker.db')
-        cursor = conn.cursor()
+        with get_db() as conn:
+            cursor = conn.cursor()
         
-        current_date = datetime.now().isoformat()
+            current_date = datetime.now().isoformat()
         
-        cursor.execute("""
-            UPDATE violations 
-            SET first_email_sent_date = ?
-            WHERE seller_name = ? AND first_email_sent_date IS NULL
-        """, (current_date, seller_name))
+            cursor.execute("""
+                UPDATE violations 
+                SET first_email_sent_date = ?
+                WHERE seller_name = ? AND first_email_sent_date IS NULL
+            """, (current_date, seller_name))
         
-        rows_updated = cursor.rowcount
-        conn.commit()
-        conn.close()
+            rows_updated = cursor.rowcount
         
+        notify_violations_changed(sellers=[seller_name])
+
         return jsonify({'success': True, 'message': f'First email marked as sent for {rows_updated} products'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/mark-second-email/<seller_name>', methods=['POST'])
+@bp.route('/api/mark-second-email/<seller_name>', methods=['POST'])
 def mark_second_email(seller_name):
     """Mark Day 2 emails as sent for a seller"""
     try:
-        conn = sqlite3.connect('violations_tracker.db')
-        cursor = conn.cursor()
+        with get_db() as conn:
+            cursor = conn.cursor()
         
-        current_date = datetime.now().isoformat()
+            current_date = datetime.now().isoformat()
         
-        cursor.execute("""
-            UPDATE violations 
-            SET second_email_sent_date = ?
-            WHERE seller_name = ? AND second_email_sent_date IS NULL
-        """, (current_date, seller_name))
+            cursor.execute("""
+                UPDATE violations 
+                SET second_email_sent_date = ?
+                WHERE seller_name = ? AND second_email_sent_date IS NULL
+            """, (current_date, seller_name))
         
-        rows_updated = cursor.rowcount
-        conn.commit()
-        conn.close()
+            rows_updated = cursor.rowcount
         
+        notify_violations_changed(sellers=[seller_name])
+
         return jsonify({'success': True, 'message': f'Second email marked as sent for {rows_updated} products'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/revert-first-email/<seller_name>', methods=['POST'])
+@bp.route('/api/revert-first-email/<seller_name>', methods=['POST'])
 def revert_first_email(seller_name):
     """Revert Day 1 email status for a seller"""
     try:
-        conn = sqlite3.connect('violations_tracker.db')
-        cursor = conn.cursor()
+        with get_db() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            UPDATE violations 
-            SET first_email_sent_date = NULL
-            WHERE seller_name = ? AND first_email_sent_date IS NOT NULL
-        """, (seller_name,))
+            cursor.execute("""
+                UPDATE violations 
+                SET first_email_sent_date = NULL
+                WHERE seller_name = ? AND first_email_sent_date IS NOT NULL
+            """, (seller_name,))
         
-        rows_updated = cursor.rowcount
-        conn.commit()
-        conn.close()
+            rows_updated = cursor.rowcount
         
+        notify_violations_changed(sellers=[seller_name])
+
         return jsonify({'success': True, 'message': f'First email reverted for {rows_updated} products'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/revert-second-email/<seller_name>', methods=['POST'])
+@bp.route('/api/revert-second-email/<seller_name>', methods=['POST'])
 def revert_second_email(seller_name):
     """Revert Day 2 email status for a seller"""
     try:
-        conn = sqlite3.connect('violations_tracker.db')
-        cursor = conn.cursor()
+        with get_db() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            UPDATE violations 
-            SET second_email_sent_date = NULL
-            WHERE seller_name = ? AND second_email_sent_date IS NOT NULL
-        """, (seller_name,))
+            cursor.execute("""
+                UPDATE violations 
+                SET second_email_sent_date = NULL
+                WHERE seller_name = ? AND second_email_sent_date IS NOT NULL
+            """, (seller_name,))
         
-        rows_updated = cursor.rowcount
-        conn.commit()
-        conn.close()
+            rows_updated = cursor.rowcount
         
+        notify_violations_changed(sellers=[seller_name])
+
         return jsonify({'success': True, 'message': f'Second email reverted for {rows_updated} products'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/mark-dns-added/<seller_name>', methods=['POST'])
+@bp.route('/api/mark-dns-added/<seller_name>', methods=['POST'])
 def mark_dns_added(seller_name):
     """Mark seller as added to DNS (Day 3+ final action)"""
     try:
-        conn = sqlite3.connect('violations_tracker.db')
-        cursor = conn.cursor()
+        with get_db() as conn:
+            cursor = conn.cursor()
         
-        current_date = datetime.now().isoformat()
+            current_date = datetime.now().isoformat()
         
-        cursor.execute("""
-            UPDATE violations 
-            SET in_dns = 1, dns_added_date = ?, pending_approval = 0
-            WHERE seller_name = ? AND in_dns = 0
-        """, (current_date, seller_name))
+            cursor.execute("""
+                UPDATE violations 
+                SET in_dns = 1, dns_added_date = ?, pending_approval = 0
+                WHERE seller_name = ? AND in_dns = 0
+            """, (current_date, seller_name))
         
-        rows_updated = cursor.rowcount
-        conn.commit()
-        conn.close()
+            rows_updated = cursor.rowcount
         
+        notify_violations_changed(sellers=[seller_name])
+
         return jsonify({'success': True, 'message': f'DNS added for {rows_updated} products'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/get-email-status/<seller_name>')
+@bp.route('/api/get-email-status/<seller_name>')
 def get_email_status(seller_name):
     """Get email tracking status for a seller"""
     try:
-        conn = sqlite3.connect('violations_tracker.db')
+        conn = sqlite3.connect(get_db_path())
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -1463,4 +2365,6 @@ if __name__ == '__main__':
     print("\nStarting web server...")
     print("\nPress CTRL+C to stop the server")
     print("=" * 80)
+    app = create_app()
+    init_database(app.config['DB_PATH'])
     app.run(debug=True, host='127.0.0.1', port=5000)
@@ -0,0 +1,338 @@
+"""Static asset pipeline: bundled, minified, content-hashed CSS and JS
+
+At app startup build_assets() turns each bundle below into one file under
+static/dist/ named after a hash of its content (dashboard.3f9a1c2b7e0d.css),
+plus a gzip copy, and records the names in static/dist/manifest.json:
+
+- CSS: main.css with its @import-ed modules inlined in order (one request
+  instead of four), comments and redundant whitespace removed.
+- JS: the dashboard script with comments and indentation removed. String,
+  template and regex literals are copied as-is, and line breaks that could
+  end a statement are kept, so automatic semicolon insertion is unaffected.
+
+Templates call asset_url('css/main.css'), which returns the hashed URL under
+/assets/. Those files are served with `Cache-Control: public, max-age=31536000,
+immutable`: a changed file gets a new name, so browsers never revalidate and a
+repeat visit makes no asset requests at all. If the build fails (e.g. a
+read-only static folder) asset_url() falls back to the plain /static/ files.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+
+from flask import current_app, request, send_from_directory, url_for
+
+logger = logging.getLogger(__name__)
+
+# Source entry point (relative to the static folder) -> bundle name
+BUNDLES = {
+    'css/main.css': 'dashboard.css',
+    'js/dashboard.js': 'dashboard.js',
+}
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+# One year: hashed names never change content
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Previous builds kept per bundle, for pages rendered before a deploy
+KEEP_BUILDS = 3
+
+# Process umask, read once at import (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+_IMPORT = re.compile(r'''@import\s+(?:url\(\s*)?['"]?([^'")\s]+)['"]?\s*\)?\s*;''')
+
+_WORD = re.compile(r'[\w$\\]')
+
+# A '/' after one of these starts a regex literal, not a division
+_REGEX_AFTER_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+                      'void', 'throw', 'instanceof', 'yield', 'await'}
+
+# A line break next to these can be dropped without changing how ASI applies
+_JOIN_AFTER = set('{[(,;:=&|?')
+_JOIN_BEFORE = set('}]),;:.?')
+
+
+def inline_css_imports(path, seen=None):
+    """CSS of path with local @import rules replaced by the imported files"""
+    seen = set() if seen is None else seen
+    path = os.path.normpath(path)
+    if path in seen:
+        return ''
+    seen.add(path)
+    with open(path, encoding='utf-8') as f:
+        css = f.read()
+
+    def replace(match):
+        target = match.group(1)
+        if '//' in target:
+            return match.group(0)  # remote stylesheet: leave the rule alone
+        return inline_css_imports(os.path.join(os.path.dirname(path), target), seen)
+
+    return _IMPORT.sub(replace, css)
+
+
+def _skip_string(source, i):
+    """Index just past the quoted string starting at source[i]"""
+    quote = source[i]
+    i += 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def minify_css(source):
+    """Drop comments and whitespace that does not separate tokens"""
+    out = []
+    i, n = 0, len(source)
+    space = False
+    while i < n:
+        char = source[i]
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            space = True
+        elif char.isspace():
+            space = True
+            i += 1
+        else:
+            if char in '"\'':
+                end = _skip_string(source, i)
+                token, i = source[i:end], end
+            else:
+                token, i = char, i + 1
+            if space and out and out[-1] not in '{};,>' and token not in '{};,>':
+                out.append(' ')
+            if token == '}' and out and out[-1] == ';':
+                out.pop()
+            out.append(token)
+            space = False
+    return ''.join(out)
+
+
+def _regex_allowed(out, word):
+    if word in _REGEX_AFTER_WORDS:
+        return True
+    prev = out[-1][-1] if out else ''
+    return not prev or prev in _REGEX_AFTER_CHARS
+
+
+def _skip_regex(source, i):
+    """Index just past the regex literal body starting at source[i] ('/')"""
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            return i + 1
+        i += 1
+    return i
+
+
+def minify_js(source):
+    """Drop comments, indentation and whitespace between tokens"""
+    out = []
+    i, n = 0, len(source)
+    space = ''       # whitespace since the last token: '', ' ' or '\n'
+    word = ''        # last identifier/keyword emitted (regex detection)
+    braces = []      # open ${ ... } substitutions: brace depth inside each
+    in_template = False
+
+    def emit(token):
+        nonlocal space
+        if space and out:
+            prev, first = out[-1][-1], token[0]
+            if space == '\n' and prev not in _JOIN_AFTER and first not in _JOIN_BEFORE:
+                out.append('\n')
+            elif ((_WORD.match(prev) and _WORD.match(first)) or (prev == first and prev in '+-')
+                  or (prev.isdigit() and first == '.')):
+                out.append(' ')
+        space = ''
+        out.append(token)
+
+    while i < n:
+        if in_template:
+            start = i
+            while i < n and source[i] != '`' and not source.startswith('${', i):
+                i += 2 if source[i] == '\\' else 1
+            if source.startswith('${', i):
+                out.append(source[start:i + 2])
+                braces.append(0)
+                i += 2
+            else:
+                out.append(source[start:i + 1])  # up to the closing backtick
+                i += 1
+            in_template, word = False, ''
+            continue
+
+        char = source[i]
+        if char.isspace():
+            if char == '\n' or space == '\n':
+                space = '\n'
+            else:
+                space = space or ' '
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            comment = source[i:n if end < 0 else end + 2]
+            i += len(comment)
+            space = '\n' if '\n' in comment else (space or ' ')
+        elif char in '"\'':
+            end = _skip_string(source, i)
+            emit(source[i:end])
+            i, word = end, ''
+        elif char == '`':
+            emit('`')
+            i += 1
+            in_template = True
+        elif char == '/' and _regex_allowed(out, word):
+            end = _skip_regex(source, i)
+            emit(source[i:end])
+            i, word = end, ''
+        elif _WORD.match(char):
+            end = i + 1
+            while end < n and (_WORD.match(source[end]) or source[end] == '.' and char.isdigit()):
+                end += 1
+            word = source[i:end]
+            emit(word)
+            i = end
+        else:
+            if braces and char == '{':
+                braces[-1] += 1
+            elif braces and char == '}':
+                if braces[-1] == 0:
+                    # End of a ${ } substitution: back inside the template
+                    braces.pop()
+                    out.append('}')
+                    i += 1
+                    space = ''
+                    in_template = True
+                    continue
+                braces[-1] -= 1
+            emit(char)
+            i, word = i + 1, ''
+
+    return ''.join(out).strip() + '\n'
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file 0600; bundles are read by the web server too
+        os.chmod(tmp_path, 0o644 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _prune_builds(dist, bundle, current):
+    """Remove all but the KEEP_BUILDS most recent builds of a bundle"""
+    stem, ext = os.path.splitext(bundle)
+    pattern = re.compile(rf'{re.escape(stem)}\.[0-9a-f]{{12}}{re.escape(ext)}$')
+    builds = sorted((name for name in os.listdir(dist) if pattern.match(name) and name != current),
+                    key=lambda name: os.path.getmtime(os.path.join(dist, name)), reverse=True)
+    for name in builds[KEEP_BUILDS - 1:]:
+        for path in (name, name + '.gz'):
+            try:
+                os.remove(os.path.join(dist, path))
+            except FileNotFoundError:
+                pass
+
+
+def build_assets(static_folder):
+    """Build every bundle into static_folder/dist; returns {source: dist path}
+
+    Safe to run from several workers at once: files are written atomically
+    and their names depend only on their content.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+
+    manifest = {}
+    for source, bundle in BUNDLES.items():
+        path = os.path.join(static_folder, source)
+        if source.endswith('.css'):
+            text = minify_css(inline_css_imports(path))
+        else:
+            with open(path, encoding='utf-8') as f:
+                text = minify_js(f.read())
+        data = text.encode('utf-8')
+
+        stem, ext = os.path.splitext(bundle)
+        name = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        target = os.path.join(dist, name)
+        if not os.path.exists(target):
+            _write_atomic(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            _write_atomic(target, data)
+        else:
+            os.utime(target)  # most recent build, whatever the pruning order
+        _prune_builds(dist, bundle, name)
+        manifest[source] = f'{DIST_DIR}/{name}'
+
+    _write_atomic(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def asset_url(source):
+    """URL of a built asset (hashed, immutable) or of the plain static file"""
+    built = current_app.extensions.get('assets', {}).get(source)
+    if built:
+        return url_for('assets', filename=built[len(DIST_DIR) + 1:])
+    return url_for('static', filename=source)
+
+
+def serve_asset(filename):
+    """A built asset with far-future immutable caching (gzip copy if accepted)"""
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    mimetype = mimetypes.guess_type(filename)[0]
+    gzipped = request.accept_encodings['gzip'] > 0 and os.path.isfile(os.path.join(dist, filename + '.gz'))
+
+    response = send_from_directory(dist, filename + '.gz' if gzipped else filename,
+                                   mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """Build the bundles and register asset_url() / the /assets/ route
+
+    ASSET_PIPELINE = False in the config serves the plain source files
+    (e.g. while editing them).
+    """
+    app.config.setdefault('ASSET_PIPELINE', True)
+    manifest = {}
+    if app.config['ASSET_PIPELINE']:
+        try:
+            manifest = build_assets(app.static_folder)
+        except OSError as e:
+            logger.warning('Asset build failed, serving unbundled static files: %s', e)
+
+    app.extensions['assets'] = manifest
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.add_template_global(asset_url)
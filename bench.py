@@ -0,0 +1,228 @@
+"""Benchmark suite for the MAP violations app
+
+Each benchmark runs in fresh interpreters (where relevant) and reports
+median/min/max in milliseconds as JSON, so results can be compared between
+releases.
+
+Usage:
+    python bench.py                 # run every benchmark
+    python bench.py startup -n 10   # run one benchmark with 10 repeats
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+
+def summarize(samples_ms):
+    """Median/min/max summary of a list of millisecond samples"""
+    return {
+        'median_ms': round(statistics.median(samples_ms), 2),
+        'min_ms': round(min(samples_ms), 2),
+        'max_ms': round(max(samples_ms), 2),
+        'runs': len(samples_ms),
+    }
+
+
+def time_snippet(code, repeat):
+    """Run a snippet in fresh interpreters; the snippet prints its own elapsed ms"""
+    samples = []
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    # Scratch working directory so the app's folders/database never land in the repo
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeat):
+            out = subprocess.run(
+                [sys.executable, '-c', code],
+                cwd=workdir, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            samples.append(float(out.strip().splitlines()[-1]))
+    return summarize(samples)
+
+
+STARTUP_SNIPPET = '''
+import time
+t = time.perf_counter()
+{body}
+print((time.perf_counter() - t) * 1000)
+'''
+
+
+def bench_startup(repeat):
+    """Cold start: importing the app module and building the app, vs the ingest stack"""
+    cases = {
+        'import_app_module': 'import app_flask',
+        'create_app': 'import app_flask; app_flask.create_app()',
+        'import_cli': 'import map_cli',
+        # Reference: cost that is now deferred to the ingest path
+        'import_pandas_openpyxl': 'import pandas, openpyxl',
+    }
+    return {name: time_snippet(STARTUP_SNIPPET.format(body=body), repeat)
+            for name, body in cases.items()}
+
+
+def seed_tracker(db_path, violations, sellers=None, seed=0):
+    """Create a tracker database with synthetic ACTIVE violations"""
+    import app_flask
+    from severity import update_severity
+
+    rnd = random.Random(seed)
+    sellers = sellers or max(violations // 15, 1)
+    today = date.today()
+    app_flask.init_database(db_path)
+
+    rows = []
+    for i in range(violations):
+        map_price = rnd.choice([149.0, 299.0, 899.0, 1999.0])
+        days = rnd.choice([0, 0, 1, 2, 3, 5, 9])
+        first = (today - timedelta(days=days)).isoformat()
+        rows.append((
+            f'Seller {i % sellers:05d}', f'SKU{i:07d}', f'Electric fireplace insert model {i % 500}',
+            round(map_price * rnd.uniform(0.6, 0.99), 2), map_price, first, today.isoformat(), days,
+            f'https://marketplace.example.com/listing/{i}',
+        ))
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany('''
+            INSERT INTO violations
+            (seller_name, sku, product_description, current_price, map_price,
+             first_detected_date, last_seen_date, days_active, status, seller_link, pending_approval)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'ACTIVE', ?, 0)
+        ''', rows)
+        update_severity(conn)
+    conn.close()
+
+
+def bench_store_memory(repeat, violations=20000):
+    """Memory per cached violation: ViolationStore records vs plain row dicts"""
+    from violation_store import ViolationStore
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        seed_tracker(db_path, violations)
+
+        # Old read path: every active row turned into a dict
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        tracemalloc.start()
+        dicts = [dict(r) for r in conn.execute("SELECT * FROM violations WHERE status = 'ACTIVE'")]
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del dicts
+        conn.close()
+
+        tracemalloc.start()
+        store = ViolationStore(db_path)
+        store.grouped()
+        store_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Warm reads served from memory
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for bucket in (0, 1, 2):
+                store.by_day(bucket)
+            store.grouped()
+            samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'violations': violations,
+        'row_dicts_bytes_per_violation': round(dict_bytes / violations),
+        'store_bytes_per_violation': round(store_bytes / violations),
+        'warm_read': summarize(samples),
+    }
+
+
+def write_export(rows, seed=0):
+    """Synthetic vendor export (required columns plus unused extras) as a DataFrame"""
+    import pandas as pd
+
+    rnd = random.Random(seed)
+    map_prices = [rnd.choice([149.0, 299.0, 899.0, 1999.0]) for _ in range(rows)]
+    prices = [round(m * rnd.uniform(0.7, 1.1), 2) for m in map_prices]
+    return pd.DataFrame({
+        'sellers': [f'Seller {rnd.randint(0, rows // 15):05d}' for _ in range(rows)],
+        'prices': prices,
+        'U.S. MAP': map_prices,
+        'price_difference': [round(p - m, 2) for p, m in zip(prices, map_prices)],
+        'Description': [f'Electric fireplace insert model {i % 500}' for i in range(rows)],
+        'SAP Material': [f'{i:07d}' for i in range(rows)],
+        'seller_links': [f'https://marketplace.example.com/listing/{i}' for i in range(rows)],
+        # Columns the vendor ships but the app never reads
+        'Brand': ['Dimplex'] * rows,
+        'Category': ['Fireplaces'] * rows,
+        'Crawl Timestamp': ['2025-11-19T06:00:00'] * rows,
+    })
+
+
+def bench_input_formats(repeat, rows=20000):
+    """read_violations throughput per export format (same rows, same filtering)"""
+    import app_flask
+    from input_formats import _has_pyarrow
+
+    df = write_export(rows)
+    writers = {
+        'xlsx': lambda path: df.to_excel(path, index=False),
+        'csv': lambda path: df.to_csv(path, index=False),
+        'csv.gz': lambda path: df.to_csv(path, index=False, compression='gzip'),
+    }
+    if _has_pyarrow():
+        writers['parquet'] = lambda path: df.to_parquet(path, index=False)
+
+    results = {'rows': rows, 'pyarrow': _has_pyarrow()}
+    with tempfile.TemporaryDirectory() as workdir:
+        for ext, write in writers.items():
+            path = os.path.join(workdir, f'export.{ext}')
+            write(path)
+
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                violations, total_rows = app_flask.read_violations(path)
+                samples.append((time.perf_counter() - start) * 1000)
+
+            summary = summarize(samples)
+            results[ext] = {
+                **summary,
+                'file_bytes': os.path.getsize(path),
+                'violations': len(violations),
+                'rows_per_second': round(total_rows / (summary['median_ms'] / 1000)),
+            }
+    return results
+
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'store_memory': bench_store_memory,
+    'input_formats': bench_input_formats,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run performance benchmarks')
+    parser.add_argument('names', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument('-n', '--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    names = args.names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    results = {name: BENCHMARKS[name](args.repeat) for name in names}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,88 +1,224 @@
+"""Reconcile a list of sellers against the violation tracker
+
+Takes any seller list - a file (one name per line), stdin, or a past email
+batch (sellers whose first/second email was marked sent on a given date) - and
+answers with ONE grouped query joined to the tracker and its history
+(RESOLVED rows, including archived ones). Names are matched case-insensitively.
+
+Usage:
+    python check_email_sellers.py sellers.txt
+    cat sellers.txt | python check_email_sellers.py - --format csv
+    python check_email_sellers.py --email-batch 2025-11-18 --format json
+"""
+import argparse
+import csv
+import json
 import sqlite3
+import sys
+
+DB_PATH = 'violations_tracker.db'
+
+# One pass over violations, each row matched to the requested list through the
+# temp table's primary key (so thousands of names stay cheap); requested
+# sellers without any tracker rows are filled in afterwards.
+RECONCILE_QUERY = '''
+    SELECT r.seller_key,
+           SUM(v.status = 'ACTIVE') AS active_count,
+           SUM(v.status = 'RESOLVED') AS resolved_count,
+           MAX(CASE WHEN v.status = 'ACTIVE' THEN v.days_active END) AS max_days,
+           MAX(CASE WHEN v.status = 'ACTIVE' THEN v.pending_approval END) AS pending_approval,
+           MAX(CASE WHEN v.status = 'ACTIVE' THEN v.dns_added_date END) AS dns_added_date,
+           MAX(v.first_email_sent_date) AS first_email_date,
+           MAX(v.second_email_sent_date) AS second_email_date,
+           MAX(v.last_seen_date) AS last_seen_date,
+           json_group_array(json_object(
+               'sku', v.sku,
+               'description', v.product_description,
+               'current_price', v.current_price,
+               'map_price', v.map_price,
+               'days_active', v.days_active
+           )) FILTER (WHERE v.status = 'ACTIVE') AS products
+    FROM violations_all v
+    JOIN requested_sellers r ON r.seller_key = seller_key(v.seller_name)
+    GROUP BY r.seller_key
+'''
+
+# Stats for a requested seller that has no rows in the tracker
+EMPTY_STATS = dict.fromkeys([
+    'active_count', 'resolved_count', 'max_days', 'pending_approval', 'dns_added_date',
+    'first_email_date', 'second_email_date', 'last_seen_date', 'products',
+])
+
+FIELDS = ['seller', 'status', 'active_violations', 'resolved_violations', 'max_days',
+          'first_email_date', 'second_email_date', 'dns_added_date', 'last_seen_date']
+
+
+def seller_key(name):
+    """Matching key of a seller name: trimmed and case-folded (Unicode, unlike SQLite's lower())"""
+    return name.strip().casefold() if name is not None else None
+
+
+def read_seller_list(stream):
+    """Read seller names, one per line; blank lines and '#' comments are skipped"""
+    sellers = []
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            sellers.append(line)
+    return sellers
+
+
+def sellers_from_email_batch(conn, batch_date):
+    """Sellers whose first or second email was marked sent on batch_date"""
+    rows = conn.execute('''
+        SELECT DISTINCT seller_name FROM violations_all
+        WHERE substr(first_email_sent_date, 1, 10) = ?
+           OR substr(second_email_sent_date, 1, 10) = ?
+        ORDER BY seller_name
+    ''', (batch_date, batch_date)).fetchall()
+    return [row[0] for row in rows]
+
+
+def seller_status(row):
+    """Classify one reconciled seller"""
+    if row['active_count']:
+        if row['dns_added_date']:
+            return 'DNS'
+        if row['pending_approval']:
+            return 'PENDING_APPROVAL'
+        return 'ACTIVE'
+    if row['resolved_count']:
+        return 'CLEAN'
+    return 'NOT_TRACKED'
+
+
+def check_current_violators(conn, sellers):
+    """Reconcile sellers against the tracker with a single grouped query"""
+    conn.row_factory = sqlite3.Row
+    # Both sides of the join get the same Python key
+    conn.create_function('seller_key', 1, seller_key, deterministic=True)
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS requested_sellers (
+            seller_key TEXT PRIMARY KEY
+        )
+    ''')
+    conn.execute('DELETE FROM requested_sellers')
+
+    requested = {}
+    for name in sellers:
+        requested.setdefault(seller_key(name), name.strip())
+    conn.executemany('INSERT INTO requested_sellers (seller_key) VALUES (?)', ((key,) for key in requested))
+
+    stats = {row['seller_key']: row for row in conn.execute(RECONCILE_QUERY)}
 
-def check_current_violators():
-    """Comparar sellers del email con violaciones actuales"""
-    
-    # Sellers del email a Daniel
-    email_sellers = [
-        "Dealsupply",
-        "BBQ Authority Inc / Blazzing Fire", 
-        "First Response Fireplace Products",
-        "Jacks Small Engines",
-        "myBBQdeals",
-        "Electric Fireplaces Plus",
-        "Electric Fireplaces Direct Outlet"
-    ]
-    
-    conn = sqlite3.connect('violations_tracker.db')
-    cursor = conn.cursor()
-    
-    print("=== ANÁLISIS DE SELLERS DEL EMAIL VS ESTADO ACTUAL ===\n")
-    
-    still_violating = []
-    no_longer_violating = []
-    
-    for seller in email_sellers:
-        # Verificar si aún tiene violaciones activas
-        cursor.execute('''
-            SELECT COUNT(*) as violations_count, 
-                   MAX(days_active) as max_days,
-                   pending_approval,
-                   dns_added_date
-            FROM violations 
-            WHERE seller_name = ? AND status = "ACTIVE"
-            GROUP BY pending_approval, dns_added_date
-        ''', (seller,))
-        
-        result = cursor.fetchone()
-        
-        if result and result[0] > 0:  # Tiene violaciones activas
-            violations_count, max_days, pending, dns_date = result
-            
-            # Obtener detalles de productos violando
-            cursor.execute('''
-                SELECT sku, product_description, current_price, map_price, days_active
-                FROM violations 
-                WHERE seller_name = ? AND status = "ACTIVE"
-                ORDER BY days_active DESC
-            ''', (seller,))
-            
-            products = cursor.fetchall()
-            
-            print(f"🔴 {seller}")
-            print(f"   Status: {'EN DNS' if dns_date else 'PENDING APPROVAL' if pending else 'ACTIVO'}")
-            print(f"   Total violaciones: {violations_count}")
-            print(f"   Días máximos: {max_days}")
-            print("   Productos violando:")
-            
-            for sku, desc, current_price, map_price, days in products:
-                print(f"     - {desc} (SKU: {sku}) - ${current_price} (MAP: ${map_price}) - Day {days}")
-            
-            still_violating.append(seller)
-            print()
-            
+    results = []
+    for key, seller_name in requested.items():
+        row = stats.get(key, EMPTY_STATS)
+        results.append({
+            'seller': seller_name,
+            'status': seller_status(row),
+            'active_violations': row['active_count'] or 0,
+            'resolved_violations': row['resolved_count'] or 0,
+            'max_days': row['max_days'],
+            'first_email_date': row['first_email_date'],
+            'second_email_date': row['second_email_date'],
+            'dns_added_date': row['dns_added_date'],
+            'last_seen_date': row['last_seen_date'],
+            'products': json.loads(row['products']) if row['products'] else [],
+        })
+    return results
+
+
+def print_table(results, out):
+    """Human-readable report"""
+    status_labels = {
+        'DNS': 'EN DNS',
+        'PENDING_APPROVAL': 'PENDING APPROVAL',
+        'ACTIVE': 'ACTIVO',
+    }
+
+    print("=== ANÁLISIS DE SELLERS VS ESTADO ACTUAL ===\n", file=out)
+
+    still_violating = [r for r in results if r['active_violations']]
+    no_longer_violating = [r for r in results if not r['active_violations']]
+
+    for r in results:
+        if r['active_violations']:
+            print(f"🔴 {r['seller']}", file=out)
+            print(f"   Status: {status_labels[r['status']]}", file=out)
+            print(f"   Total violaciones: {r['active_violations']}", file=out)
+            print(f"   Días máximos: {r['max_days']}", file=out)
+            print("   Productos violando:", file=out)
+            for p in sorted(r['products'], key=lambda p: -(p['days_active'] or 0)):
+                print(f"     - {p['description']} (SKU: {p['sku']}) - ${p['current_price']} "
+                      f"(MAP: ${p['map_price']}) - Day {p['days_active']}", file=out)
+        elif r['status'] == 'CLEAN':
+            print(f"✅ {r['seller']}", file=out)
+            print("   Status: YA NO ESTÁ VIOLANDO (limpio)", file=out)
         else:
-            print(f"✅ {seller}")
-            print("   Status: YA NO ESTÁ VIOLANDO (limpio)")
-            no_longer_violating.append(seller)
-            print()
-    
-    print("=" * 60)
-    print(f"📊 RESUMEN:")
-    print(f"   🔴 Aún violando: {len(still_violating)} sellers")
-    print(f"   ✅ Ya no violan: {len(no_longer_violating)} sellers")
-    
+            print(f"⚪ {r['seller']}", file=out)
+            print("   Status: SIN REGISTROS EN EL TRACKER", file=out)
+        print(file=out)
+
+    print("=" * 60, file=out)
+    print("📊 RESUMEN:", file=out)
+    print(f"   🔴 Aún violando: {len(still_violating)} sellers", file=out)
+    print(f"   ✅ Ya no violan: {len(no_longer_violating)} sellers", file=out)
+
     if still_violating:
-        print(f"\n🚨 SELLERS PARA SUBIR A DNS:")
-        for seller in still_violating:
-            print(f"   - {seller}")
-    
+        print("\n🚨 SELLERS PARA SUBIR A DNS:", file=out)
+        for r in still_violating:
+            print(f"   - {r['seller']}", file=out)
+
     if no_longer_violating:
-        print(f"\n✅ SELLERS QUE YA CORRIGIERON:")
-        for seller in no_longer_violating:
-            print(f"   - {seller}")
-    
-    conn.close()
+        print("\n✅ SELLERS QUE YA CORRIGIERON:", file=out)
+        for r in no_longer_violating:
+            print(f"   - {r['seller']}", file=out)
+
+
+def print_csv(results, out):
+    writer = csv.DictWriter(out, fieldnames=FIELDS + ['skus'])
+    writer.writeheader()
+    for r in results:
+        row = {field: r[field] for field in FIELDS}
+        row['skus'] = ' '.join(str(p['sku']) for p in r['products'])
+        writer.writerow(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reconcile a seller list against the violation tracker')
+    parser.add_argument('sellers_file', nargs='?', help="File with one seller per line ('-' for stdin)")
+    parser.add_argument('--email-batch', metavar='YYYY-MM-DD',
+                        help='Use the sellers emailed on this date instead of a file')
+    parser.add_argument('--format', choices=['table', 'json', 'csv'], default='table')
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    if bool(args.sellers_file) == bool(args.email_batch):
+        parser.error('give either a sellers file (or -) or --email-batch')
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.email_batch:
+            sellers = sellers_from_email_batch(conn, args.email_batch)
+        elif args.sellers_file == '-':
+            sellers = read_seller_list(sys.stdin)
+        else:
+            with open(args.sellers_file, 'r', encoding='utf-8') as f:
+                sellers = read_seller_list(f)
+
+        results = check_current_violators(conn, sellers)
+    finally:
+        conn.close()
+
+    if args.format == 'json':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.format == 'csv':
+        print_csv(results, sys.stdout)
+    else:
+        print_table(results, sys.stdout)
+
 
 if __name__ == "__main__":
-    check_current_violators()
\ No newline at end of file
+    main()
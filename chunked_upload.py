@@ -0,0 +1,193 @@
+"""Chunked, resumable uploads (for exports above MAX_CONTENT_LENGTH or flaky links)
+
+A client opens one session per file, then PUTs numbered chunks in any order:
+
+    uploads/chunks/<upload_id>/
+        manifest.json   filename, size, chunk_size, total_chunks, created
+        data            preallocated to `size`; chunk n is written at n * chunk_size
+        acks/<n>        written once chunk n has been stored and verified
+
+- Each chunk is streamed from the request to its offset in `data` (never held
+  in memory) while its CRC32 is computed; the client sends the expected
+  value in X-Chunk-CRC32. Only a verified chunk is acknowledged.
+- Sessions live on disk, so any worker can take any chunk, and an interrupted
+  upload resumes by asking which chunks are acknowledged and sending the rest.
+- Once every chunk is acknowledged, take_file() renames `data` to the
+  original file name for the ingest pipeline: the body is not copied or
+  reassembled.
+"""
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+from input_formats import unsupported_message
+
+CHUNKS_DIR = 'chunks'
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024  # well below MAX_CONTENT_LENGTH
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_UPLOAD_BYTES = 1024 ** 3  # 1 GB per file
+SESSION_TTL_SECONDS = 24 * 3600
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+_UPLOAD_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+
+def _session_path(folder, upload_id):
+    # The id comes from the URL: never let it point outside the chunks folder
+    if not _UPLOAD_ID_RE.fullmatch(upload_id or ''):
+        raise FileNotFoundError(f'Unknown upload: {upload_id}')
+    path = Path(folder) / CHUNKS_DIR / upload_id
+    if not (path / 'manifest.json').exists():
+        raise FileNotFoundError(f'Unknown upload: {upload_id}')
+    return path
+
+
+def create_session(folder, filename, size, chunk_size=None):
+    """Open an upload session for one file
+
+    Returns:
+        dict: Session status (see session_status)
+    """
+    filename = os.path.basename(filename or '')
+    message = unsupported_message(filename)
+    if message:
+        raise ValueError(message)
+    if not isinstance(size, int) or size <= 0:
+        raise ValueError('size must be a positive number of bytes')
+    if size > MAX_UPLOAD_BYTES:
+        raise ValueError(f'File too large: {size} bytes (max {MAX_UPLOAD_BYTES})')
+
+    chunk_size = min(max(int(chunk_size or DEFAULT_CHUNK_SIZE), MIN_CHUNK_SIZE), DEFAULT_CHUNK_SIZE)
+    prune_sessions(folder)
+
+    upload_id = uuid.uuid4().hex
+    path = Path(folder) / CHUNKS_DIR / upload_id
+    (path / 'acks').mkdir(parents=True)
+    with open(path / 'data', 'wb') as f:
+        f.truncate(size)
+
+    manifest = {
+        'upload_id': upload_id,
+        'filename': filename,
+        'size': size,
+        'chunk_size': chunk_size,
+        'total_chunks': -(-size // chunk_size),
+        'created': time.time(),
+    }
+    # Written last: a session only exists once its data file is in place
+    (path / 'manifest.json').write_text(json.dumps(manifest), encoding='utf-8')
+    return session_status(folder, upload_id)
+
+
+def _manifest(path):
+    return json.loads((path / 'manifest.json').read_text(encoding='utf-8'))
+
+
+def _received(path):
+    return sorted(int(name) for name in os.listdir(path / 'acks'))
+
+
+def session_status(folder, upload_id):
+    """Manifest plus the acknowledged chunks and whether the file is complete"""
+    path = _session_path(folder, upload_id)
+    manifest = _manifest(path)
+    received = _received(path)
+    return {
+        **manifest,
+        'received': received,
+        'complete': len(received) == manifest['total_chunks'],
+    }
+
+
+def write_chunk(folder, upload_id, index, stream, checksum):
+    """Stream one chunk from `stream` to its offset and acknowledge it if it verifies
+
+    Args:
+        index (int): Chunk number (0-based)
+        stream: File-like request body
+        checksum (str): Expected CRC32 of the chunk, hex
+
+    Returns:
+        dict: Session status after this chunk
+    """
+    path = _session_path(folder, upload_id)
+    manifest = _manifest(path)
+    if not 0 <= index < manifest['total_chunks']:
+        raise ValueError(f"Chunk {index} out of range (0-{manifest['total_chunks'] - 1})")
+    if not checksum:
+        raise ValueError('Missing X-Chunk-CRC32 header')
+
+    offset = index * manifest['chunk_size']
+    expected = min(manifest['chunk_size'], manifest['size'] - offset)
+    crc = 0
+    written = 0
+
+    with open(path / 'data', 'r+b') as f:
+        f.seek(offset)
+        while written < expected:
+            block = stream.read(min(STREAM_BLOCK_SIZE, expected - written))
+            if not block:
+                break
+            f.write(block)
+            crc = zlib.crc32(block, crc)
+            written += len(block)
+        extra = stream.read(1)
+
+    if written != expected or extra:
+        raise ValueError(f'Chunk {index} has the wrong length (expected {expected} bytes)')
+    if f'{crc:08x}' != checksum.strip().lower().rjust(8, '0'):
+        raise ValueError(f'Chunk {index} failed its checksum, please resend it')
+
+    (path / 'acks' / str(index)).write_text(f'{crc:08x}')
+    return session_status(folder, upload_id)
+
+
+def take_file(folder, upload_id, dest_dir):
+    """Move a complete upload to dest_dir under its original name and close the session
+
+    dest_dir must be on the same file system (the upload folder), so this is
+    a rename, not a copy.
+
+    Returns:
+        str: Path of the file in dest_dir
+    """
+    status = session_status(folder, upload_id)
+    if not status['complete']:
+        raise ValueError(f"Upload {upload_id} is incomplete: "
+                         f"{len(status['received'])}/{status['total_chunks']} chunks")
+
+    path = _session_path(folder, upload_id)
+    dest = Path(dest_dir) / status['filename']
+    os.replace(path / 'data', dest)
+    shutil.rmtree(path, ignore_errors=True)
+    return str(dest)
+
+
+def discard_session(folder, upload_id):
+    shutil.rmtree(_session_path(folder, upload_id), ignore_errors=True)
+
+
+def prune_sessions(folder, max_age_seconds=SESSION_TTL_SECONDS):
+    """Remove sessions abandoned for longer than max_age_seconds; returns how many"""
+    root = Path(folder) / CHUNKS_DIR
+    if not root.exists():
+        return 0
+
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in root.iterdir():
+        try:
+            # Last activity: the newest acknowledgement, else the session's creation
+            last = max(path.stat().st_mtime, (path / 'acks').stat().st_mtime)
+        except FileNotFoundError:
+            last = 0
+        if last < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
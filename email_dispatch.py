@@ -0,0 +1,461 @@
+"""Outbound SMTP dispatch of the Day 1 / Day 2 notices
+
+Replaces "copy the email into Outlook, then click mark sent" for every seller
+with an address in seller_contacts.txt:
+
+1. plan_notices() builds one notice per seller and day bucket, covering the
+   violations not emailed yet, with the same renderer as the dashboard
+   preview (render_day_email).
+2. Every notice has an idempotency key, a hash of seller, day and the
+   violation ids it covers, recorded in email_dispatch as queued. A delivered
+   notice is never sent again, and a notice is claimed right before it is
+   sent, so two runs at once (cron and the dashboard) cannot both send it and
+   a long, rate-limited run never holds claims on notices still waiting in
+   its queue. The key is also the Message-ID.
+3. Dispatcher sends from an asyncio queue: a few workers, each reusing one
+   SMTP connection (smtplib, run in a thread), paced per recipient domain.
+   Temporary failures (4xx replies, dropped connections) are retried with
+   exponential backoff; a 5xx reply fails the notice at once.
+4. Once the relay accepts a message, the notice's violations get
+   first_email_sent_date / second_email_sent_date in the same transaction
+   that records the delivery.
+
+serve_sink() is a stand-in relay for trying this locally (`python map_cli.py
+smtp-sink`): it stores each message as an .eml file and can answer the first
+deliveries with a temporary failure.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, parseaddr
+from pathlib import Path
+
+DAY_COLUMNS = {0: 'first_email_sent_date', 1: 'second_email_sent_date'}
+
+DEFAULT_RATE_PER_DOMAIN = 30     # messages per minute to one recipient domain
+DEFAULT_CONNECTIONS = 2          # concurrent SMTP connections (workers)
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BACKOFF_SECONDS = 2.0    # first retry delay, doubled after every attempt
+
+# A 'sending' claim older than this belongs to a run that died; it may be retried
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def init_dispatch_schema(conn):
+    """Create the dispatch log (one row per idempotency key)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS email_dispatch (
+            idempotency_key TEXT PRIMARY KEY,
+            seller_name TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            recipients TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            violation_ids TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_email_dispatch_updated
+        ON email_dispatch (updated_at)
+    ''')
+
+
+def idempotency_key(seller_name, day, violation_ids):
+    raw = json.dumps([seller_name, day, sorted(violation_ids)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def recipients_of(contact):
+    """Addresses of a seller_contacts.txt entry ('a@x.com / b@y.com')"""
+    emails = (contact or {}).get('email') or ''
+    return [address.strip() for address in emails.split('/') if '@' in address]
+
+
+def plan_notices(grouped, get_contact, render, excluded=(), days=(0, 1), sellers=None):
+    """Notices for the violations of each seller and day bucket not emailed yet
+
+    Args:
+        grouped (dict): seller -> active violations (records or row dicts)
+        get_contact (callable): seller name -> contact dict
+        render (callable): render(violations, day) -> {'subject', 'body'}
+        excluded (iterable): Lowercase seller names never emailed
+        days (tuple): Day buckets to send (0 = Day 1, 1 = Day 2)
+        sellers (iterable): Only these sellers (default all)
+
+    Returns:
+        tuple: (notices, skipped) - skipped lists sellers without an address
+    """
+    excluded = set(excluded)
+    sellers = None if sellers is None else set(sellers)
+    notices, skipped = [], []
+    for seller_name, violations_list in grouped.items():
+        if (sellers is not None and seller_name not in sellers) or seller_name.lower().strip() in excluded:
+            continue
+        for day in days:
+            column = DAY_COLUMNS[day]
+            pending = [v for v in violations_list if v['days_active'] == day and v[column] is None]
+            if not pending:
+                continue
+            recipients = recipients_of(get_contact(seller_name))
+            if not recipients:
+                skipped.append({'seller_name': seller_name, 'day': day, 'reason': 'no email address'})
+                continue
+
+            email = render(pending, day)
+            violation_ids = [v['id'] for v in pending]
+            notices.append({
+                'key': idempotency_key(seller_name, day, violation_ids),
+                'seller_name': seller_name,
+                'day': day,
+                'recipients': recipients,
+                'subject': email['subject'],
+                'body': email['body'],
+                'violation_ids': violation_ids,
+            })
+    return notices, skipped
+
+
+def _html_to_text(html):
+    text = re.sub(r'<br\s*/?>|</p>|</li>', '\n', html)
+    text = re.sub(r'<li[^>]*>', '- ', text)
+    text = re.sub(r'<[^>]+>', '', text).replace('&nbsp;', ' ')
+    return re.sub(r'\n{3,}', '\n\n', text).strip() + '\n'
+
+
+def build_message(notice, sender):
+    """MIME message of a notice (plain text + HTML), Message-ID from its key"""
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = ', '.join(notice['recipients'])
+    message['Subject'] = notice['subject']
+    message['Date'] = formatdate(localtime=True)
+    domain = parseaddr(sender)[1].rpartition('@')[2] or 'localhost'
+    message['Message-ID'] = f"<{notice['key']}@{domain}>"
+    message.set_content(_html_to_text(notice['body']))
+    message.add_alternative(notice['body'], subtype='html')
+    return message
+
+
+def is_transient(error):
+    """True for failures worth retrying (4xx replies, network errors)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class DomainRateLimiter:
+    """Evenly spaced send slots per recipient domain (asyncio, single loop)"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = {}
+
+    async def acquire(self, domain):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next.get(domain, now))
+        self._next[domain] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Dispatcher:
+    """Send notices through one SMTP relay and record the outcome
+
+    Args:
+        open_db (callable): Returns a transaction context manager yielding a
+            connection (app_flask.get_db)
+        host, port (str, int): SMTP relay
+        sender (str): From address
+        username, password (str): SMTP AUTH credentials (optional)
+        starttls (bool): Upgrade the connection with STARTTLS
+        rate_per_domain (int): Messages per minute to one recipient domain
+        connections (int): Concurrent SMTP connections
+        max_attempts (int): Sends per notice before it is marked failed
+        backoff (float): Seconds before the first retry (doubled after each)
+    """
+
+    def __init__(self, open_db, host='localhost', port=25, sender='map-enforcement@localhost',
+                 username=None, password=None, starttls=False, timeout=30,
+                 rate_per_domain=DEFAULT_RATE_PER_DOMAIN, connections=DEFAULT_CONNECTIONS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=DEFAULT_BACKOFF_SECONDS):
+        self.open_db = open_db
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connections = max(connections, 1)
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff = backoff
+        self.limiter = DomainRateLimiter(rate_per_domain)
+
+    # ------------------------------------------------------------------
+    # Dispatch log
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _queue_rows(conn, notices, now):
+        conn.executemany('''
+            INSERT OR IGNORE INTO email_dispatch
+                (idempotency_key, seller_name, day, recipients, subject, violation_ids,
+                 status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)
+        ''', [(notice['key'], notice['seller_name'], notice['day'], ', '.join(notice['recipients']),
+               notice['subject'], json.dumps(notice['violation_ids']), now, now) for notice in notices])
+
+    def enqueue(self, notices):
+        """Record the notices as queued (known keys keep their status)"""
+        with self.open_db() as conn:
+            self._queue_rows(conn, notices, datetime.now().isoformat())
+
+    def claim(self, notice):
+        """Record the notice and take it for this run; False if delivered or taken"""
+        now = datetime.now()
+        with self.open_db() as conn:
+            self._queue_rows(conn, [notice], now.isoformat())
+            claimed = conn.execute('''
+                UPDATE email_dispatch SET status = 'sending', updated_at = ?
+                WHERE idempotency_key = ?
+                  AND (status IN ('queued', 'failed') OR (status = 'sending' AND updated_at < ?))
+            ''', (now.isoformat(), notice['key'], (now - CLAIM_TIMEOUT).isoformat())).rowcount
+        return claimed == 1
+
+    def record(self, notice, attempts, error=None, delivered=False, final=True):
+        """Store an attempt; a delivery also marks the notice's violations as emailed"""
+        now = datetime.now().isoformat()
+        status = 'sent' if delivered else ('failed' if final else 'sending')
+        with self.open_db() as conn:
+            conn.execute('''
+                UPDATE email_dispatch
+                SET status = ?, attempts = ?, last_error = ?, updated_at = ?,
+                    sent_at = CASE WHEN ? THEN ? ELSE sent_at END
+                WHERE idempotency_key = ?
+            ''', (status, attempts, error, now, delivered, now, notice['key']))
+            if delivered:
+                column = DAY_COLUMNS[notice['day']]
+                placeholders = ', '.join('?' * len(notice['violation_ids']))
+                conn.execute(f'''
+                    UPDATE violations SET {column} = date('now')
+                    WHERE id IN ({placeholders}) AND {column} IS NULL
+                ''', notice['violation_ids'])
+
+    # ------------------------------------------------------------------
+    # SMTP (blocking, run in a worker thread)
+    # ------------------------------------------------------------------
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or '')
+        return smtp
+
+    def _send(self, smtp, message):
+        """Send on the reused connection (reconnecting once if the relay dropped it)
+
+        Returns:
+            tuple: (connection, refused recipients)
+        """
+        if smtp is not None:
+            try:
+                return smtp, smtp.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                smtp = None  # idle connection closed by the relay: nothing was accepted
+        smtp = self._connect()
+        return smtp, smtp.send_message(message)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+
+    async def run(self, notices):
+        """Queue and send the notices; returns a report with one result per notice
+
+        Each notice is claimed when a worker takes it off the queue; one
+        delivered or taken by another run is reported as a duplicate.
+        """
+        results = {notice['key']: {'seller_name': notice['seller_name'], 'day': notice['day'],
+                                   'recipients': notice['recipients'], 'status': 'queued', 'attempts': 0}
+                   for notice in notices}
+        # The database calls block (busy_timeout under contention): keep them off the loop
+        await asyncio.to_thread(self.enqueue, notices)
+
+        queue = asyncio.Queue()
+        for notice in notices:
+            queue.put_nowait((notice, 1))
+        remaining = len(notices)
+        done = asyncio.Event()
+        if not remaining:
+            done.set()
+
+        def finish(notice, status, attempts, error=None):
+            nonlocal remaining
+            results[notice['key']].update(status=status, attempts=attempts, error=error)
+            remaining -= 1
+            if not remaining:
+                done.set()
+
+        async def retry_later(notice, attempt, delay):
+            await asyncio.sleep(delay)
+            queue.put_nowait((notice, attempt))
+
+        retries = set()
+
+        async def worker():
+            smtp = None
+            try:
+                while True:
+                    notice, attempt = await queue.get()
+                    if attempt == 1 and not await asyncio.to_thread(self.claim, notice):
+                        finish(notice, 'duplicate', 0)
+                        continue
+                    for domain in sorted({address.rpartition('@')[2].lower() for address in notice['recipients']}):
+                        await self.limiter.acquire(domain)
+                    try:
+                        smtp, refused = await asyncio.to_thread(self._send, smtp, build_message(notice, self.sender))
+                    except Exception as e:
+                        if not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                                              smtplib.SMTPDataError)) and smtp is not None:
+                            await asyncio.to_thread(self._close, smtp)
+                            smtp = None
+                        error = f'{type(e).__name__}: {e}'
+                        if is_transient(e) and attempt < self.max_attempts:
+                            await asyncio.to_thread(self.record, notice, attempt, error, final=False)
+                            task = asyncio.create_task(retry_later(notice, attempt + 1,
+                                                                   self.backoff * 2 ** (attempt - 1)))
+                            retries.add(task)
+                            task.add_done_callback(retries.discard)
+                        else:
+                            await asyncio.to_thread(self.record, notice, attempt, error)
+                            finish(notice, 'failed', attempt, error)
+                    else:
+                        error = f'Refused: {", ".join(sorted(refused))}' if refused else None
+                        await asyncio.to_thread(self.record, notice, attempt, error, delivered=True)
+                        finish(notice, 'sent', attempt, error)
+            finally:
+                if smtp is not None:
+                    await asyncio.to_thread(self._close, smtp)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.connections, max(len(notices), 1)))]
+        try:
+            await done.wait()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        report = list(results.values())
+        return {
+            'notices': len(notices),
+            'sent': sum(r['status'] == 'sent' for r in report),
+            'failed': sum(r['status'] == 'failed' for r in report),
+            'duplicates': sum(r['status'] == 'duplicate' for r in report),
+            'results': report,
+        }
+
+
+def recent_dispatches(conn, limit=100):
+    """Latest dispatch log rows, newest first"""
+    rows = conn.execute('''
+        SELECT idempotency_key, seller_name, day, recipients, subject, status, attempts,
+               last_error, created_at, updated_at, sent_at
+        FROM email_dispatch
+        ORDER BY updated_at DESC
+        LIMIT ?
+    ''', (limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+# ----------------------------------------------------------------------
+# Stand-in relay for local runs
+# ----------------------------------------------------------------------
+
+async def serve_sink(host='127.0.0.1', port=1025, outbox='outbox', fail_first=0):
+    """Minimal SMTP server storing every accepted message in outbox/ as .eml
+
+    The first `fail_first` messages are answered with 451 (temporary failure)
+    to exercise retries; recipients at an `.invalid` domain get 550.
+
+    Returns:
+        asyncio.Server: Already listening (use `async with server: await server.serve_forever()`)
+    """
+    outbox = Path(outbox)
+    outbox.mkdir(parents=True, exist_ok=True)
+    state = {'failures': fail_first, 'count': len(list(outbox.glob('*.eml')))}
+
+    async def session(reader, writer):
+        async def reply(line):
+            writer.write(f'{line}\r\n'.encode())
+            await writer.drain()
+
+        await reply('220 map-sink ESMTP')
+        recipients = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', 'replace').strip()
+                verb = command[:4].upper()
+                if verb == 'EHLO':
+                    await reply('250-map-sink\r\n250-8BITMIME\r\n250 SMTPUTF8')
+                elif verb == 'HELO':
+                    await reply('250 map-sink')
+                elif verb == 'MAIL':
+                    recipients = []
+                    await reply('250 OK')
+                elif verb == 'RCPT':
+                    address = command.partition(':')[2].strip().strip('<>')
+                    if address.lower().endswith('.invalid'):
+                        await reply('550 No such user')
+                    else:
+                        recipients.append(address)
+                        await reply('250 OK')
+                elif verb == 'DATA':
+                    await reply('354 End data with <CR><LF>.<CR><LF>')
+                    lines = []
+                    while True:
+                        data = await reader.readline()
+                        if data in (b'.\r\n', b'.\n', b''):
+                            break
+                        lines.append(data[1:] if data.startswith(b'..') else data)
+                    if state['failures'] > 0:
+                        state['failures'] -= 1
+                        await reply('451 Try again later')
+                        continue
+                    state['count'] += 1
+                    (outbox / f"{state['count']:06d}.eml").write_bytes(b''.join(lines))
+                    await reply('250 OK queued')
+                elif verb in ('RSET', 'NOOP'):
+                    await reply('250 OK')
+                elif verb == 'QUIT':
+                    await reply('221 Bye')
+                    break
+                else:
+                    await reply('502 Command not implemented')
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(session, host, port)
@@ -0,0 +1,191 @@
+"""Bulk escalation of Day 3+ sellers: one query to find them, one transaction to decide
+
+The dashboard escalates one seller per click (/api/send-to-boss, then
+/api/approve-dns or /api/reject-dns), each followed by a full refresh.
+escalation_candidates() finds every seller that needs a decision with one
+GROUP BY over the ACTIVE rows:
+
+    send_to_boss   Day 3+ violations not yet pending approval nor in DNS
+    awaiting       violations pending approval (approve -> DNS, or reject)
+
+apply_decisions() applies any mix of send_to_boss / approve / reject for many
+sellers inside the caller's transaction, with one UPDATE per decision type
+(same rules as the single-seller actions in app_flask), and
+management_summary() renders one report of the batch for management. The
+dashboard is refreshed once per batch, not once per seller.
+"""
+from datetime import date
+
+DECISIONS = ('send_to_boss', 'approve', 'reject')
+
+_CANDIDATES_QUERY = '''
+    SELECT seller_name,
+           COUNT(*) AS active_violations,
+           SUM(days_active >= 2) AS day3_violations,
+           SUM(days_active >= 2 AND pending_approval = 0 AND dns_added_date IS NULL) AS escalatable,
+           SUM(pending_approval = 1) AS pending,
+           SUM(dns_added_date IS NOT NULL) AS in_dns,
+           MAX(days_active) AS max_days_active,
+           MIN(first_detected_date) AS first_detected,
+           ROUND(SUM(COALESCE(severity, 0)), 2) AS total_severity,
+           ROUND(MAX(COALESCE(severity, 0)), 2) AS max_severity,
+           COUNT(second_email_sent_date) AS second_emails_sent
+    FROM violations
+    WHERE status = 'ACTIVE'
+    GROUP BY seller_name
+    HAVING escalatable > 0 OR pending > 0
+    ORDER BY total_severity DESC, seller_name
+'''
+
+# Same statements as action_send_to_boss / action_approve_dns / action_reject_dns,
+# for every seller of the batch at once
+_APPLY = {
+    'send_to_boss': '''
+        UPDATE violations
+        SET pending_approval = 1
+        WHERE seller_name IN (SELECT seller_name FROM escalation_batch WHERE decision = 'send_to_boss')
+          AND days_active >= 2 AND status = 'ACTIVE'
+    ''',
+    'approve': '''
+        UPDATE violations
+        SET dns_added_date = date('now'), pending_approval = 0
+        WHERE seller_name IN (SELECT seller_name FROM escalation_batch WHERE decision = 'approve')
+          AND pending_approval = 1 AND status = 'ACTIVE'
+    ''',
+    'reject': '''
+        UPDATE violations
+        SET pending_approval = 0, dns_added_date = NULL
+        WHERE seller_name IN (SELECT seller_name FROM escalation_batch WHERE decision = 'reject')
+          AND status = 'ACTIVE'
+    ''',
+}
+
+
+def escalation_candidates(conn, excluded=()):
+    """Sellers needing an escalation decision, most severe first
+
+    Args:
+        excluded (iterable): Lowercase seller names to leave out
+
+    Returns:
+        dict: send_to_boss and awaiting lists (one dict per seller)
+    """
+    excluded = set(excluded)
+    send_to_boss, awaiting = [], []
+    for row in conn.execute(_CANDIDATES_QUERY):
+        seller = dict(zip(('seller_name', 'active_violations', 'day3_violations', 'escalatable',
+                           'pending', 'in_dns', 'max_days_active', 'first_detected',
+                           'total_severity', 'max_severity', 'second_emails_sent'), row))
+        if seller['seller_name'].lower().strip() in excluded:
+            continue
+        if seller['pending']:
+            awaiting.append(seller)
+        if seller['escalatable']:
+            send_to_boss.append(seller)
+    return {'send_to_boss': send_to_boss, 'awaiting': awaiting}
+
+
+def resolve_decisions(candidates, decisions):
+    """Expand "all" shorthands and check that no seller gets two decisions
+
+    Args:
+        candidates (dict): escalation_candidates() result
+        decisions (dict): {decision: [seller names] or "all"}
+
+    Returns:
+        dict: {decision: sorted seller names}
+    """
+    unknown = set(decisions) - set(DECISIONS)
+    if unknown:
+        raise ValueError(f"Unknown decision(s): {', '.join(sorted(unknown))}")
+
+    # "all" means every current candidate for that decision
+    pools = {'send_to_boss': candidates['send_to_boss'],
+             'approve': candidates['awaiting'], 'reject': candidates['awaiting']}
+
+    resolved = {}
+    seen = {}
+    for decision in DECISIONS:
+        sellers = decisions.get(decision) or []
+        if sellers == 'all':
+            sellers = [seller['seller_name'] for seller in pools[decision]]
+        elif not isinstance(sellers, list):
+            raise ValueError(f'{decision} must be a list of seller names or "all"')
+
+        for seller in sellers:
+            if seller in seen and seen[seller] != decision:
+                raise ValueError(f'Seller {seller!r} is in both {seen[seller]} and {decision}')
+            seen[seller] = decision
+        resolved[decision] = sorted(set(sellers))
+    return resolved
+
+
+def apply_decisions(conn, decisions):
+    """Apply resolved decisions inside the caller's transaction
+
+    Returns:
+        dict: {decision: rows changed}
+    """
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS escalation_batch (
+            seller_name TEXT PRIMARY KEY,
+            decision TEXT NOT NULL
+        )
+    ''')
+    conn.execute('DELETE FROM escalation_batch')
+    conn.executemany('INSERT INTO escalation_batch (seller_name, decision) VALUES (?, ?)',
+                     [(seller, decision) for decision, sellers in decisions.items() for seller in sellers])
+
+    rows = {decision: conn.execute(_APPLY[decision]).rowcount if decisions.get(decision) else 0
+            for decision in DECISIONS}
+    conn.execute('DELETE FROM escalation_batch')
+    return rows
+
+
+def management_summary(candidates, decisions, rows, remaining, today=None):
+    """One report of an escalation batch for management (subject, plain-text body, totals)
+
+    Args:
+        candidates (dict): escalation_candidates() before the batch
+        decisions (dict): resolve_decisions() result
+        rows (dict): apply_decisions() result
+        remaining (dict): escalation_candidates() after the batch
+    """
+    today = today or date.today()
+    by_name = {seller['seller_name']: seller
+               for group in candidates.values() for seller in group}
+
+    titles = {
+        'send_to_boss': 'Sent for DNS approval',
+        'approve': 'Approved and added to DNS',
+        'reject': 'DNS rejected / removed',
+    }
+    lines = [f'MAP escalation summary - {today.isoformat()}', '']
+    for decision in DECISIONS:
+        sellers = decisions.get(decision) or []
+        if not sellers:
+            continue
+        lines.append(f'{titles[decision]} ({len(sellers)} sellers, {rows[decision]} violations):')
+        for name in sellers:
+            seller = by_name.get(name)
+            if seller:
+                lines.append(f"  - {name}: {seller['day3_violations']} Day 3+ violations, "
+                             f"up to {seller['max_days_active']} days active, "
+                             f"severity {seller['total_severity']}")
+            else:
+                lines.append(f'  - {name}')
+        lines.append('')
+
+    lines.append(f"Still open: {len(remaining['send_to_boss'])} sellers eligible for escalation, "
+                 f"{len(remaining['awaiting'])} awaiting a decision.")
+
+    return {
+        'subject': f'MAP escalation summary - {today.isoformat()}',
+        'body': '\n'.join(lines),
+        'totals': {
+            **{f'{decision}_sellers': len(decisions.get(decision) or []) for decision in DECISIONS},
+            **{f'{decision}_violations': rows[decision] for decision in DECISIONS},
+            'open_send_to_boss': len(remaining['send_to_boss']),
+            'open_awaiting': len(remaining['awaiting']),
+        },
+    }
@@ -0,0 +1,23 @@
+"""gunicorn settings for the dashboard (gunicorn -c gunicorn.conf.py wsgi:app)
+
+Workers are separate processes, each with its own ViolationStore; they stay
+coherent through the data version stamp in SQLite, so reads scale with the
+number of workers while writes are serialized by SQLite (WAL mode).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('MAP_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('MAP_THREADS', 2))
+
+# Uploads parse whole workbooks; give them room before the worker is recycled
+timeout = 120
+graceful_timeout = 30
+
+# Each worker loads the app itself (no preload), so no SQLite connection or
+# cache is ever shared across a fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
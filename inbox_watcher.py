@@ -0,0 +1,172 @@
+"""Watched inbox: sync workbooks dropped into a directory, no browser involved
+
+`python map_cli.py watch inbox/` runs this as a long-lived process next to the
+web workers (they pick the new data up through the shared data_version).
+
+1. Change notifications come from inotify & co. through the optional
+   `watchdog` package; without it the directory is polled.
+2. A workbook is only picked up once its size and mtime have not changed for
+   `settle_seconds` (the vendor's copy or the mail client may still be
+   writing it). Files that arrive together are synced as one upload, as with
+   a multi-file /upload.
+3. Synced workbooks are removed from the inbox (their content is in the upload
+   archive, linked in upload_log); anything else (no violations, already
+   uploaded today, unreadable) is moved to inbox/rejected/.
+"""
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_SETTLE_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Idle wait between scans when notifications are available (safety net only)
+NOTIFIED_IDLE_INTERVAL = 60.0
+
+REJECTED_DIR = 'rejected'
+
+
+class InboxWatcher:
+    """Debounce workbooks arriving in an inbox and hand each settled batch to `ingest`
+
+    Args:
+        inbox (str): Directory to watch (created if missing)
+        ingest (callable): ingest(paths) -> dict with a 'status'; 'synced'
+            batches are removed from the inbox, others are rejected
+        extensions (tuple): File suffixes to pick up (lowercase, '.csv.gz' allowed)
+        settle_seconds (float): How long a file must stay unchanged
+        poll_interval (float): Scan interval while files are settling (and
+            when idle without notifications)
+        on_result (callable): Called with the report of every batch
+    """
+
+    def __init__(self, inbox, ingest, extensions=('.xlsx', '.xls'),
+                 settle_seconds=DEFAULT_SETTLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                 on_result=None):
+        self.inbox = Path(inbox)
+        self.inbox.mkdir(parents=True, exist_ok=True)
+        self.ingest = ingest
+        self.extensions = extensions
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+
+        # path -> ((size, mtime_ns), monotonic time the signature was first seen)
+        self._pending = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+        self.stats = {'batches': 0, 'synced': 0, 'rejected': 0}
+
+    @property
+    def mode(self):
+        return 'notify' if self._observer else 'polling'
+
+    def start_notifications(self):
+        """Wake the loop on file system events (needs `watchdog`); False if unavailable"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        wake = self._wake
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), str(self.inbox), recursive=False)
+        self._observer.start()
+        return True
+
+    def _candidates(self):
+        for path in self.inbox.iterdir():
+            # Skip Office lock files (~$report.xlsx) and hidden temp files
+            if path.name.startswith(('.', '~$')) or not path.name.lower().endswith(self.extensions):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                yield path, (stat.st_size, stat.st_mtime_ns)
+
+    def scan(self, now=None):
+        """Update the debounce state; return the batch to sync once every file has settled
+
+        Returns:
+            list: Settled workbook paths (empty while nothing is ready)
+        """
+        now = time.monotonic() if now is None else now
+        current = {}
+        for path, signature in self._candidates():
+            previous = self._pending.get(path)
+            since = previous[1] if previous and previous[0] == signature else now
+            current[path] = (signature, since)
+        self._pending = current
+
+        if not current or any(now - since < self.settle_seconds for _, since in current.values()):
+            return []
+        return sorted(current)
+
+    def process_once(self, now=None):
+        """Scan and sync a settled batch if there is one; returns its report or None"""
+        batch = self.scan(now)
+        if not batch:
+            return None
+
+        try:
+            result = self.ingest([str(path) for path in batch])
+        except Exception as e:
+            result = {'status': 'error', 'error': str(e)}
+
+        synced = result.get('status') == 'synced'
+        for path in batch:
+            self._dispose(path, synced)
+            self._pending.pop(path, None)
+
+        self.stats['batches'] += 1
+        self.stats['synced' if synced else 'rejected'] += len(batch)
+        report = {'time': datetime.now().isoformat(timespec='seconds'),
+                  'files': [path.name for path in batch], **result}
+        if self.on_result:
+            self.on_result(report)
+        return report
+
+    def _dispose(self, path, synced):
+        if synced:
+            path.unlink(missing_ok=True)
+            return
+
+        rejected = self.inbox / REJECTED_DIR
+        rejected.mkdir(exist_ok=True)
+        target = rejected / path.name
+        if target.exists():
+            target = rejected / f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{path.name}"
+        shutil.move(str(path), target)
+
+    def run(self, once=False):
+        """Watch until stop() (or, with once=True, until the inbox is empty)"""
+        notified = self.start_notifications()
+        try:
+            while not self._stop.is_set():
+                self.process_once()
+                if once and not self._pending:
+                    break
+
+                # Files settling need a re-check; an idle inbox waits for an event
+                idle = notified and not self._pending
+                self._wake.wait(NOTIFIED_IDLE_INTERVAL if idle else self.poll_interval)
+                self._wake.clear()
+        finally:
+            if self._observer:
+                self._observer.stop()
+                self._observer.join()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,129 @@
+"""Readers for the vendor's violation exports: Excel, CSV, gzipped CSV and Parquet
+
+Every reader returns {sheet name: DataFrame} so read_violations() validates and
+filters all formats the same way (CSV and Parquet have a single, unnamed
+sheet), with seller/SKU/description/link always read as text. Excel parsing
+is by far the slowest; the other formats only load the required columns:
+
+- CSV / CSV.GZ: the header is read first (so missing columns give the usual
+  validation error), then only REQUIRED_COLUMNS are parsed, with text dtypes
+  for seller/SKU/description/link. The pyarrow engine is used when installed,
+  otherwise pandas' C parser, memory-mapping uncompressed files.
+- Parquet: column projection to REQUIRED_COLUMNS, memory-mapped (needs the
+  optional `pyarrow` package; uploads are rejected up front without it).
+  Numeric text columns are converted to text afterwards (123.0 -> '123').
+"""
+import os
+
+REQUIRED_COLUMNS = ['sellers', 'prices', 'U.S. MAP', 'price_difference', 'Description', 'SAP Material', 'seller_links']
+
+# Text columns are never inferred: SKUs such as 00123 keep their leading zeros
+TEXT_DTYPES = {'sellers': str, 'Description': str, 'SAP Material': str, 'seller_links': str}
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+CSV_EXTENSIONS = ('.csv', '.csv.gz')
+PARQUET_EXTENSIONS = ('.parquet',)
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + CSV_EXTENSIONS + PARQUET_EXTENSIONS
+
+UNSUPPORTED_MESSAGE = 'Please upload an Excel, CSV or Parquet file (.xlsx, .xls, .csv, .csv.gz, .parquet)'
+PARQUET_MESSAGE = 'Parquet files need the optional pyarrow package (pip install pyarrow)'
+
+
+def file_extension(path):
+    """Lowercase extension, keeping compound ones ('.csv.gz')"""
+    name = os.path.basename(str(path)).lower()
+    for ext in SUPPORTED_EXTENSIONS:
+        if name.endswith(ext):
+            return ext
+    return os.path.splitext(name)[1]
+
+
+def unsupported_message(path):
+    """Why path cannot be read here, or None when it can"""
+    ext = file_extension(path)
+    name = os.path.basename(str(path))
+    if ext not in SUPPORTED_EXTENSIONS:
+        return f'{UNSUPPORTED_MESSAGE}: {name}'
+    if ext in PARQUET_EXTENSIONS and not _has_pyarrow():
+        return f'{PARQUET_MESSAGE}: {name}'
+    return None
+
+
+def is_supported(path):
+    return unsupported_message(path) is None
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_csv_sheet(file_path):
+    """Read the required columns of a (possibly gzipped) CSV export"""
+    import pandas as pd
+
+    header = pd.read_csv(file_path, nrows=0).columns
+    if not set(REQUIRED_COLUMNS) <= set(header):
+        # Enough of the file for validation to report what is missing
+        return pd.read_csv(file_path, nrows=1)
+
+    options = {'usecols': REQUIRED_COLUMNS, 'dtype': TEXT_DTYPES}
+    if _has_pyarrow():
+        options['engine'] = 'pyarrow'
+    elif file_extension(file_path) == '.csv':
+        options['memory_map'] = True
+    return pd.read_csv(file_path, **options)
+
+
+def _text_value(value):
+    """A typed cell as the text CSV/Excel would give (integral floats without .0)"""
+    import pandas as pd
+
+    if pd.isna(value):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def read_parquet_sheet(file_path):
+    """Read the required columns of a Parquet export"""
+    import pandas as pd
+
+    if not _has_pyarrow():
+        raise ValueError(PARQUET_MESSAGE)
+
+    import pyarrow.parquet as pq
+
+    if not set(REQUIRED_COLUMNS) <= set(pq.read_schema(file_path).names):
+        return pd.read_parquet(file_path).head(1)
+    df = pd.read_parquet(file_path, columns=REQUIRED_COLUMNS, memory_map=True)
+    # Parquet keeps the writer's types: a numeric SKU column must match the
+    # text SKUs the other formats (and the tracker) have
+    for column in TEXT_DTYPES:
+        if df[column].dtype != object:
+            df[column] = df[column].map(_text_value).astype(object)
+    return df
+
+
+def read_sheets(file_path):
+    """All non-empty sheets of an export as {sheet name: DataFrame}"""
+    import pandas as pd
+
+    ext = file_extension(file_path)
+    if ext in EXCEL_EXTENSIONS:
+        sheets = pd.read_excel(file_path, sheet_name=None, dtype=TEXT_DTYPES)
+    elif ext in CSV_EXTENSIONS:
+        try:
+            sheets = {'': read_csv_sheet(file_path)}
+        except pd.errors.EmptyDataError:
+            sheets = {}
+    elif ext in PARQUET_EXTENSIONS:
+        sheets = {'': read_parquet_sheet(file_path)}
+    else:
+        raise ValueError(f'{UNSUPPORTED_MESSAGE}: {os.path.basename(str(file_path))}')
+
+    return {sheet: df for sheet, df in sheets.items() if not df.empty}
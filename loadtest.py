@@ -0,0 +1,281 @@
+"""Concurrent load test for the dashboard API
+
+Seeds a synthetic tracker (bench.seed_tracker), serves the app from a threaded
+WSGI server in this process and lets simulated operators hit it over HTTP
+with a realistic mix of requests:
+
+    dashboard reads        GET  /api/get-current-violations, /api/top-offenders
+    email previews         GET  /api/get-email-by-day/<seller>/<day>
+    mark / revert actions  POST /api/mark-first-email, /api/revert-first-email,
+                                /api/mark-email
+    uploads                POST /upload (forced re-sync of a CSV export)
+
+Every user picks a weighted action and runs it back to back (optional think
+time). The JSON report has p50/p95/p99 latency, throughput, error and
+"database is locked" rates per endpoint.
+
+Usage:
+    python loadtest.py                                  # 20 users, 30 s, 20k violations
+    python loadtest.py --users 50 --duration 60 --violations 100000
+    python loadtest.py --no-uploads --think-ms 200
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+from bench import seed_tracker
+
+# (name, weight): share of each action in the traffic mix
+MIX = (
+    ('dashboard', 30),
+    ('top_offenders', 5),
+    ('email_preview', 30),
+    ('mark_first_email', 10),
+    ('revert_first_email', 10),
+    ('mark_email', 12),
+    ('upload', 3),
+)
+
+LOCK_MARKERS = ('database is locked', 'database table is locked', 'busy')
+
+
+def percentile(sorted_samples, q):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_samples:
+        return None
+    rank = max(int(round(q / 100 * len(sorted_samples) + 0.5)) - 1, 0)
+    return round(sorted_samples[min(rank, len(sorted_samples) - 1)], 2)
+
+
+class Recorder:
+    """Thread-safe latency/error samples per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, endpoint, elapsed_ms, status, body):
+        error = status >= 400
+        locked = error and any(marker in body for marker in LOCK_MARKERS)
+        with self.lock:
+            entry = self.samples.setdefault(endpoint, {'ms': [], 'errors': 0, 'lock_errors': 0, 'statuses': {}})
+            entry['ms'].append(elapsed_ms)
+            entry['errors'] += error
+            entry['lock_errors'] += locked
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+
+    def report(self, duration_s):
+        endpoints = {}
+        for endpoint, entry in sorted(self.samples.items()):
+            ms = sorted(entry['ms'])
+            endpoints[endpoint] = {
+                'requests': len(ms),
+                'throughput_rps': round(len(ms) / duration_s, 2),
+                'p50_ms': percentile(ms, 50),
+                'p95_ms': percentile(ms, 95),
+                'p99_ms': percentile(ms, 99),
+                'max_ms': round(ms[-1], 2),
+                'error_rate': round(entry['errors'] / len(ms), 4),
+                'lock_error_rate': round(entry['lock_errors'] / len(ms), 4),
+                'statuses': {str(k): v for k, v in sorted(entry['statuses'].items())},
+            }
+        total = sum(e['requests'] for e in endpoints.values())
+        return {
+            'requests': total,
+            'throughput_rps': round(total / duration_s, 2),
+            'lock_errors': sum(e['lock_errors'] for e in self.samples.values()),
+            'endpoints': endpoints,
+        }
+
+
+class Scenario:
+    """Targets (sellers, violation ids, export files) for the simulated users"""
+
+    def __init__(self, db_path, workdir, rnd):
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute('''
+            SELECT id, seller_name, sku, product_description, current_price, map_price,
+                   seller_link, days_active
+            FROM violations WHERE status = 'ACTIVE'
+        ''').fetchall()
+        conn.close()
+
+        self.violation_ids = [row[0] for row in rows]
+        self.sellers = sorted({row[1] for row in rows})
+        # Email previews exist for Day 1 / Day 2 buckets only
+        self.previews = sorted({(row[1], row[7]) for row in rows if row[7] in (0, 1)})
+        self.exports = [self._write_export(rows, workdir, rnd, i) for i in range(3)]
+
+    @staticmethod
+    def _write_export(rows, workdir, rnd, index):
+        """CSV export resembling the tracker: most rows persist, a few change or vanish"""
+        import csv
+
+        path = os.path.join(workdir, f'export_{index}.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['sellers', 'prices', 'U.S. MAP', 'price_difference',
+                             'Description', 'SAP Material', 'seller_links'])
+            for _, seller, sku, description, price, map_price, link, _ in rows:
+                if rnd.random() < 0.03:
+                    continue
+                if rnd.random() < 0.05:
+                    price = round(price * rnd.uniform(0.9, 1.0), 2)
+                writer.writerow([seller, price, map_price, round(price - map_price, 2), description, sku, link])
+        return path
+
+
+def multipart(fields, files):
+    """Encode a multipart/form-data body; returns (body, content type)"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, path in files:
+        with open(path, 'rb') as f:
+            content = f.read()
+        header = (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                  f'filename="{os.path.basename(path)}"\r\nContent-Type: text/csv\r\n\r\n')
+        parts.append(header.encode() + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class User(threading.Thread):
+    """One simulated operator: weighted actions back to back until the deadline"""
+
+    def __init__(self, index, port, scenario, recorder, deadline, think_ms, mix, seed):
+        super().__init__(name=f'user-{index}', daemon=True)
+        self.port = port
+        self.scenario = scenario
+        self.recorder = recorder
+        self.deadline = deadline
+        self.think_ms = think_ms
+        self.rnd = random.Random(seed + index)
+        self.actions = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+
+    def request(self, endpoint, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            status, text = response.status, response.read().decode('utf-8', 'replace')
+        except (OSError, http.client.HTTPException) as e:
+            status, text = 599, str(e)
+        finally:
+            conn.close()
+        self.recorder.add(endpoint, (time.perf_counter() - start) * 1000, status, text)
+
+    def run(self):
+        scenario, rnd = self.scenario, self.rnd
+        while time.monotonic() < self.deadline:
+            action = rnd.choices(self.actions, self.weights)[0]
+
+            if action == 'dashboard':
+                self.request('GET /api/get-current-violations', 'GET', '/api/get-current-violations')
+            elif action == 'top_offenders':
+                self.request('GET /api/top-offenders', 'GET', '/api/top-offenders?n=20')
+            elif action == 'email_preview' and scenario.previews:
+                seller, day = rnd.choice(scenario.previews)
+                self.request('GET /api/get-email-by-day', 'GET',
+                             f'/api/get-email-by-day/{quote(seller)}/{day}')
+            elif action in ('mark_first_email', 'revert_first_email'):
+                route = action.replace('_', '-')
+                self.request(f'POST /api/{route}', 'POST',
+                             f'/api/{route}/{quote(rnd.choice(scenario.sellers), safe="")}')
+            elif action == 'mark_email':
+                body = json.dumps({'violation_id': rnd.choice(scenario.violation_ids), 'email_type': 'first'})
+                self.request('POST /api/mark-email', 'POST', '/api/mark-email', body,
+                             {'Content-Type': 'application/json'})
+            elif action == 'upload':
+                body, content_type = multipart({'force_upload': 'true'},
+                                               [('file', rnd.choice(scenario.exports))])
+                self.request('POST /upload', 'POST', '/upload', body, {'Content-Type': content_type})
+
+            if self.think_ms:
+                time.sleep(rnd.uniform(0, 2 * self.think_ms) / 1000)
+
+
+def run_load(violations=20000, sellers=None, users=20, duration=30.0, think_ms=0,
+             uploads=True, seed=0):
+    """Seed a tracker, serve it and run the simulated users; returns the report"""
+    from werkzeug.serving import make_server
+
+    import app_flask
+
+    mix = [(name, weight) for name, weight in MIX if uploads or name != 'upload']
+    rnd = random.Random(seed)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'loadtest.db')
+        seed_start = time.perf_counter()
+        seed_tracker(db_path, violations, sellers, seed)
+        scenario = Scenario(db_path, workdir, rnd)
+        seed_ms = round((time.perf_counter() - seed_start) * 1000, 2)
+
+        app = app_flask.create_app({
+            'DB_PATH': db_path,
+            'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+            'OUTPUT_FOLDER': os.path.join(workdir, 'output'),
+        })
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        recorder = Recorder()
+        # Sync logs would drown the report
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.monotonic()
+            simulated = [User(i, server.server_port, scenario, recorder, start + duration, think_ms, mix, seed)
+                         for i in range(users)]
+            for user in simulated:
+                user.start()
+            for user in simulated:
+                user.join()
+            elapsed = time.monotonic() - start
+
+        server.shutdown()
+        server_thread.join()
+
+    return {
+        'config': {'violations': violations, 'sellers': len(scenario.sellers), 'users': users,
+                   'duration_s': duration, 'think_ms': think_ms, 'mix': dict(mix)},
+        'seed_ms': seed_ms,
+        'elapsed_s': round(elapsed, 2),
+        **recorder.report(elapsed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent load test of the dashboard API')
+    parser.add_argument('--violations', type=int, default=20000, help='Synthetic ACTIVE violations')
+    parser.add_argument('--sellers', type=int, help='Distinct sellers (default: violations / 15)')
+    parser.add_argument('--users', type=int, default=20, help='Simulated concurrent users')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of traffic')
+    parser.add_argument('--think-ms', type=int, default=0, help='Mean pause between a user\'s requests')
+    parser.add_argument('--no-uploads', action='store_true', help='Leave uploads out of the mix')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run_load(args.violations, args.sellers, args.users, args.duration,
+                      args.think_ms, not args.no_uploads, args.seed)
+    print(json.dumps(report, indent=2))
+    return 1 if report['lock_errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""Headless command line entry point for cron-driven runs
+
+Goes from workbook to tracker sync to rendered emails to CSV export without
+starting the web server. Every command prints a JSON report (results and
+timings in milliseconds) on stdout so it can be piped into other tools; sync
+logs are sent to stderr.
+
+Usage:
+    python map_cli.py ingest uploads/2025-11-19/ [--force]
+    python map_cli.py emails --out output/
+    python map_cli.py export --out tracker.csv
+    python map_cli.py archive --days 30
+    python map_cli.py replay [--from 2025-01-01] [--out rebuilt.db]
+    python map_cli.py run inbox/ --out-dir output/
+    python map_cli.py watch inbox/ [--settle 5] [--once]
+    python map_cli.py send-emails [--day 1] [--seller NAME] [--dry-run] [--smtp-host H --smtp-port P]
+    python map_cli.py smtp-sink [--port 1025] [--outbox outbox/] [--fail-first 2]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+
+from input_formats import SUPPORTED_EXTENSIONS, is_supported, unsupported_message
+
+# Heavy modules (Flask, pandas) are imported on first use so `--help` and
+# argument errors return immediately.
+
+
+class Timings:
+    """Collect wall-clock timings per step (milliseconds)"""
+
+    def __init__(self):
+        self.steps = {}
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def load_app(timings, db_path=None, migrate=True):
+    """Import the application module (timed), point it at the database and migrate it"""
+    with timings.step('import'), redirect_stdout(sys.stderr):
+        import app_flask
+        if db_path:
+            app_flask.DB_PATH = db_path
+
+    if migrate:
+        with timings.step('migrate'):
+            app_flask.init_database()
+    return app_flask
+
+
+def collect_workbooks(paths):
+    """Expand files and directories into a sorted list of workbook paths
+    (Excel, CSV, gzipped CSV or Parquet exports)"""
+    workbooks = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            workbooks.extend(p for p in path.iterdir() if is_supported(p))
+        elif is_supported(path):
+            workbooks.append(path)
+        else:
+            raise SystemExit(unsupported_message(path) if path.exists()
+                             else f"Not a supported export (Excel, CSV, Parquet) or directory: {path}")
+    return sorted({str(p) for p in workbooks})
+
+
+def do_ingest(app_flask, timings, paths, force=False):
+    """Sync one batch of workbooks into the tracker (same rules as /upload)"""
+    workbooks = collect_workbooks(paths)
+    if not workbooks:
+        return {'status': 'no_files', 'files': []}
+
+    existing_upload = app_flask.check_upload_today()
+    if existing_upload and not force:
+        return {'status': 'already_uploaded', 'files': workbooks, 'existing_upload': existing_upload}
+
+    filename = ', '.join(Path(p).name for p in workbooks)
+    metrics = app_flask.StageMetrics(app_flask.UPLOAD_TRACE_MEMORY)
+    try:
+        with timings.step('ingest'), redirect_stdout(sys.stderr):
+            result = app_flask.ingest_workbooks(workbooks, filename, metrics)
+    finally:
+        metrics.close()
+
+    # Same per-stage record as uploads through the dashboard (no respond stage)
+    app_flask.save_upload_metrics(metrics, filename, len(workbooks), result)
+    result['files'] = workbooks
+    result['stages'] = metrics.report()
+    return result
+
+
+def do_emails(app_flask, timings, out_dir):
+    """Render Day 1 / Day 2 emails for every active, non-excluded seller"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    with timings.step('emails'):
+        grouped = app_flask.get_active_violations_grouped()
+        grouped, _ = app_flask.filter_excluded_sellers_from_grouped(grouped)
+
+        for seller_name, violations_list in grouped.items():
+            for day in (0, 1):
+                day_violations = [v for v in violations_list if v['days_active'] == day]
+                if not day_violations:
+                    continue
+
+                email_data = app_flask.render_day_email(day_violations, day)
+                # Same "Subject: ...\n\nbody" layout as /get-email-content reads
+                filename = f"email_{app_flask.clean_filename(seller_name)}_day{day + 1}.html"
+                content = f"Subject: {email_data['subject']}\n\n{email_data['body']}"
+                (out_dir / filename).write_text(content, encoding='utf-8')
+                written.append(filename)
+
+    return {'out_dir': str(out_dir), 'emails': len(written), 'files': written}
+
+
+def do_export(app_flask, timings, out_path):
+    """Write the tracker CSV export to a file, or stdout when out_path is '-'"""
+    with timings.step('export'):
+        csv_text = app_flask.build_tracker_csv()
+
+    if out_path == '-':
+        sys.stdout.write(csv_text)
+        return {'out': 'stdout', 'rows': max(csv_text.count('\n') - 1, 0)}
+
+    Path(out_path).write_text(csv_text, encoding='utf-8')
+    return {'out': out_path, 'rows': max(csv_text.count('\n') - 1, 0)}
+
+
+def do_archive(app_flask, timings, days, vacuum=True):
+    """Move old RESOLVED violations to the archive and release the space
+
+    Also converts a database created before auto_vacuum=INCREMENTAL (one-time
+    full VACUUM), which the upload path never does.
+    """
+    with timings.step('archive'):
+        return app_flask.apply_retention(older_than_days=days, vacuum=vacuum, convert=vacuum)
+
+
+def cmd_ingest(args, timings):
+    app_flask = load_app(timings, args.db)
+    return do_ingest(app_flask, timings, args.paths, args.force)
+
+
+def cmd_emails(args, timings):
+    app_flask = load_app(timings, args.db)
+    return do_emails(app_flask, timings, args.out)
+
+
+def cmd_export(args, timings):
+    app_flask = load_app(timings, args.db)
+    return do_export(app_flask, timings, args.out)
+
+
+def cmd_archive(args, timings):
+    app_flask = load_app(timings, args.db)
+    return do_archive(app_flask, timings, args.days, not args.no_vacuum)
+
+
+def cmd_replay(args, timings):
+    """Rebuild the tracker from the upload archive (into --out, or swapped into --db)"""
+    # The live database may be the broken one: no migration, read it as-is
+    app_flask = load_app(timings, args.db, migrate=False)
+    import replay
+
+    db_path = app_flask.DB_PATH
+    source = args.source or db_path
+    target = args.out or os.path.join(tempfile.mkdtemp(dir=Path(db_path).resolve().parent), 'rebuilt.db')
+
+    with timings.step('replay'), redirect_stdout(sys.stderr):
+        result = replay.replay(source, args.uploads, target, args.date_from, args.date_to,
+                               app_flask.ARCHIVE_AFTER_DAYS, args.workers)
+
+    if args.out:
+        result['out'] = args.out
+    else:
+        with timings.step('swap'):
+            result['backup'] = replay.swap_in(target, db_path)
+        shutil.rmtree(Path(target).parent)
+        result['db'] = db_path
+    return result
+
+
+def cmd_run(args, timings):
+    """Full nightly pipeline: ingest, render emails, export CSV"""
+    app_flask = load_app(timings, args.db)
+    out_dir = Path(args.out_dir)
+    stamp = time.strftime('%Y%m%d')
+    return {
+        'ingest': do_ingest(app_flask, timings, args.paths, args.force),
+        'emails': do_emails(app_flask, timings, out_dir),
+        'export': do_export(app_flask, timings, str(out_dir / f'violations_tracker_{stamp}.csv')),
+    }
+
+
+def cmd_watch(args, timings):
+    """Sync workbooks dropped into an inbox directory until interrupted"""
+    app_flask = load_app(timings, args.db)
+    from inbox_watcher import InboxWatcher
+
+    def ingest(paths):
+        batch_timings = Timings()
+        result = do_ingest(app_flask, batch_timings, paths, args.force)
+        result['timings_ms'] = batch_timings.steps
+        return result
+
+    def report(batch):
+        # One JSON line per batch, so a supervisor log stays greppable
+        print(json.dumps(batch, default=str), flush=True)
+
+    watcher = InboxWatcher(args.inbox, ingest, SUPPORTED_EXTENSIONS, args.settle, args.poll, report)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        watcher.stop()
+    return {'inbox': args.inbox, 'mode': watcher.mode, **watcher.stats}
+
+
+def cmd_send_emails(args, timings):
+    """Send pending Day 1 / Day 2 notices through the SMTP relay"""
+    app_flask = load_app(timings, args.db)
+    if args.smtp_host:
+        app_flask.SMTP_HOST = args.smtp_host
+    if args.smtp_port:
+        app_flask.SMTP_PORT = args.smtp_port
+    days = tuple(day - 1 for day in args.day) if args.day else (0, 1)
+
+    with timings.step('send'):
+        return app_flask.dispatch_notices(days, args.seller, args.dry_run)
+
+
+def cmd_smtp_sink(args, timings):
+    """Local stand-in SMTP relay storing messages as .eml files (until interrupted)"""
+    import asyncio
+    from email_dispatch import serve_sink
+
+    async def serve():
+        server = await serve_sink(args.host, args.port, args.outbox, args.fail_first)
+        print(f'SMTP sink on {args.host}:{args.port}, writing to {args.outbox}', file=sys.stderr, flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return {'outbox': args.outbox, 'messages': len(list(Path(args.outbox).glob('*.eml')))}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='MAP violations batch tools')
+    parser.add_argument('--db', help='Tracker database path (default: violations_tracker.db)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('ingest', help='Sync workbooks (files or directories) into the tracker')
+    p.add_argument('paths', nargs='+')
+    p.add_argument('--force', action='store_true', help='Sync even if an upload was already logged today')
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser('emails', help='Render Day 1 / Day 2 emails for active sellers')
+    p.add_argument('--out', default='output')
+    p.set_defaults(func=cmd_emails)
+
+    p = sub.add_parser('export', help="Export the tracker to CSV ('-' for stdout)")
+    p.add_argument('--out', default='-')
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('archive', help='Archive RESOLVED violations older than --days')
+    p.add_argument('--days', type=int, default=None,
+                   help='Retention age in days (default: ARCHIVE_AFTER_DAYS, 30)')
+    p.add_argument('--no-vacuum', action='store_true', help='Skip the incremental VACUUM')
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser('replay', help='Rebuild the tracker by replaying archived uploads')
+    p.add_argument('--source', help='Database holding the upload archive index (default: --db)')
+    p.add_argument('--uploads', default='uploads', help='Upload archive folder')
+    p.add_argument('--from', dest='date_from', metavar='YYYY-MM-DD')
+    p.add_argument('--to', dest='date_to', metavar='YYYY-MM-DD')
+    p.add_argument('--out', help='Write the rebuilt database here instead of replacing --db')
+    p.add_argument('--workers', type=int, help='Parser processes (default: CPU count)')
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser('run', help='Ingest, render emails and export in one go')
+    p.add_argument('paths', nargs='+')
+    p.add_argument('--out-dir', default='output')
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('watch', help='Sync workbooks dropped into an inbox directory')
+    p.add_argument('inbox')
+    p.add_argument('--settle', type=float, default=5.0,
+                   help='Seconds a file must stay unchanged before it is synced')
+    p.add_argument('--poll', type=float, default=2.0, help='Scan interval in seconds')
+    p.add_argument('--once', action='store_true', help='Sync what is in the inbox, then exit')
+    p.add_argument('--force', action='store_true', help='Sync even if an upload was already logged today')
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('send-emails', help='Send pending Day 1 / Day 2 notices over SMTP')
+    p.add_argument('--day', type=int, choices=(1, 2), action='append',
+                   help='Day bucket to send (repeatable, default both)')
+    p.add_argument('--seller', action='append', help='Only this seller (repeatable)')
+    p.add_argument('--dry-run', action='store_true', help='List the notices without sending')
+    p.add_argument('--smtp-host', help='SMTP relay host (default: SMTP_HOST)')
+    p.add_argument('--smtp-port', type=int, help='SMTP relay port (default: SMTP_PORT)')
+    p.set_defaults(func=cmd_send_emails)
+
+    p = sub.add_parser('smtp-sink', help='Run a local stand-in SMTP relay for testing send-emails')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=1025)
+    p.add_argument('--outbox', default='outbox', help='Folder receiving one .eml file per message')
+    p.add_argument('--fail-first', type=int, default=0,
+                   help='Answer the first N messages with a temporary failure (451)')
+    p.set_defaults(func=cmd_smtp_sink)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    timings = Timings()
+    start = time.perf_counter()
+
+    try:
+        result = args.func(args, timings)
+        status = 0
+    except (ValueError, OSError) as e:
+        result = {'error': str(e)}
+        status = 1
+
+    timings.steps['total'] = round((time.perf_counter() - start) * 1000, 2)
+    report = {'command': args.command, 'result': result, 'timings_ms': timings.steps}
+    # CSV on stdout takes precedence; the report then goes to stderr
+    stream = sys.stderr if getattr(args, 'out', None) == '-' else sys.stdout
+    print(json.dumps(report, indent=2, default=str), file=stream)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""Rebuild the tracker by replaying archived uploads with their original dates
+
+The upload archive (upload_archive.py) keeps every synced workbook and the day
+it was uploaded. replay() reads those days back and re-runs the tracker sync
+for each one with the upload's date as "today", into a brand-new database:
+
+1. Workbooks are decompressed and parsed in a process pool (days in
+   parallel); syncing stays sequential in date order.
+2. All days are applied in ONE transaction on one connection, without the
+   per-sync store notifications or logging of the web path.
+3. Like every live upload, each day is followed by the severity pass and the
+   retention pass as of that day, so rows are archived (and a seller/SKU
+   coming back after archiving is handled) exactly as they were live.
+4. Email / DNS workflow dates are carried over from the source database for
+   violations whose detection episode (seller, sku, first_detected_date)
+   survived the rebuild, so operators do not lose their progress.
+5. History the uploads cannot reproduce is copied from the source as well:
+   the SMTP dispatch log (so sent notices are never sent again), upload stage
+   metrics, and the upload log, file links and diffs of days that were not
+   replayed, plus archived episodes the rebuild did not recreate.
+
+swap_in() then copies the rebuilt database over the live one with SQLite's
+backup API (after backing the old content up), bumping the data version so
+every worker reloads its cache.
+"""
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+from retention import DEFAULT_ARCHIVE_AFTER_DAYS, archive_resolved
+from search import FTS_COLUMNS
+from severity import update_severity
+from upload_archive import blob_path, extract_blob, link_upload
+
+# Workflow columns an operator sets by hand (not derivable from the uploads)
+ACTION_COLUMNS = ('first_email_sent_date', 'second_email_sent_date', 'pending_approval', 'dns_added_date')
+
+
+def archived_upload_days(conn, folder, date_from=None, date_to=None):
+    """Archived upload days in date order, split into replayable and missing
+
+    Returns:
+        tuple: ([(upload_date, [(original_name, sha256, ext), ...]), ...],
+                [upload_date, ...] of days with at least one pruned/missing blob)
+    """
+    rows = conn.execute('''
+        SELECT f.upload_date, f.original_name, f.sha256, b.ext
+        FROM upload_files f
+        LEFT JOIN upload_blobs b ON b.sha256 = f.sha256
+        WHERE f.upload_date >= ? AND f.upload_date <= ?
+        ORDER BY f.upload_date, f.id
+    ''', (date_from or '0000-00-00', date_to or '9999-99-99')).fetchall()
+
+    days = {}
+    for upload_date, name, sha256, ext in rows:
+        days.setdefault(upload_date, []).append((name, sha256, ext))
+
+    replayable, missing = [], []
+    for upload_date, files in days.items():
+        if all(ext is not None and blob_path(folder, sha256, ext).exists() for _, sha256, ext in files):
+            replayable.append((upload_date, files))
+        else:
+            missing.append(upload_date)
+    return replayable, missing
+
+
+def _read_day(args):
+    """Pool worker: decompress one day's workbooks, return its included violations"""
+    import pandas as pd
+    import app_flask
+
+    folder, files = args
+    frames = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (name, sha256, ext) in enumerate(files):
+            file_dir = Path(tmp) / str(i)
+            file_dir.mkdir()
+            path = extract_blob(folder, sha256, ext, file_dir, name)
+            frames.append(app_flask.read_violations(path)[0])
+
+    violations = frames[0] if len(frames) == 1 else app_flask.dedupe_violations(
+        pd.concat(frames, ignore_index=True))
+    if violations.empty:
+        return violations
+    included, _ = app_flask.separate_sellers(violations)
+    return included
+
+
+def replay(source_db, upload_folder, target_db, date_from=None, date_to=None,
+           archive_after_days=DEFAULT_ARCHIVE_AFTER_DAYS, workers=None):
+    """Rebuild a tracker database at target_db (must not exist) from the archive
+
+    Returns:
+        dict: days replayed, missing days, totals and the last replayed date
+    """
+    import app_flask
+
+    if os.path.exists(target_db):
+        raise ValueError(f'Replay target already exists: {target_db}')
+
+    source = sqlite3.connect(source_db)
+    try:
+        days, missing = archived_upload_days(source, upload_folder, date_from, date_to)
+        upload_times = dict(source.execute('SELECT upload_date, upload_time FROM upload_log'))
+        blobs = source.execute('''
+            SELECT sha256, ext, size, stored_size, created_date, last_used_date FROM upload_blobs
+        ''').fetchall()
+        data_version = source.execute(
+            "SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()[0]
+    finally:
+        source.close()
+
+    if not days:
+        raise ValueError('No archived uploads to replay')
+
+    app_flask.init_database(target_db)
+    conn = sqlite3.connect(target_db)
+    conn.row_factory = sqlite3.Row
+    totals = {'new': 0, 'updated': 0, 'resolved': 0}
+    archived = 0
+
+    try:
+        # ATTACH is not allowed inside a transaction, so it comes first
+        conn.execute('ATTACH DATABASE ? AS source', (source_db,))
+
+        # Spawned like the live ingest (read_violations_many): no forked copies of held locks
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            frames = pool.map(_read_day, [(upload_folder, files) for _, files in days])
+
+            with conn:
+                for (upload_date, files), violations in zip(days, frames):
+                    counts = app_flask._sync_violations(conn, violations, date.fromisoformat(upload_date))
+                    for key in totals:
+                        totals[key] += counts[key]
+
+                    conn.execute('''
+                        INSERT OR REPLACE INTO upload_log
+                        (upload_date, upload_time, filename, violations_count)
+                        VALUES (?, ?, ?, ?)
+                    ''', (upload_date, upload_times.get(upload_date, '00:00:00'),
+                          ', '.join(name for name, _, _ in files), len(violations)))
+                    link_upload(conn, upload_date, [(name, sha256) for name, sha256, _ in files])
+
+                    # Same per-upload passes as the live sync (ingest_workbooks)
+                    update_severity(conn)
+                    archived += archive_resolved(conn, archive_after_days, today=date.fromisoformat(upload_date))
+
+                carried = _carry_actions(conn)
+                history = _carry_history(conn)
+
+                conn.executemany('INSERT OR IGNORE INTO upload_blobs VALUES (?, ?, ?, ?, ?, ?)', blobs)
+                # Past the source's stamp, so every worker reloads after the swap
+                conn.execute("UPDATE app_meta SET value = ? WHERE key = 'data_version'",
+                             (data_version + 1,))
+
+        conn.execute('DETACH DATABASE source')
+    finally:
+        conn.close()
+
+    return {
+        'days_replayed': len(days),
+        'missing_days': missing,
+        'first_day': days[0][0],
+        'last_day': days[-1][0],
+        'archived': archived,
+        'actions_carried': carried,
+        'history_carried': history,
+        **totals,
+    }
+
+
+def _carry_actions(conn):
+    """Copy workflow dates from the attached source for surviving episodes"""
+    assignments = ', '.join(f'{column} = s.{column}' for column in ACTION_COLUMNS)
+    cursor = conn.execute(f'''
+        UPDATE violations SET {assignments}
+        FROM source.violations s
+        WHERE s.seller_name = violations.seller_name
+          AND s.sku = violations.sku
+          AND s.first_detected_date = violations.first_detected_date
+          AND (s.first_email_sent_date IS NOT NULL OR s.second_email_sent_date IS NOT NULL
+               OR s.pending_approval = 1 OR s.dns_added_date IS NOT NULL)
+    ''')
+    return cursor.rowcount
+
+
+def _columns(conn, table, schema='main'):
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+
+def _copy_rows(conn, table, where='', skip=()):
+    """Copy rows of table from the attached source (columns both sides have)
+
+    Returns:
+        int: Rows copied (0 when the source predates the table)
+    """
+    source_columns = set(_columns(conn, table, 'source'))
+    columns = ', '.join(c for c in _columns(conn, table) if c in source_columns and c not in skip)
+    if not columns:
+        return 0
+    cursor = conn.execute(f'''
+        INSERT OR IGNORE INTO main.{table} ({columns})
+        SELECT {columns} FROM source.{table} s {where}
+    ''')
+    return cursor.rowcount
+
+
+def _carry_archive(conn):
+    """Copy archived episodes of the source that the rebuild did not recreate
+
+    They get fresh ids past the violations sequence (ids are shared with the
+    full-text index and never reused) and are added to the index.
+    """
+    source_columns = set(_columns(conn, 'violations_archive', 'source'))
+    columns = [c for c in _columns(conn, 'violations_archive') if c in source_columns and c != 'id']
+    if not columns:
+        return 0
+
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'violations'").fetchone()
+    last_id = row[0] if row else 0
+    column_list = ', '.join(columns)
+    source_list = ', '.join(f'a.{c}' for c in columns)
+    episode = ('x.seller_name = a.seller_name AND x.sku = a.sku '
+               'AND x.first_detected_date = a.first_detected_date')
+    copied = conn.execute(f'''
+        INSERT INTO main.violations_archive (id, {column_list})
+        SELECT ? + ROW_NUMBER() OVER (ORDER BY a.id), {source_list}
+        FROM source.violations_archive a
+        WHERE NOT EXISTS (SELECT 1 FROM main.violations x WHERE {episode})
+          AND NOT EXISTS (SELECT 1 FROM main.violations_archive x WHERE {episode})
+    ''', (last_id,)).rowcount
+    if copied:
+        fts_columns = ', '.join(FTS_COLUMNS)
+        conn.execute(f'''
+            INSERT INTO violations_fts (rowid, {fts_columns})
+            SELECT id, {fts_columns} FROM main.violations_archive WHERE id > ?
+        ''', (last_id,))
+        if row:
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'violations'", (last_id + copied,))
+        else:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('violations', ?)", (copied,))
+    return copied
+
+
+def _carry_history(conn):
+    """Copy the source's history that replaying the uploads cannot rebuild
+
+    Returns:
+        dict: Rows copied per table
+    """
+    not_replayed = 'WHERE s.upload_date NOT IN (SELECT upload_date FROM main.upload_diff_runs)'
+    return {
+        'email_dispatch': _copy_rows(conn, 'email_dispatch'),
+        'upload_metrics': _copy_rows(conn, 'upload_metrics'),
+        'upload_stage_metrics': _copy_rows(conn, 'upload_stage_metrics'),
+        'upload_log': _copy_rows(conn, 'upload_log', skip=('id',)),
+        'upload_files': _copy_rows(
+            conn, 'upload_files', 'WHERE s.upload_date NOT IN (SELECT upload_date FROM main.upload_files)',
+            skip=('id',)),
+        # Diff rows first: the runs decide which days were replayed
+        'upload_diffs': _copy_rows(conn, 'upload_diffs', not_replayed),
+        'upload_diff_runs': _copy_rows(conn, 'upload_diff_runs'),
+        'violations_archive': _carry_archive(conn),
+    }
+
+
+def swap_in(rebuilt_db, db_path):
+    """Replace db_path's content with rebuilt_db, keeping the old content as a .bak
+
+    Uses the backup API so processes holding db_path open see the new pages
+    (never an unlinked file); the backup of a corrupted database may fail, in
+    which case the original file is copied as-is.
+
+    Returns:
+        str: Path of the backup of the previous database
+    """
+    backup_path = f"{db_path}.{datetime.now().strftime('%Y%m%d%H%M%S')}.bak"
+    live = sqlite3.connect(db_path, timeout=30)
+    try:
+        backup = sqlite3.connect(backup_path)
+        try:
+            live.backup(backup)
+        except sqlite3.DatabaseError:
+            backup.close()
+            shutil.copyfile(db_path, backup_path)
+        finally:
+            backup.close()
+
+        rebuilt = sqlite3.connect(rebuilt_db)
+        try:
+            rebuilt.backup(live)
+        finally:
+            rebuilt.close()
+    finally:
+        live.close()
+    return backup_path
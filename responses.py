@@ -0,0 +1,158 @@
+"""HTTP response helpers for the large dashboard payloads
+
+- Negotiated compression: after_request hook that gzip- or brotli-encodes
+  JSON/text responses above a size threshold (brotli only if the optional
+  `brotli` package is installed). Streamed responses are compressed chunk by
+  chunk, so they are never buffered whole.
+- stream_json(): serialize a document whose bulk is one long list item by
+  item instead of building the full JSON string in memory.
+- columnar(): "compact" shape for lists of records - field names once,
+  values as rows - used when a client asks for ?shape=compact.
+"""
+import json
+import zlib
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Responses smaller than this are sent as-is (compression overhead > gain)
+DEFAULT_MIN_SIZE = 1024
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+
+# Items serialized per yielded chunk in stream_json()
+STREAM_BATCH = 200
+
+_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=str).encode
+
+
+def init_compression(app):
+    """Register the compression hook; threshold comes from COMPRESS_MIN_SIZE"""
+    app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+
+    @app.after_request
+    def compress_response(response):
+        return compress(response, app.config['COMPRESS_MIN_SIZE'])
+
+
+def materialize(response, min_size=DEFAULT_MIN_SIZE):
+    """Serialize (and compress) a response now instead of while it is sent
+
+    For callers that measure what building the body costs; the compression
+    hook then leaves the response alone.
+    """
+    response = compress(response, min_size)
+    response.set_data(b''.join(response.iter_encoded()))
+    return response
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(response, min_size=DEFAULT_MIN_SIZE):
+    """Compress response in place if the client accepts it and it is worth it"""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough  # send_file()
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+
+    if isinstance(response, StreamedJSONResponse):
+        # Length unknown up front: streamed endpoints are the large ones
+        response.response = _compress_chunks(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        compressor = _compressor(encoding)
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class _BrotliCompressor:
+    """zlib-like interface over brotli.Compressor"""
+
+    def __init__(self):
+        # Quality 5: most of the ratio at a fraction of the CPU of quality 11
+        self._compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def _compressor(encoding):
+    if encoding == 'br':
+        return _BrotliCompressor()
+    return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+
+def _compress_chunks(chunks, encoding):
+    compressor = _compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class StreamedJSONResponse(Response):
+    """Marker for stream_json() responses (compressed chunk by chunk)"""
+
+
+def stream_json(fields, list_key, items):
+    """Stream {**fields, list_key: [*items]} as application/json
+
+    Args:
+        fields (dict): Small top-level values, serialized first
+        list_key (str): Key of the (large) list, serialized last
+        items (iterable): List items; consumed lazily while the response is sent
+
+    Returns:
+        Response: Streamed JSON response
+    """
+    def generate():
+        head = _encode(fields)[:-1]
+        yield f'{head}{"," if fields else ""}{_encode(list_key)}:['
+        batch = []
+        first = True
+        for item in items:
+            batch.append(_encode(item))
+            if len(batch) >= STREAM_BATCH:
+                yield ('' if first else ',') + ','.join(batch)
+                batch, first = [], False
+        if batch:
+            yield ('' if first else ',') + ','.join(batch)
+        yield ']}'
+
+    return StreamedJSONResponse(generate(), mimetype='application/json')
+
+
+def wants_compact():
+    """True when the client asked for the columnar response shape"""
+    return request.args.get('shape') == 'compact'
+
+
+def columnar(records, columns):
+    """{'columns': [...], 'rows': [[...], ...]} for a list of dict-like records"""
+    return {
+        'columns': list(columns),
+        'rows': [[record[column] for column in columns] for record in records],
+    }
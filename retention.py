@@ -0,0 +1,175 @@
+"""Retention for RESOLVED violations
+
+update_violations_tracker never deletes: a violation that disappears from the
+daily Excel is only marked RESOLVED, so the hot `violations` table keeps
+growing with rows no dashboard query needs. archive_resolved() moves RESOLVED
+rows that have not been seen for a configurable number of days into
+`violations_archive` (same database, same columns plus archived_date), and
+incremental_vacuum() hands the freed pages back to the filesystem. A database
+created before auto_vacuum=INCREMENTAL was enabled is switched over once by
+convert_to_incremental(), from the command line (never inside a request).
+
+Archived rows stay queryable for reports through the `violations_all` view
+(hot + archive, archived_date is NULL for hot rows).
+
+A seller/SKU that shows up again after it was archived is moved back by
+restore_archived() before the sync diffs the day, so it is reactivated with
+its id, first_detected_date and email history, exactly as if it had never
+left the hot table (instead of starting over as a new Day 1 violation).
+"""
+from datetime import date, timedelta
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 30
+
+
+def violation_columns(conn):
+    """Column names of the violations table, in table order"""
+    return [row[1] for row in conn.execute('PRAGMA table_info(violations)')]
+
+
+def init_archive_schema(conn):
+    """Create the archive table and (re)build the violations_all view
+
+    The archive mirrors the violations columns; columns added to violations
+    by later migrations are added here too, and the view is rebuilt from the
+    current column list.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS violations_archive (
+            id INTEGER PRIMARY KEY,
+            seller_name TEXT NOT NULL,
+            sku TEXT NOT NULL,
+            archived_date TEXT NOT NULL
+        )
+    ''')
+    # No UNIQUE(seller_name, sku): the same pair can be archived once per episode
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_violations_archive_seller
+        ON violations_archive (seller_name, sku)
+    ''')
+
+    archived = {row[1] for row in conn.execute('PRAGMA table_info(violations_archive)')}
+    columns = []
+    for _, name, col_type, *_ in conn.execute('PRAGMA table_info(violations)').fetchall():
+        columns.append(name)
+        if name not in archived:
+            conn.execute(f'ALTER TABLE violations_archive ADD COLUMN {name} {col_type}')
+
+    column_list = ', '.join(columns)
+    view_sql = (f'CREATE VIEW violations_all AS '
+                f'SELECT {column_list}, NULL AS archived_date FROM violations '
+                f'UNION ALL '
+                f'SELECT {column_list}, archived_date FROM violations_archive')
+    current = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'violations_all'").fetchone()
+    if current is None or current[0] != view_sql:
+        conn.execute('DROP VIEW IF EXISTS violations_all')
+        conn.execute(view_sql)
+
+
+def archive_resolved(conn, older_than_days=DEFAULT_ARCHIVE_AFTER_DAYS, today=None):
+    """Move RESOLVED rows last seen more than older_than_days ago into the archive
+
+    Runs inside the caller's transaction (copy + delete commit together).
+
+    Returns:
+        int: Number of rows archived
+    """
+    today = today or date.today()
+    cutoff = (today - timedelta(days=older_than_days)).isoformat()
+    column_list = ', '.join(violation_columns(conn))
+
+    conn.execute(f'''
+        INSERT INTO violations_archive ({column_list}, archived_date)
+        SELECT {column_list}, ? FROM violations
+        WHERE status = 'RESOLVED' AND last_seen_date < ?
+    ''', (today.isoformat(), cutoff))
+    cursor = conn.execute('''
+        DELETE FROM violations
+        WHERE status = 'RESOLVED' AND last_seen_date < ?
+    ''', (cutoff,))
+    return cursor.rowcount
+
+
+def restore_archived(conn, keys):
+    """Move the latest archived row of each incoming seller/SKU back into violations
+
+    Only pairs missing from the hot table are restored; the row comes back
+    RESOLVED with its original id, so the sync reactivates it. Runs inside the
+    caller's transaction.
+
+    Args:
+        keys (iterable): (seller_name, sku) pairs of today's file
+
+    Returns:
+        int: Number of rows restored
+    """
+    if conn.execute('SELECT 1 FROM violations_archive LIMIT 1').fetchone() is None:
+        return 0
+
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS incoming_keys (
+            seller_name TEXT NOT NULL,
+            sku TEXT NOT NULL,
+            PRIMARY KEY (seller_name, sku)
+        )
+    ''')
+    conn.execute('DELETE FROM temp.incoming_keys')
+    conn.executemany('INSERT OR IGNORE INTO temp.incoming_keys VALUES (?, ?)', keys)
+
+    # Ids follow detection order, so the highest id is the latest episode
+    conn.execute('DROP TABLE IF EXISTS temp.restored_violations')
+    conn.execute('''
+        CREATE TEMP TABLE restored_violations AS
+        SELECT a.* FROM violations_archive a
+        WHERE a.id IN (
+            SELECT MAX(x.id) FROM violations_archive x
+            JOIN temp.incoming_keys k ON k.seller_name = x.seller_name AND k.sku = x.sku
+            WHERE NOT EXISTS (SELECT 1 FROM violations v
+                              WHERE v.seller_name = x.seller_name AND v.sku = x.sku)
+            GROUP BY x.seller_name, x.sku
+        )
+    ''')
+    try:
+        # Archive row out first: its delete trigger drops the search entry the
+        # insert trigger then adds back under the same id
+        conn.execute('DELETE FROM violations_archive WHERE id IN (SELECT id FROM temp.restored_violations)')
+        column_list = ', '.join(violation_columns(conn))
+        cursor = conn.execute(f'''
+            INSERT INTO violations ({column_list})
+            SELECT {column_list} FROM temp.restored_violations
+        ''')
+        return cursor.rowcount
+    finally:
+        conn.execute('DROP TABLE temp.restored_violations')
+
+
+def convert_to_incremental(conn):
+    """Switch an existing database to auto_vacuum=INCREMENTAL (one-time full VACUUM)
+
+    The VACUUM rewrites the whole file while holding the write lock, so this
+    runs from `map_cli.py archive` / `flask init-db`, not from the upload path.
+    Must run outside a transaction.
+
+    Returns:
+        bool: True if the database was converted (False if it already was)
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        return False
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    return True
+
+
+def incremental_vacuum(conn):
+    """Release free pages to the filesystem; returns the number of pages freed
+
+    Only frees pages on a database in auto_vacuum=INCREMENTAL mode (see
+    convert_to_incremental); anywhere else it is a cheap no-op.
+    """
+    before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    # The pragma frees one page per step and returns no columns, so execute()
+    # would stop after the first page; executescript() runs it to the end
+    # (outside a transaction, as apply_retention calls it)
+    conn.executescript('PRAGMA incremental_vacuum')
+    return before - conn.execute('PRAGMA freelist_count').fetchone()[0]
@@ -0,0 +1,157 @@
+"""Full-text search over sellers, SKUs, descriptions and links (SQLite FTS5)
+
+violations_fts holds one entry per violation, keyed by the violation id. Ids
+are never reused (AUTOINCREMENT) and archiving moves a row to
+violations_archive with the same id, so a single index covers the tracker and
+the archive. Triggers keep it in sync:
+
+- INSERT on violations adds the entry
+- UPDATE of an indexed column rewrites it (unchanged text is skipped by the
+  WHEN clause)
+- DELETE on violations removes it unless the row was just archived
+- DELETE on violations_archive removes it
+"""
+import html
+import re
+
+# Indexed columns, in FTS column order (bm25 weights below follow this order)
+FTS_COLUMNS = ('seller_name', 'sku', 'product_description', 'seller_link')
+BM25_WEIGHTS = (4.0, 6.0, 1.0, 0.5)
+
+# Highlight markers that cannot occur in the data; swapped for <mark> after escaping
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def init_search_schema(conn):
+    """Create the FTS index and its triggers; index existing rows on first run"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'violations_fts'").fetchone()
+    columns = ', '.join(FTS_COLUMNS)
+    new_columns = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS violations_fts USING fts5(
+            {columns},
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    ''')
+
+    changed = ' OR '.join(f'old.{c} IS NOT new.{c}' for c in FTS_COLUMNS)
+    assignments = ', '.join(f'{c} = new.{c}' for c in FTS_COLUMNS)
+    triggers = (
+        f'''CREATE TRIGGER IF NOT EXISTS violations_fts_insert AFTER INSERT ON violations
+        BEGIN
+            INSERT INTO violations_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS violations_fts_update
+        AFTER UPDATE OF {columns} ON violations
+        WHEN {changed}
+        BEGIN
+            UPDATE violations_fts SET {assignments} WHERE rowid = new.id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS violations_fts_delete AFTER DELETE ON violations
+        WHEN NOT EXISTS (SELECT 1 FROM violations_archive WHERE id = old.id)
+        BEGIN
+            DELETE FROM violations_fts WHERE rowid = old.id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS violations_archive_fts_delete AFTER DELETE ON violations_archive
+        BEGIN
+            DELETE FROM violations_fts WHERE rowid = old.id;
+        END''',
+    )
+    # One statement at a time: executescript() would commit the migration halfway
+    for statement in triggers:
+        conn.execute(statement)
+
+    if not exists:
+        conn.execute(f'''
+            INSERT INTO violations_fts (rowid, {columns})
+            SELECT id, {columns} FROM violations
+            UNION ALL
+            SELECT id, {columns} FROM violations_archive
+        ''')
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix
+
+    Operators typed by the user are not interpreted, so any input is safe.
+    """
+    terms = _TERM_RE.findall(text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _highlighted(value):
+    """HTML-escape a highlight()/snippet() result and turn markers into <mark>"""
+    if value is None:
+        return None
+    return (html.escape(value)
+            .replace(_MARK_OPEN, '<mark>')
+            .replace(_MARK_CLOSE, '</mark>'))
+
+
+def search_violations(conn, text, limit=50, active_only=False):
+    """Ranked matches across tracked and archived violations
+
+    Args:
+        conn: Open connection
+        text (str): Free text typed by the operator
+        limit (int): Maximum number of results
+        active_only (bool): Only return ACTIVE violations
+
+    Returns:
+        list: One dict per match, best first, with <mark>-highlighted fields
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    rows = conn.execute(f'''
+        SELECT violations_fts.rowid AS id,
+               highlight(violations_fts, 0, '{_MARK_OPEN}', '{_MARK_CLOSE}') AS seller_hl,
+               highlight(violations_fts, 1, '{_MARK_OPEN}', '{_MARK_CLOSE}') AS sku_hl,
+               snippet(violations_fts, 2, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 16) AS description_hl,
+               bm25(violations_fts, {weights}) AS score,
+               COALESCE(v.seller_name, a.seller_name) AS seller_name,
+               COALESCE(v.sku, a.sku) AS sku,
+               COALESCE(v.product_description, a.product_description) AS product_description,
+               COALESCE(v.seller_link, a.seller_link) AS seller_link,
+               COALESCE(v.status, a.status) AS status,
+               COALESCE(v.days_active, a.days_active) AS days_active,
+               COALESCE(v.current_price, a.current_price) AS current_price,
+               COALESCE(v.map_price, a.map_price) AS map_price,
+               COALESCE(v.last_seen_date, a.last_seen_date) AS last_seen_date,
+               a.archived_date
+        FROM violations_fts
+        LEFT JOIN violations v ON v.id = violations_fts.rowid
+        LEFT JOIN violations_archive a ON a.id = violations_fts.rowid
+        WHERE violations_fts MATCH ?
+          {"AND v.status = 'ACTIVE'" if active_only else ''}
+        ORDER BY score
+        LIMIT ?
+    ''', (match, limit)).fetchall()
+
+    return [{
+        'id': row['id'],
+        'seller_name': row['seller_name'],
+        'sku': row['sku'],
+        'product_description': row['product_description'],
+        'seller_link': row['seller_link'],
+        'status': row['status'],
+        'archived': row['archived_date'] is not None,
+        'archived_date': row['archived_date'],
+        'days_active': row['days_active'],
+        'current_price': row['current_price'],
+        'map_price': row['map_price'],
+        'last_seen_date': row['last_seen_date'],
+        'score': round(row['score'], 4),
+        'highlight': {
+            'seller_name': _highlighted(row['seller_hl']),
+            'sku': _highlighted(row['sku_hl']),
+            'product_description': _highlighted(row['description_hl']),
+        },
+    } for row in rows]
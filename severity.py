@@ -0,0 +1,137 @@
+"""Severity score for ACTIVE violations and top-N offender queries
+
+The day bucket alone ranks a $5 undercut on a $2,000 fireplace the same as a
+$400 one. Every tracker sync recomputes, in one set-based UPDATE that only
+writes the rows whose score changed:
+
+    severity = 100 * gap * day_factor * repeat_factor
+
+    gap            relative undercut (map_price - current_price) / map_price
+    day_factor     1 + DAY_WEIGHT per day active (capped at MAX_DAYS)
+    repeat_factor  1 + REPEAT_WEIGHT per earlier offense of the seller, i.e.
+                   RESOLVED rows in the tracker or the archive (capped at
+                   MAX_REPEATS)
+
+The score is stored in violations.severity and indexed together with status,
+so top-N queries walk the index instead of sorting the table.
+"""
+
+DAY_WEIGHT = 0.25
+MAX_DAYS = 8
+REPEAT_WEIGHT = 0.5
+MAX_REPEATS = 4
+
+_UPDATE_SEVERITY = '''
+    UPDATE violations
+    SET severity = scored.score
+    FROM (
+        SELECT v.id, ROUND(
+            100.0
+            * CASE WHEN v.map_price > 0 THEN MAX(0.0, (v.map_price - v.current_price) / v.map_price) ELSE 0.0 END
+            * (1 + :day_weight * MIN(COALESCE(v.days_active, 0), :max_days))
+            * (1 + :repeat_weight * MIN(COALESCE(h.offenses, 0), :max_repeats)),
+            2) AS score
+        FROM violations v
+        LEFT JOIN seller_history h ON h.seller_name = v.seller_name
+        WHERE v.status = 'ACTIVE'
+    ) AS scored
+    WHERE violations.id = scored.id AND violations.severity IS NOT scored.score
+'''
+
+
+def init_severity_schema(conn):
+    """Add the severity column (existing databases) and its index"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(violations)')}
+    if 'severity' not in columns:
+        conn.execute('ALTER TABLE violations ADD COLUMN severity REAL DEFAULT 0')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_violations_status_severity
+        ON violations (status, severity DESC)
+    ''')
+
+
+def update_severity(conn):
+    """Recompute severity for every ACTIVE violation (inside the caller's transaction)
+
+    Scores are compared before writing: only rows whose inputs changed (new or
+    repriced rows, days_active below MAX_DAYS, sellers with a new offense) are
+    rewritten.
+
+    Returns:
+        int: Number of violations whose score changed
+    """
+    # Offense history per seller, keyed for the correlated lookup in the UPDATE
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS seller_history (
+            seller_name TEXT PRIMARY KEY,
+            offenses INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('DELETE FROM seller_history')
+    conn.execute('''
+        INSERT INTO seller_history (seller_name, offenses)
+        SELECT seller_name, COUNT(*) FROM (
+            SELECT seller_name FROM violations WHERE status = 'RESOLVED'
+            UNION ALL
+            SELECT seller_name FROM violations_archive
+        )
+        GROUP BY seller_name
+    ''')
+
+    cursor = conn.execute(_UPDATE_SEVERITY, {
+        'day_weight': DAY_WEIGHT, 'max_days': MAX_DAYS,
+        'repeat_weight': REPEAT_WEIGHT, 'max_repeats': MAX_REPEATS,
+    })
+    return cursor.rowcount
+
+
+def top_violations(conn, limit):
+    """The `limit` most severe ACTIVE violations (index walk, no sort)"""
+    rows = conn.execute('''
+        SELECT id, seller_name, sku, product_description, current_price, map_price,
+               days_active, severity
+        FROM violations
+        WHERE status = 'ACTIVE'
+        ORDER BY severity DESC
+        LIMIT ?
+    ''', (limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def top_sellers(conn, limit):
+    """The `limit` sellers with the most severe ACTIVE violation
+
+    Walks the severity index and stops as soon as enough distinct sellers have
+    been seen; their totals come from one grouped query over the
+    (status, seller_name) index, restricted to those sellers.
+    """
+    sellers = {}
+    cursor = conn.execute('''
+        SELECT seller_name, sku, severity FROM violations
+        WHERE status = 'ACTIVE'
+        ORDER BY severity DESC
+    ''')
+    for row in cursor:
+        if row['seller_name'] not in sellers:
+            sellers[row['seller_name']] = {
+                'seller_name': row['seller_name'],
+                'max_severity': row['severity'],
+                'worst_sku': row['sku'],
+            }
+            if len(sellers) >= limit:
+                break
+    cursor.close()
+
+    if not sellers:
+        return []
+
+    placeholders = ', '.join('?' * len(sellers))
+    for seller_name, count, total in conn.execute(f'''
+        SELECT seller_name, COUNT(*), ROUND(SUM(severity), 2) FROM violations
+        WHERE status = 'ACTIVE' AND seller_name IN ({placeholders})
+        GROUP BY seller_name
+    ''', list(sellers)):
+        sellers[seller_name]['active_violations'] = count
+        sellers[seller_name]['total_severity'] = total
+
+    return list(sellers.values())
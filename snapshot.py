@@ -0,0 +1,82 @@
+"""Point-in-time, read-only snapshots of the tracker for heavy reports and exports
+
+A report that reads the tracker with several statements (or streams one big
+SELECT to a slow client) must not see a sync half applied, nor make the upload
+and action writers wait. Two ways to get there:
+
+- Pinned read transaction (default): BEGIN plus a first read pins the
+  connection to the last committed state of the WAL. Every later statement on
+  it sees that state, while writers keep committing to the WAL. Nothing is
+  copied, but the WAL cannot be checkpointed past the pinned state until the
+  snapshot is closed, so keep these short.
+- Copy (copy=True): the online backup API copies the database into a
+  temporary file in one step (one read transaction, writers are not blocked in
+  WAL mode) and the live database is released right away. Costs a full copy
+  of the database (I/O grows with its size), so it is only worth it for a
+  detached file, e.g. an offline export, never for a dashboard request.
+
+The connection is query_only: a report can never write through a snapshot.
+"""
+import os
+import sqlite3
+import tempfile
+
+
+class Snapshot:
+    """Read-only connection to a point-in-time state of db_path
+
+    Args:
+        db_path (str): Live database
+        copy (bool): Read from a backup copy instead of pinning the live WAL
+        timeout (float): Seconds to wait on a lock while opening
+        row_factory: Row factory of the snapshot connection
+    """
+
+    def __init__(self, db_path, copy=False, timeout=10, row_factory=None):
+        self.copy_path = None
+        if copy:
+            self.conn = self._copy(db_path, timeout)
+        else:
+            self.conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+            self.conn.execute('BEGIN')
+            # BEGIN is deferred: the snapshot is only taken at the first read
+            self.conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        self.conn.execute('PRAGMA query_only = 1')
+        self.conn.row_factory = row_factory
+
+    def _copy(self, db_path, timeout):
+        fd, self.copy_path = tempfile.mkstemp(prefix='snapshot_', suffix='.db')
+        os.close(fd)
+        live = sqlite3.connect(db_path, timeout=timeout)
+        try:
+            target = sqlite3.connect(self.copy_path, isolation_level=None)
+            live.backup(target)
+        except Exception:
+            os.remove(self.copy_path)
+            raise
+        finally:
+            live.close()
+        return target
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def close(self):
+        """Release the pinned state (or remove the copy); safe to call twice"""
+        if self.conn is None:
+            return
+        try:
+            if not self.copy_path and self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+        finally:
+            self.conn.close()
+            self.conn = None
+            if self.copy_path:
+                os.remove(self.copy_path)
+                self.copy_path = None
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,62 @@
+"""Shared fixtures: a fresh tracker database per test, violation frames"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# The modules live at the repository root (no package)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app_flask  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'tracker.db')
+    app_flask.init_database(path)
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def app(tmp_path, db_path):
+    """App bound to the test database and upload/output folders under tmp_path"""
+    app = app_flask.create_app({
+        'DB_PATH': db_path,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'OUTPUT_FOLDER': str(tmp_path / 'output'),
+        'TESTING': True,
+    })
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def make_violations():
+    """Included-violations frame (Excel column names) from (seller, sku, price) rows
+
+    MAP is 100 for every row; a row may add a fourth item, its description.
+    """
+    import pandas as pd
+
+    def make(rows):
+        rows = [tuple(row) + ('Widget',) * (4 - len(row)) for row in rows]
+        return pd.DataFrame({
+            'sellers': [row[0] for row in rows],
+            'SAP Material': [row[1] for row in rows],
+            'prices': [float(row[2]) for row in rows],
+            'U.S. MAP': [100.0] * len(rows),
+            'price_difference': [float(row[2]) - 100.0 for row in rows],
+            'Description': [row[3] for row in rows],
+            'seller_links': [f'https://shop.example/{row[0]}/{row[1]}' for row in rows],
+        })
+
+    return make
@@ -0,0 +1,61 @@
+import shutil
+import stat
+from pathlib import Path
+
+import pytest
+
+import assets
+from assets import build_assets, minify_js
+
+
+@pytest.mark.parametrize('source, expected', [
+    # ASI: a line break is kept wherever dropping it could change the program
+    ('var a = 1\nvar b = 2\n', 'var a=1\nvar b=2\n'),
+    ('let x = a\n++b\n', 'let x=a\n++b\n'),
+    ('function f() {\n  return\n  42\n}\n', 'function f(){return\n42}\n'),
+    ('x = 1 /* block\n comment */ y = 2\n', 'x=1\ny=2\n'),
+    ('call(\n  a,\n  b\n)\n', 'call(a,b)\n'),
+    # Tokens that would merge keep one space
+    ('a = b + +c; d = e - -f\n', 'a=b+ +c;d=e- -f\n'),
+    ('const n = 1 .toString()\n', 'const n=1 .toString()\n'),
+])
+def test_whitespace_and_asi(source, expected):
+    assert minify_js(source) == expected
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('const re = /ab+c\\/d[/]/g.test(s) // comment\n', 'const re=/ab+c\\/d[/]/g.test(s)\n'),
+    ('if (ok) return /[a-z]+ [/]/i.exec(s)\n', 'if(ok)return/[a-z]+ [/]/i.exec(s)\n'),
+    ('s.split( /\\s+/ )\n', 's.split(/\\s+/)\n'),
+    # Division, not a regex
+    ('const r = x / 2 / y\n', 'const r=x/2/y\n'),
+    ('const r = (a) / b // half\n', 'const r=(a)/b\n'),
+])
+def test_regex_literals(source, expected):
+    assert minify_js(source) == expected
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('const t = `a  b\n  c`\n', 'const t=`a  b\n  c`\n'),
+    ('const t = `a  ${ b + { c: 1 }.c }  // kept`\n', 'const t=`a  ${b+{c:1}.c}  // kept`\n'),
+    ('const t = `x ${`nested ${ d }`} /* kept */`\n', 'const t=`x ${`nested ${d}`} /* kept */`\n'),
+    ('const t = `\\` ${a}`\n', 'const t=`\\` ${a}`\n'),
+])
+def test_template_literals(source, expected):
+    assert minify_js(source) == expected
+
+
+def test_strings_are_untouched():
+    source = "const s = '// not /* a comment */', q = \"it's  \\\"quoted\\\"\"\n"
+
+    assert minify_js(source) == "const s='// not /* a comment */',q=\"it's  \\\"quoted\\\"\"\n"
+
+
+def test_built_files_are_world_readable(tmp_path):
+    static = tmp_path / 'static'
+    shutil.copytree(Path(assets.__file__).parent / 'static', static, ignore=shutil.ignore_patterns('dist'))
+    manifest = build_assets(str(static))
+
+    built = [static / path for path in manifest.values()] + [static / 'dist' / 'manifest.json']
+    for path in built:
+        assert stat.S_IMODE(path.stat().st_mode) == 0o644 & ~assets._UMASK
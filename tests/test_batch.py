@@ -0,0 +1,73 @@
+from datetime import date
+
+import app_flask
+
+DAY = date.today()
+
+
+def seed(conn, make_violations):
+    with conn:
+        app_flask._sync_violations(conn, make_violations([('Shop A', '1', 90), ('Shop A', '2', 80),
+                                                          ('Shop B', '3', 70)]), DAY)
+    return {row['sku']: row['id'] for row in conn.execute('SELECT id, sku FROM violations')}
+
+
+def emailed(conn):
+    return sorted(row[0] for row in conn.execute(
+        'SELECT sku FROM violations WHERE first_email_sent_date IS NOT NULL'))
+
+
+def test_one_result_per_operation(app, conn, make_violations):
+    ids = seed(conn, make_violations)
+
+    response = app.test_client().post('/api/batch', json={'operations': [
+        {'op': 'mark-all-emails', 'seller_name': 'Shop A', 'day': 0},
+        {'op': 'mark-dns', 'violation_id': ids['3']},
+        {'op': 'send-to-boss', 'seller_name': 'Shop B'},
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(r['index'], r['op'], r['success'], r['rows_affected']) for r in results] == [
+        (0, 'mark-all-emails', True, 2), (1, 'mark-dns', True, 1), (2, 'send-to-boss', True, 0)]
+    assert emailed(conn) == ['1', '2']
+
+
+def test_failing_operation_rolls_back_the_batch(app, conn, make_violations):
+    ids = seed(conn, make_violations)
+
+    response = app.test_client().post('/api/batch', json={'operations': [
+        {'op': 'mark-all-emails', 'seller_name': 'Shop A', 'day': 0},
+        {'op': 'mark-all-emails', 'seller_name': 'Shop B', 'day': 7},
+        {'op': 'mark-dns', 'violation_id': ids['3']},
+    ]})
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'] == 'Invalid day value: 7'
+    assert [r['success'] for r in body['results']] == [False, False, False]
+    assert body['results'][0]['error'] == 'Rolled back: operation 1 failed'
+    assert body['results'][2]['error'] == 'Not run: operation 1 failed'
+    assert emailed(conn) == []
+    assert conn.execute('SELECT COUNT(*) FROM violations WHERE dns_added_date IS NOT NULL').fetchone()[0] == 0
+
+
+def test_unknown_operation_is_rejected(app, conn, make_violations):
+    seed(conn, make_violations)
+
+    response = app.test_client().post('/api/batch', json={'operations': [
+        {'op': 'mark-all-emails', 'seller_name': 'Shop A', 'day': 0},
+        {'op': 'drop-table'},
+    ]})
+
+    assert response.status_code == 400
+    assert response.get_json()['results'][1] == {'index': 1, 'op': 'drop-table', 'success': False,
+                                                 'error': 'Unknown operation: drop-table'}
+    assert emailed(conn) == []
+
+
+def test_empty_batch_is_a_bad_request(app):
+    response = app.test_client().post('/api/batch', json={'operations': []})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'operations must be a non-empty list'}
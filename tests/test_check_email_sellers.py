@@ -0,0 +1,35 @@
+from datetime import date
+
+import app_flask
+from check_email_sellers import check_current_violators
+
+DAY = date(2026, 2, 2)
+
+
+def by_seller(results):
+    return {r['seller']: r for r in results}
+
+
+def test_names_match_case_insensitively_beyond_ascii(conn, make_violations):
+    with conn:
+        app_flask._sync_violations(conn, make_violations([('ÉLITE Ñandú', '1', 90), ('Über Shop', '2', 80),
+                                                          ('plain', '3', 70)]), DAY)
+
+    results = by_seller(check_current_violators(conn, ['élite ñandú', ' ÜBER SHOP ', 'PLAIN', 'Nobody']))
+
+    assert results['élite ñandú']['status'] == 'ACTIVE'
+    assert results['ÜBER SHOP']['active_violations'] == 1
+    assert results['PLAIN']['products'][0]['sku'] == '3'
+    assert results['Nobody']['status'] == 'NOT_TRACKED'
+
+
+def test_resolved_seller_is_clean(conn, make_violations):
+    with conn:
+        app_flask._sync_violations(conn, make_violations([('Shop A', '1', 90), ('Shop B', '2', 80)]), DAY)
+        app_flask._sync_violations(conn, make_violations([('Shop A', '1', 90)]), date(2026, 2, 3))
+
+    results = by_seller(check_current_violators(conn, ['shop a', 'Shop B', 'SHOP A']))
+
+    assert list(results) == ['shop a', 'Shop B']  # one result per seller, first spelling kept
+    assert results['Shop B']['status'] == 'CLEAN'
+    assert results['shop a']['max_days'] == 1
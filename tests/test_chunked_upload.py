@@ -0,0 +1,88 @@
+import io
+import zlib
+
+import pytest
+
+from chunked_upload import MIN_CHUNK_SIZE, create_session, session_status, take_file, write_chunk
+
+
+def crc(data):
+    return f'{zlib.crc32(data):08x}'
+
+
+@pytest.fixture
+def upload(tmp_path):
+    """A 2.5-chunk CSV body and its open session"""
+    body = bytes(range(256)) * (MIN_CHUNK_SIZE * 5 // 2 // 256)
+    status = create_session(str(tmp_path), 'export.csv', len(body), MIN_CHUNK_SIZE)
+    return str(tmp_path), status['upload_id'], body
+
+
+def chunk(body, index):
+    return body[index * MIN_CHUNK_SIZE:(index + 1) * MIN_CHUNK_SIZE]
+
+
+def test_chunks_in_any_order_assemble_the_file(upload, tmp_path):
+    folder, upload_id, body = upload
+    for index in (2, 0, 1):
+        status = write_chunk(folder, upload_id, index, io.BytesIO(chunk(body, index)), crc(chunk(body, index)))
+
+    assert status['complete']
+    dest = tmp_path / 'staging'
+    dest.mkdir()
+    path = take_file(folder, upload_id, str(dest))
+    assert open(path, 'rb').read() == body
+    with pytest.raises(FileNotFoundError):
+        session_status(folder, upload_id)
+
+
+def test_corrupted_chunk_is_rejected(upload):
+    folder, upload_id, body = upload
+    data = bytearray(chunk(body, 1))
+    data[100] ^= 0xFF
+
+    with pytest.raises(ValueError, match='checksum'):
+        write_chunk(folder, upload_id, 1, io.BytesIO(bytes(data)), crc(chunk(body, 1)))
+
+    assert session_status(folder, upload_id)['received'] == []
+    # The resent chunk is accepted
+    write_chunk(folder, upload_id, 1, io.BytesIO(chunk(body, 1)), crc(chunk(body, 1)))
+    assert session_status(folder, upload_id)['received'] == [1]
+
+
+def test_checksum_accepts_unpadded_uppercase_hex(upload):
+    folder, upload_id, body = upload
+    expected = f'{zlib.crc32(chunk(body, 0)):X}'
+
+    write_chunk(folder, upload_id, 0, io.BytesIO(chunk(body, 0)), expected)
+
+    assert session_status(folder, upload_id)['received'] == [0]
+
+
+@pytest.mark.parametrize('index, data, checksum, message', [
+    (0, b'short', None, 'Missing X-Chunk-CRC32'),
+    (0, b'short', '00000000', 'wrong length'),
+    (2, b'x' * (MIN_CHUNK_SIZE // 2 + 1), '00000000', 'wrong length'),
+    (3, b'x', '00000000', 'out of range'),
+])
+def test_bad_chunks_are_rejected(upload, index, data, checksum, message):
+    folder, upload_id, _ = upload
+
+    with pytest.raises(ValueError, match=message):
+        write_chunk(folder, upload_id, index, io.BytesIO(data), checksum)
+
+    assert session_status(folder, upload_id)['received'] == []
+
+
+def test_incomplete_upload_cannot_be_taken(upload, tmp_path):
+    folder, upload_id, body = upload
+    write_chunk(folder, upload_id, 0, io.BytesIO(chunk(body, 0)), crc(chunk(body, 0)))
+
+    with pytest.raises(ValueError, match='incomplete'):
+        take_file(folder, upload_id, str(tmp_path))
+
+
+@pytest.mark.parametrize('upload_id', ['../../etc', 'not-an-id', '0' * 32])
+def test_unknown_upload_ids(upload, upload_id):
+    with pytest.raises(FileNotFoundError):
+        session_status(upload[0], upload_id)
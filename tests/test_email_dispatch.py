@@ -0,0 +1,153 @@
+import asyncio
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+
+import app_flask
+from email_dispatch import CLAIM_TIMEOUT, Dispatcher, idempotency_key
+
+
+class RecordingDispatcher(Dispatcher):
+    """Dispatcher whose relay is a list: no network, optional failures"""
+
+    def __init__(self, *args, fail=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = []
+        self.fail = list(fail)
+
+    def _send(self, smtp, message):
+        if self.fail:
+            raise self.fail.pop(0)
+        self.sent.append(message['Message-ID'])
+        return smtp, {}
+
+    @staticmethod
+    def _close(smtp):
+        pass
+
+
+def seed(conn, make_violations):
+    with conn:
+        app_flask._sync_violations(conn, make_violations([('Shop A', '1', 90), ('Shop A', '2', 80)]),
+                                   datetime.now().date())
+    return [row[0] for row in conn.execute('SELECT id FROM violations ORDER BY id')]
+
+
+def notice(violation_ids):
+    return {
+        'key': idempotency_key('Shop A', 0, violation_ids),
+        'seller_name': 'Shop A',
+        'day': 0,
+        'recipients': ['sales@shop-a.example'],
+        'subject': 'MAP notice',
+        'body': '<p>Please fix</p>',
+        'violation_ids': violation_ids,
+    }
+
+
+def dispatcher(db_path, **kwargs):
+    return RecordingDispatcher(partial(app_flask.get_db, db_path), rate_per_domain=0, backoff=0, **kwargs)
+
+
+def status(conn, key):
+    return conn.execute('SELECT status, attempts FROM email_dispatch WHERE idempotency_key = ?',
+                        (key,)).fetchone()
+
+
+def test_key_ignores_violation_order():
+    assert idempotency_key('Shop A', 0, [2, 1]) == idempotency_key('Shop A', 0, [1, 2])
+    assert idempotency_key('Shop A', 0, [1, 2]) != idempotency_key('Shop A', 1, [1, 2])
+
+
+def test_claim_is_taken_once(db_path, conn, make_violations):
+    item = notice(seed(conn, make_violations))
+    first, second = dispatcher(db_path), dispatcher(db_path)
+
+    assert first.claim(item)
+    assert not second.claim(item)
+    assert tuple(status(conn, item['key'])) == ('sending', 0)
+
+
+def test_stale_claim_is_taken_over(db_path, conn, make_violations):
+    item = notice(seed(conn, make_violations))
+    assert dispatcher(db_path).claim(item)
+    stale = (datetime.now() - CLAIM_TIMEOUT - timedelta(minutes=1)).isoformat()
+    with conn:
+        conn.execute('UPDATE email_dispatch SET updated_at = ?', (stale,))
+
+    assert dispatcher(db_path).claim(item)
+
+
+def test_delivery_is_recorded_once(db_path, conn, make_violations):
+    ids = seed(conn, make_violations)
+    item = notice(ids)
+    sender = dispatcher(db_path)
+    assert sender.claim(item)
+
+    sender.record(item, 1, delivered=True)
+    conn.execute("UPDATE violations SET first_email_sent_date = '2000-01-01' WHERE id = ?", (ids[0],))
+    conn.commit()
+    sender.record(item, 1, delivered=True)
+
+    assert tuple(status(conn, item['key'])) == ('sent', 1)
+    dates = [row[0] for row in conn.execute('SELECT first_email_sent_date FROM violations ORDER BY id')]
+    assert dates[0] == '2000-01-01'  # never overwritten by a second record
+    assert dates[1] is not None
+    assert not dispatcher(db_path).claim(item)
+
+
+def test_run_twice_sends_once(db_path, conn, make_violations):
+    item = notice(seed(conn, make_violations))
+    sender = dispatcher(db_path)
+
+    first = asyncio.run(sender.run([item]))
+    second = asyncio.run(sender.run([item]))
+
+    assert (first['sent'], first['duplicates']) == (1, 0)
+    assert (second['sent'], second['duplicates']) == (0, 1)
+    assert len(sender.sent) == 1
+
+
+def test_transient_failure_is_retried(db_path, conn, make_violations):
+    item = notice(seed(conn, make_violations))
+    sender = dispatcher(db_path, fail=[smtplib.SMTPResponseException(451, b'try later')])
+
+    report = asyncio.run(sender.run([item]))
+
+    assert report['sent'] == 1
+    assert report['results'][0]['attempts'] == 2
+    assert tuple(status(conn, item['key'])) == ('sent', 2)
+
+
+def test_permanent_failure_can_be_sent_by_a_later_run(db_path, conn, make_violations):
+    item = notice(seed(conn, make_violations))
+    failing = dispatcher(db_path, fail=[smtplib.SMTPResponseException(550, b'no such user')])
+
+    assert asyncio.run(failing.run([item]))['failed'] == 1
+    assert tuple(status(conn, item['key'])) == ('failed', 1)
+
+    assert asyncio.run(dispatcher(db_path).run([item]))['sent'] == 1
+
+
+def test_database_calls_stay_off_the_event_loop(db_path, conn, make_violations):
+    item = notice(seed(conn, make_violations))
+    sender = dispatcher(db_path)
+    threads = []
+
+    def traced(method):
+        def call(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return method(*args, **kwargs)
+        return call
+
+    for name in ('enqueue', 'claim', 'record'):
+        setattr(sender, name, traced(getattr(sender, name)))
+
+    async def run():
+        return threading.get_ident(), await sender.run([item])
+
+    loop_thread, report = asyncio.run(run())
+
+    assert report['sent'] == 1
+    assert len(threads) == 3 and loop_thread not in threads
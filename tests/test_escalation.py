@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+import app_flask
+from escalation import apply_decisions, escalation_candidates, management_summary, resolve_decisions
+
+DAY1 = date(2026, 5, 4)
+DAY3 = date(2026, 5, 6)
+
+
+@pytest.fixture
+def tracker(conn, make_violations):
+    """A: Day 3 twice, B: pending approval, C: in DNS, D: Day 1 only, Excluded Shop: Day 3"""
+    day3 = [('A', '1', 90), ('A', '2', 60), ('B', '3', 80), ('C', '4', 80), ('Excluded Shop', '5', 50)]
+    with conn:
+        app_flask._sync_violations(conn, make_violations(day3), DAY1)
+        app_flask._sync_violations(conn, make_violations(day3 + [('D', '6', 10)]), DAY3)
+        conn.execute("UPDATE violations SET pending_approval = 1 WHERE seller_name = 'B'")
+        conn.execute("UPDATE violations SET dns_added_date = '2026-05-05' WHERE seller_name = 'C'")
+    return conn
+
+
+def names(sellers):
+    return [seller['seller_name'] for seller in sellers]
+
+
+def test_candidates_need_a_decision(tracker):
+    candidates = escalation_candidates(tracker, excluded={'excluded shop'})
+
+    assert names(candidates['send_to_boss']) == ['A']
+    assert names(candidates['awaiting']) == ['B']
+    a = candidates['send_to_boss'][0]
+    assert (a['active_violations'], a['day3_violations'], a['max_days_active']) == (2, 2, 2)
+
+
+def test_excluded_sellers_are_matched_trimmed_and_lowercase(tracker):
+    assert 'Excluded Shop' in names(escalation_candidates(tracker)['send_to_boss'])
+    assert 'Excluded Shop' not in names(escalation_candidates(tracker, ['excluded shop'])['send_to_boss'])
+
+
+def test_resolve_expands_all_and_rejects_conflicts(tracker):
+    candidates = escalation_candidates(tracker, excluded={'excluded shop'})
+
+    assert resolve_decisions(candidates, {'send_to_boss': 'all', 'reject': ['B']}) == {
+        'send_to_boss': ['A'], 'approve': [], 'reject': ['B']}
+    with pytest.raises(ValueError, match='both'):
+        resolve_decisions(candidates, {'approve': 'all', 'reject': ['B']})
+    with pytest.raises(ValueError, match='Unknown decision'):
+        resolve_decisions(candidates, {'delete': ['A']})
+    with pytest.raises(ValueError, match='list of seller names'):
+        resolve_decisions(candidates, {'approve': 'B'})
+
+
+def test_apply_and_summarize_a_batch(tracker):
+    candidates = escalation_candidates(tracker, excluded={'excluded shop'})
+    decisions = resolve_decisions(candidates, {'send_to_boss': ['A'], 'approve': ['B']})
+
+    with tracker:
+        rows = apply_decisions(tracker, decisions)
+    remaining = escalation_candidates(tracker, excluded={'excluded shop'})
+
+    assert rows == {'send_to_boss': 2, 'approve': 1, 'reject': 0}
+    assert names(remaining['awaiting']) == ['A'] and remaining['send_to_boss'] == []
+    assert tracker.execute("SELECT dns_added_date IS NOT NULL FROM violations WHERE seller_name = 'B'").fetchone()[0]
+
+    summary = management_summary(candidates, decisions, rows, remaining, today=DAY3)
+    assert summary['subject'] == 'MAP escalation summary - 2026-05-06'
+    assert '  - A: 2 Day 3+ violations, up to 2 days active' in summary['body']
+    assert summary['totals']['approve_violations'] == 1
+    assert summary['totals']['open_awaiting'] == 1
@@ -0,0 +1,95 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from input_formats import (PARQUET_MESSAGE, REQUIRED_COLUMNS, _has_pyarrow, _text_value, file_extension,
+                           read_sheets, unsupported_message)
+
+
+@pytest.fixture
+def export(make_violations):
+    """Export with a leading-zero SKU, a blank description and an extra column"""
+    frame = make_violations([('Shop A', '00123', 90, 'Drill'), ('Shop B', '2', 80, None)])
+    frame['Notes'] = 'ignored'
+    return frame
+
+
+def test_extensions():
+    assert file_extension('/in/Export.CSV.GZ') == '.csv.gz'
+    assert file_extension('export.xlsx') == '.xlsx'
+    assert unsupported_message('export.txt').endswith(': export.txt')
+    assert unsupported_message('export.csv.gz') is None
+
+
+@pytest.mark.parametrize('name', ['export.csv', 'export.csv.gz'])
+def test_csv_reads_required_columns_as_text(tmp_path, export, name):
+    path = tmp_path / name
+    data = export.to_csv(index=False).encode('utf-8')
+    path.write_bytes(gzip.compress(data) if name.endswith('.gz') else data)
+
+    (df,) = read_sheets(path).values()
+
+    assert sorted(df.columns) == sorted(REQUIRED_COLUMNS)
+    assert list(df['SAP Material']) == ['00123', '2']
+    assert list(df['prices']) == [90.0, 80.0]
+    assert pd.isna(df.loc[1, 'Description'])
+
+
+def test_csv_missing_columns_left_for_validation(tmp_path):
+    path = tmp_path / 'export.csv'
+    path.write_text('sellers,prices\nShop A,90\nShop B,80\n')
+
+    (df,) = read_sheets(path).values()
+
+    assert list(df.columns) == ['sellers', 'prices'] and len(df) == 1
+
+
+def test_empty_csv_has_no_sheets(tmp_path):
+    path = tmp_path / 'export.csv'
+    path.write_text('')
+
+    assert read_sheets(path) == {}
+
+
+def test_excel_blanks_stay_missing(tmp_path, export):
+    path = tmp_path / 'export.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        export.to_excel(writer, sheet_name='Amazon', index=False)
+        export.head(0).to_excel(writer, sheet_name='Empty', index=False)
+
+    sheets = read_sheets(path)
+
+    assert list(sheets) == ['Amazon']
+    df = sheets['Amazon']
+    assert list(df['SAP Material']) == ['00123', '2']
+    # dtype=str keeps blank cells as NaN rather than the string 'nan'
+    assert pd.isna(df.loc[1, 'Description'])
+    assert df.loc[0, 'Description'] == 'Drill'
+
+
+def test_parquet_needs_pyarrow(tmp_path):
+    path = tmp_path / 'export.parquet'
+    if _has_pyarrow():
+        assert unsupported_message(path) is None
+    else:
+        assert unsupported_message(path) == f'{PARQUET_MESSAGE}: export.parquet'
+        with pytest.raises(ValueError, match='pyarrow'):
+            read_sheets(path)
+
+
+def test_parquet_typed_text_columns_become_text(tmp_path, export):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'export.parquet'
+    export.assign(**{'SAP Material': [123.0, 2.0]}).to_parquet(path)
+
+    (df,) = read_sheets(path).values()
+
+    assert list(df['SAP Material']) == ['123', '2']
+    assert pd.isna(df.loc[1, 'Description'])
+
+
+def test_text_value():
+    assert _text_value(123.0) == '123'
+    assert _text_value(1.5) == '1.5'
+    assert pd.isna(_text_value(float('nan')))
@@ -0,0 +1,28 @@
+import app_flask
+from upload_metrics import StageMetrics
+
+
+def write_exports(tmp_path, make_violations):
+    first = tmp_path / 'east.csv'
+    second = tmp_path / 'west.csv'
+    make_violations([('A', '1', 90), ('B', '2', 80)]).to_csv(first, index=False)
+    make_violations([('A', '1', 85), ('C', '3', 70)]).to_csv(second, index=False)
+    return [str(first), str(second)]
+
+
+def test_workbooks_are_merged_keeping_the_lowest_price(tmp_path, make_violations):
+    violations, total_rows = app_flask.read_violations_many(write_exports(tmp_path, make_violations))
+
+    assert total_rows == 4
+    prices = dict(zip(zip(violations['sellers'], violations['SAP Material'].astype(str)), violations['prices']))
+    assert prices == {('A', '1'): 85.0, ('B', '2'): 80.0, ('C', '3'): 70.0}
+
+
+def test_parallel_stages_are_measured(tmp_path, make_violations):
+    metrics = StageMetrics()
+    try:
+        app_flask.read_violations_many(write_exports(tmp_path, make_violations), metrics)
+    finally:
+        metrics.close()
+
+    assert 'validate' in metrics.stages
@@ -0,0 +1,87 @@
+import sqlite3
+from datetime import date
+
+import app_flask
+from replay import replay
+from retention import archive_resolved
+
+ARCHIVE_AFTER_DAYS = 1
+
+# (day, rows): C/3 is archived after day 4 and comes back on day 6
+DAYS = [
+    (date(2026, 4, 1), [('Shop A', '1', 90), ('Shop B', '2', 80), ('Shop C', '3', 70)]),
+    (date(2026, 4, 2), [('Shop A', '1', 85), ('Shop B', '2', 80)]),
+    (date(2026, 4, 4), [('Shop A', '1', 85), ('Shop D', '00123', 60)]),
+    (date(2026, 4, 6), [('Shop A', '1', 85), ('Shop C', '3', 75), ('Shop D', '00123', 60)]),
+]
+
+COLUMNS = ('id', 'seller_name', 'sku', 'status', 'current_price', 'map_price', 'first_detected_date',
+           'last_seen_date', 'days_active', 'severity', 'product_description', 'seller_link')
+
+
+def tracker_state(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        columns = ', '.join(COLUMNS)
+        return {
+            'violations': conn.execute(f'SELECT {columns} FROM violations ORDER BY id').fetchall(),
+            'archive': conn.execute(f'SELECT {columns}, archived_date FROM violations_archive ORDER BY id').fetchall(),
+            'diffs': conn.execute('''
+                SELECT upload_date, change, seller_name, sku, old_price, new_price, map_price
+                FROM upload_diffs ORDER BY upload_date, change, seller_name, sku
+            ''').fetchall(),
+        }
+    finally:
+        conn.close()
+
+
+def upload_live(tmp_path, day, rows, make_violations):
+    """The live ingest of one day, dated `day` instead of today"""
+    path = tmp_path / f'export-{day.isoformat()}.csv'
+    make_violations(rows).to_csv(path, index=False)
+
+    violations, _ = app_flask.read_violations(path)
+    included, _ = app_flask.separate_sellers(violations)
+    app_flask.update_violations_tracker(included, today=day)
+    app_flask.archive_workbooks([str(path)], upload_date=day.isoformat())
+    with app_flask.get_db() as conn:
+        archive_resolved(conn, ARCHIVE_AFTER_DAYS, today=day)
+
+
+def test_replay_rebuilds_the_live_tracker(app, tmp_path, make_violations):
+    for day, rows in DAYS:
+        upload_live(tmp_path, day, rows, make_violations)
+    live = tracker_state(app.config['DB_PATH'])
+    assert live['archive'], 'the scenario should archive and restore rows'
+
+    target = str(tmp_path / 'rebuilt.db')
+    result = replay(app.config['DB_PATH'], app.config['UPLOAD_FOLDER'], target,
+                    archive_after_days=ARCHIVE_AFTER_DAYS, workers=1)
+
+    assert result['days_replayed'] == len(DAYS)
+    assert result['missing_days'] == []
+    assert tracker_state(target) == live
+
+
+def test_replay_carries_actions_and_dispatch_log(app, tmp_path, make_violations):
+    for day, rows in DAYS[:2]:
+        upload_live(tmp_path, day, rows, make_violations)
+    with app_flask.get_db() as conn:
+        conn.execute("UPDATE violations SET first_email_sent_date = '2026-04-02' WHERE seller_name = 'Shop A'")
+        conn.execute('''
+            INSERT INTO email_dispatch (idempotency_key, seller_name, day, recipients, subject,
+                                        violation_ids, status, created_at, updated_at)
+            VALUES ('k1', 'Shop A', 0, 'a@shop.example', 'Notice', '[1]', 'sent', '2026-04-02', '2026-04-02')
+        ''')
+
+    target = str(tmp_path / 'rebuilt.db')
+    replay(app.config['DB_PATH'], app.config['UPLOAD_FOLDER'], target, archive_after_days=ARCHIVE_AFTER_DAYS,
+           workers=1)
+
+    conn = sqlite3.connect(target)
+    try:
+        assert conn.execute("SELECT first_email_sent_date FROM violations WHERE seller_name = 'Shop A'"
+                            ).fetchone()[0] == '2026-04-02'
+        assert conn.execute("SELECT status FROM email_dispatch WHERE idempotency_key = 'k1'").fetchone()[0] == 'sent'
+    finally:
+        conn.close()
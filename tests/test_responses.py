@@ -0,0 +1,74 @@
+import gzip
+import json
+from datetime import date
+
+import app_flask
+from responses import STREAM_BATCH, columnar, stream_json
+
+
+def body(response):
+    return json.loads(response.get_data())
+
+
+def test_stream_json_round_trips_in_batches():
+    items = [{'n': n, 'day': date(2026, 1, 1)} for n in range(STREAM_BATCH * 2 + 3)]
+
+    response = stream_json({'success': True, 'shape': 'full'}, 'items', iter(items))
+
+    assert body(response) == {'success': True, 'shape': 'full',
+                              'items': [{'n': n, 'day': '2026-01-01'} for n in range(len(items))]}
+
+
+def test_stream_json_without_fields_or_items():
+    assert body(stream_json({}, 'items', [])) == {'items': []}
+
+
+def test_columnar_names_fields_once():
+    records = [{'sku': '1', 'price': 90, 'other': 'x'}, {'sku': '2', 'price': 80, 'other': 'y'}]
+
+    assert columnar(records, ('sku', 'price')) == {'columns': ['sku', 'price'], 'rows': [['1', 90], ['2', 80]]}
+
+
+def seed(conn, make_violations, count):
+    with conn:
+        app_flask._sync_violations(conn, make_violations([('Shop A', str(n), 90) for n in range(count)]),
+                                   date.today())
+
+
+def test_streamed_list_is_gzipped_chunk_by_chunk(app, conn, make_violations):
+    seed(conn, make_violations, 300)
+
+    response = app.test_client().get('/api/tracker-violations', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    data = json.loads(gzip.decompress(response.get_data()))
+    assert data['success'] and len(data['violations']) == 300
+
+
+def test_identity_when_not_accepted(app, conn, make_violations):
+    seed(conn, make_violations, 300)
+
+    response = app.test_client().get('/api/tracker-violations', headers={'Accept-Encoding': 'identity'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.get_json()['violations']) == 300
+
+
+def test_small_responses_are_not_compressed(app):
+    response = app.test_client().post('/api/batch', json={'operations': []}, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == {'error': 'operations must be a non-empty list'}
+
+
+def test_compact_shape_sends_rows_under_one_column_list(app, conn, make_violations):
+    seed(conn, make_violations, 3)
+    client = app.test_client()
+
+    full = client.get('/api/tracker-violations').get_json()['violations']
+    compact = client.get('/api/tracker-violations?shape=compact').get_json()
+
+    assert compact['shape'] == 'compact'
+    assert [dict(zip(compact['columns'], row)) for row in compact['rows']] == full
@@ -0,0 +1,153 @@
+import sqlite3
+from datetime import date
+
+import app_flask
+from retention import archive_resolved, convert_to_incremental, incremental_vacuum, restore_archived
+from violation_diff import apply_diff, compute_diff, load_snapshot
+
+DAY1 = date(2026, 1, 5)
+DAY2 = date(2026, 1, 6)
+LATER = date(2026, 3, 1)
+
+
+def sync(conn, frame, today):
+    with conn:
+        return app_flask._sync_violations(conn, frame, today)
+
+
+def rows(conn, table='violations'):
+    return {(row['seller_name'], row['sku']): dict(row) for row in conn.execute(f'SELECT * FROM {table}')}
+
+
+def search_ids(conn, text):
+    return sorted(row[0] for row in conn.execute(
+        'SELECT rowid FROM violations_fts WHERE violations_fts MATCH ?', (text,)))
+
+
+def test_archives_only_old_resolved_rows(conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90), ('B', '2', 80)]), DAY1)
+    sync(conn, make_violations([('A', '1', 90)]), DAY2)
+
+    with conn:
+        assert archive_resolved(conn, 30, today=date(2026, 1, 20)) == 0
+        assert archive_resolved(conn, 30, today=LATER) == 1
+
+    assert set(rows(conn)) == {('A', '1')}
+    archived = rows(conn, 'violations_archive')
+    assert set(archived) == {('B', '2')}
+    assert archived[('B', '2')]['archived_date'] == LATER.isoformat()
+    # Still searchable and in the reporting view
+    assert len(search_ids(conn, 'Widget')) == 2
+    assert conn.execute('SELECT COUNT(*) FROM violations_all').fetchone()[0] == 2
+
+
+def test_reappearing_archived_row_is_reactivated(conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90), ('B', '2', 80)]), DAY1)
+    conn.execute("UPDATE violations SET first_email_sent_date = '2026-01-05' WHERE seller_name = 'B'")
+    sync(conn, make_violations([('A', '1', 90)]), DAY2)
+    original = rows(conn)[('B', '2')]
+    with conn:
+        archive_resolved(conn, 30, today=LATER)
+
+    counts = sync(conn, make_violations([('A', '1', 90), ('B', '2', 80)]), LATER)
+
+    assert counts['changes']['reactivated'] == 1
+    assert counts['new'] == 0
+    restored = rows(conn)[('B', '2')]
+    assert restored['id'] == original['id']
+    assert restored['status'] == 'ACTIVE'
+    assert restored['first_detected_date'] == DAY1.isoformat()
+    assert restored['first_email_sent_date'] == '2026-01-05'
+    assert restored['days_active'] == (LATER - DAY1).days
+    assert rows(conn, 'violations_archive') == {}
+    assert search_ids(conn, 'Widget') == sorted(row['id'] for row in rows(conn).values())
+    conn.execute("INSERT INTO violations_fts (violations_fts) VALUES ('integrity-check')")
+
+
+def archive_b(conn, make_violations):
+    """B/2 detected on DAY1, resolved on DAY2, archived; returns its id"""
+    sync(conn, make_violations([('B', '2', 80)]), DAY1)
+    sync(conn, make_violations([]), DAY2)
+    with conn:
+        archive_resolved(conn, 30, today=LATER)
+    return conn.execute('SELECT id FROM violations_archive').fetchone()[0]
+
+
+def test_restore_takes_the_latest_episode(conn, make_violations):
+    first = archive_b(conn, make_violations)
+    columns = ', '.join(c for c in rows(conn, 'violations_archive')[('B', '2')] if c != 'id')
+    with conn:
+        # A later episode of the same pair (higher id), archived again
+        conn.execute(f'''
+            INSERT INTO violations_archive (id, {columns})
+            SELECT id + 10, {columns} FROM violations_archive WHERE id = ?
+        ''', (first,))
+        conn.execute("UPDATE violations_archive SET first_detected_date = '2026-02-01' WHERE id = ?",
+                     (first + 10,))
+
+    with conn:
+        assert restore_archived(conn, [('B', '2')]) == 1
+
+    restored = rows(conn)[('B', '2')]
+    assert restored['id'] == first + 10
+    assert restored['first_detected_date'] == '2026-02-01'
+    assert [row[0] for row in conn.execute('SELECT id FROM violations_archive')] == [first]
+
+
+def test_restore_ignores_pairs_still_tracked(conn, make_violations):
+    archive_b(conn, make_violations)
+    with conn:
+        # Tracked again without going through the sync (no restore)
+        apply_diff(conn, compute_diff(make_violations([('B', '2', 70)]), load_snapshot(conn)), LATER)
+
+    with conn:
+        assert restore_archived(conn, [('B', '2'), ('Z', '9')]) == 0
+
+    assert conn.execute('SELECT COUNT(*) FROM violations_archive').fetchone()[0] == 1
+
+
+def legacy_database(path, make_violations):
+    """Tracker database created before auto_vacuum=INCREMENTAL, with free pages"""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA auto_vacuum = NONE')
+    conn.execute('CREATE TABLE filler (data BLOB)')
+    conn.close()
+    app_flask.init_database(path)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany('INSERT INTO filler VALUES (zeroblob(4096))', [()] * 50)
+    with conn:
+        conn.execute('DELETE FROM filler')
+    return conn
+
+
+def test_retention_never_runs_a_full_vacuum(tmp_path, make_violations):
+    path = str(tmp_path / 'legacy.db')
+    conn = legacy_database(path, make_violations)
+    free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 0 and free > 0
+
+    result = app_flask.apply_retention(path, older_than_days=30)
+
+    assert result == {'archived': 0, 'freed_pages': 0, 'converted': False}
+    assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 0
+    assert conn.execute('PRAGMA freelist_count').fetchone()[0] == free
+    conn.close()
+
+
+def test_conversion_then_incremental_vacuum(tmp_path, make_violations):
+    path = str(tmp_path / 'legacy.db')
+    conn = legacy_database(path, make_violations)
+
+    assert convert_to_incremental(conn)
+    assert not convert_to_incremental(conn)
+    assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+
+    with conn:
+        conn.executemany('INSERT INTO filler VALUES (zeroblob(4096))', [()] * 20)
+    with conn:
+        conn.execute('DELETE FROM filler')
+    assert incremental_vacuum(conn) > 0
+    assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,88 @@
+from datetime import date
+
+import app_flask
+from retention import archive_resolved
+from search import build_match_query, search_violations
+
+DAY1 = date(2026, 3, 2)
+DAY2 = date(2026, 3, 3)
+
+
+def sync(conn, frame, today):
+    with conn:
+        app_flask._sync_violations(conn, frame, today)
+
+
+def found(conn, text, **kwargs):
+    return sorted((r['seller_name'], r['sku']) for r in search_violations(conn, text, **kwargs))
+
+
+def test_operators_are_not_interpreted():
+    assert build_match_query('blue OR "widget" -x*') == '"blue"* "OR"* "widget"* "x"*'
+    assert build_match_query('  ') == ''
+
+
+def test_every_word_matches_as_a_prefix(conn, make_violations):
+    sync(conn, make_violations([('Acme Tools', '1', 90, 'Cordless drill'), ('Bolt Co', '2', 80, 'Corded drill'),
+                                ('Crème Shop', '3', 70, 'Hammer')]), DAY1)
+
+    assert found(conn, 'dril') == [('Acme Tools', '1'), ('Bolt Co', '2')]
+    assert found(conn, 'cordless drill') == [('Acme Tools', '1')]
+    assert found(conn, 'creme') == [('Crème Shop', '3')]  # diacritics folded
+    assert search_violations(conn, '"') == []
+
+
+def test_seller_and_sku_outrank_description(conn, make_violations):
+    sync(conn, make_violations([('Hammer Depot', '1', 90, 'Drill'), ('Bolt Co', '2', 80, 'Hammer')]), DAY1)
+
+    results = search_violations(conn, 'hammer')
+
+    assert [r['seller_name'] for r in results] == ['Hammer Depot', 'Bolt Co']
+    assert results[0]['highlight']['seller_name'] == '<mark>Hammer</mark> Depot'
+
+
+def test_highlights_are_escaped(conn, make_violations):
+    sync(conn, make_violations([('Shop A', '1', 90, '<b>Drill</b> & bits')]), DAY1)
+
+    description = search_violations(conn, 'drill')[0]['highlight']['product_description']
+
+    assert description == '&lt;b&gt;<mark>Drill</mark>&lt;/b&gt; &amp; bits'
+
+
+def test_index_follows_sync_updates(conn, make_violations):
+    sync(conn, make_violations([('Shop A', '1', 90, 'Drill')]), DAY1)
+    sync(conn, make_violations([('Shop A', '1', 90, 'Impact driver')]), DAY2)
+
+    assert found(conn, 'drill') == []
+    assert found(conn, 'impact') == [('Shop A', '1')]
+    with conn:
+        conn.execute('DELETE FROM violations')
+    assert found(conn, 'impact') == []
+
+
+def test_archived_rows_stay_searchable_until_purged(conn, make_violations):
+    sync(conn, make_violations([('Shop A', '1', 90, 'Drill'), ('Shop B', '2', 80, 'Drill')]), DAY1)
+    sync(conn, make_violations([('Shop A', '1', 90, 'Drill')]), DAY2)
+    with conn:
+        archive_resolved(conn, 1, today=date(2026, 4, 1))
+
+    results = {r['seller_name']: r for r in search_violations(conn, 'drill')}
+    assert results['Shop B']['archived'] and results['Shop B']['status'] == 'RESOLVED'
+    assert not results['Shop A']['archived']
+    assert found(conn, 'drill', active_only=True) == [('Shop A', '1')]
+
+    with conn:
+        conn.execute('DELETE FROM violations_archive')
+    assert found(conn, 'drill') == [('Shop A', '1')]
+    conn.execute("INSERT INTO violations_fts (violations_fts) VALUES ('integrity-check')")
+
+
+def test_search_endpoint(app, conn, make_violations):
+    sync(conn, make_violations([('Shop A', '1', 90, 'Drill')]), DAY1)
+    client = app.test_client()
+
+    body = client.get('/api/search?q=dri&limit=5').get_json()
+
+    assert (body['count'], body['results'][0]['sku']) == (1, '1')
+    assert client.get('/api/search').status_code == 400
+    assert client.get('/api/search?q=x&limit=many').status_code == 400
@@ -0,0 +1,62 @@
+from datetime import date
+
+import pytest
+
+import app_flask
+
+
+@pytest.fixture
+def client(app, make_violations):
+    with app_flask.get_db() as conn:
+        app_flask._sync_violations(conn, make_violations([('Shop A', '1', 90), ('Shop A', '2', 80),
+                                                          ('Shop B/EU', '3', 70)]), date(2026, 5, 4))
+    return app.test_client()
+
+
+def write(sql):
+    with app_flask.get_db() as conn:
+        conn.execute(sql)
+
+
+def test_unchanged_seller_revalidates_with_304(client):
+    first = client.get('/api/sellers/Shop A/violations')
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/')
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert [p['sku'] for p in first.get_json()['products']] == ['1', '2']
+
+    again = client.get('/api/sellers/Shop A/violations', headers={'If-None-Match': first.headers['ETag']})
+
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+
+def test_writes_to_other_sellers_keep_the_etag(client):
+    etag = client.get('/api/sellers/Shop A/violations').headers['ETag']
+
+    write("UPDATE violations SET pending_approval = 1 WHERE seller_name = 'Shop B/EU'")
+
+    assert client.get('/api/sellers/Shop A/violations', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_changed_seller_gets_a_new_etag(client):
+    etag = client.get('/api/sellers/Shop A/violations').headers['ETag']
+
+    write("UPDATE violations SET first_email_sent_date = '2026-05-04' WHERE seller_name = 'Shop A'")
+    response = client.get('/api/sellers/Shop A/violations', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_shapes_have_their_own_etag(client):
+    full = client.get('/api/sellers/Shop A/violations')
+    compact = client.get('/api/sellers/Shop A/violations?shape=compact')
+
+    assert compact.get_json()['products']['rows']
+    assert compact.headers['ETag'] != full.headers['ETag']
+
+
+def test_seller_names_with_slashes_and_unknown_sellers(client):
+    assert client.get('/api/sellers/Shop B/EU/violations').get_json()['seller'] == 'Shop B/EU'
+    assert client.get('/api/sellers/Nobody/violations').status_code == 404
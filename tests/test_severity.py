@@ -0,0 +1,71 @@
+from datetime import date
+
+import app_flask
+from severity import top_sellers, top_violations, update_severity
+
+DAY1 = date(2026, 5, 4)
+DAY3 = date(2026, 5, 6)
+
+
+def sync(conn, frame, today):
+    with conn:
+        app_flask._sync_violations(conn, frame, today)
+        return update_severity(conn)
+
+
+def scores(conn):
+    return {(row['seller_name'], row['sku']): row['severity']
+            for row in conn.execute("SELECT * FROM violations WHERE status = 'ACTIVE'")}
+
+
+def test_score_follows_the_relative_undercut(conn, make_violations):
+    assert sync(conn, make_violations([('A', '1', 90), ('B', '2', 50)]), DAY1) == 2
+
+    assert scores(conn) == {('A', '1'): 10.0, ('B', '2'): 50.0}
+
+
+def test_age_and_repeat_offenses_raise_the_score(conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90), ('A', '2', 80), ('B', '3', 90)]), DAY1)
+
+    sync(conn, make_violations([('A', '1', 90), ('B', '3', 90)]), DAY3)  # A/2 resolved: A offended before
+
+    assert scores(conn) == {('A', '1'): 22.5, ('B', '3'): 15.0}
+
+
+def test_factors_are_capped(conn, make_violations):
+    sync(conn, make_violations([('A', str(n), 90) for n in range(1, 11)]), DAY1)
+    sync(conn, make_violations([('A', '1', 90)]), DAY3)  # nine earlier offenses
+    with conn:
+        conn.execute("UPDATE violations SET days_active = 40 WHERE status = 'ACTIVE'")
+        update_severity(conn)
+
+    assert scores(conn) == {('A', '1'): 10.0 * 3 * 3}
+
+
+def test_unchanged_scores_are_not_rewritten(conn, make_violations):
+    frame = make_violations([('A', '1', 90), ('B', '2', 50)])
+    sync(conn, frame, DAY1)
+
+    assert sync(conn, frame, DAY1) == 0
+
+
+def test_top_lists_are_ordered_by_severity(conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90), ('A', '2', 60), ('B', '3', 50), ('C', '4', 95)]), DAY1)
+
+    assert [(v['seller_name'], v['sku']) for v in top_violations(conn, 3)] == [('B', '3'), ('A', '2'), ('A', '1')]
+    assert top_sellers(conn, 2) == [
+        {'seller_name': 'B', 'max_severity': 50.0, 'worst_sku': '3', 'active_violations': 1, 'total_severity': 50.0},
+        {'seller_name': 'A', 'max_severity': 40.0, 'worst_sku': '2', 'active_violations': 2, 'total_severity': 50.0},
+    ]
+    assert top_sellers(conn, 10)[-1]['seller_name'] == 'C'
+
+
+def test_top_offenders_endpoint(app, conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90), ('B', '2', 50)]), DAY1)
+    client = app.test_client()
+
+    body = client.get('/api/top-offenders?n=1').get_json()
+
+    assert [s['seller_name'] for s in body['sellers']] == ['B']
+    assert [v['sku'] for v in body['violations']] == ['2']
+    assert client.get('/api/top-offenders?n=all').status_code == 400
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+import app_flask
+from snapshot import Snapshot
+
+
+def count(conn):
+    return conn.execute('SELECT COUNT(*) FROM violations').fetchone()[0]
+
+
+def seed(db_path, make_violations, rows):
+    with app_flask.get_db(db_path) as conn:
+        app_flask._sync_violations(conn, make_violations(rows), date(2026, 5, 4))
+
+
+def checkpoint(db_path):
+    """Busy flag of a TRUNCATE checkpoint: 1 while a reader pins an older state"""
+    conn = sqlite3.connect(db_path, timeout=0)
+    try:
+        return conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_pinned_snapshot_ignores_later_commits(db_path, make_violations):
+    seed(db_path, make_violations, [('A', '1', 90)])
+    snapshot = Snapshot(db_path)
+
+    seed(db_path, make_violations, [('A', '1', 90), ('B', '2', 80)])  # the writer is not blocked
+
+    assert count(snapshot) == 1
+    assert checkpoint(db_path) == 1
+    snapshot.close()
+    snapshot.close()
+    assert checkpoint(db_path) == 0
+    with Snapshot(db_path) as conn:
+        assert count(conn) == 2
+
+
+@pytest.mark.parametrize('copy', [False, True])
+def test_snapshot_is_read_only(db_path, copy):
+    with Snapshot(db_path, copy=copy) as conn:
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            conn.execute('DELETE FROM violations')
+
+
+def test_copy_releases_the_live_database(db_path, make_violations):
+    seed(db_path, make_violations, [('A', '1', 90)])
+    snapshot = Snapshot(db_path, copy=True, row_factory=sqlite3.Row)
+    path = snapshot.copy_path
+
+    seed(db_path, make_violations, [('A', '1', 90), ('B', '2', 80)])
+
+    assert checkpoint(db_path) == 0
+    assert snapshot.execute('SELECT seller_name FROM violations').fetchone()['seller_name'] == 'A'
+    snapshot.close()
+    assert not os.path.exists(path)
+
+
+def test_streamed_export_unpins_once_sent(app, make_violations):
+    db_path = app.config['DB_PATH']
+    seed(db_path, make_violations, [('A', '1', 90)])
+
+    response = app.test_client().get('/api/tracker-violations')
+    seed(db_path, make_violations, [('A', '1', 90), ('B', '2', 80)])
+    assert len(response.get_json()['violations']) == 1  # state when the request started
+
+    response.close()
+    assert checkpoint(db_path) == 0
@@ -0,0 +1,69 @@
+import gzip
+from datetime import date
+
+from upload_archive import blob_path, extract_blob, prune, store_blob
+
+DAY = date(2026, 6, 1)
+
+
+def store(conn, folder, path, today=DAY):
+    with conn:
+        return store_blob(conn, folder, path, today=today)
+
+
+def test_identical_files_are_stored_once(conn, tmp_path):
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    (tmp_path / 'a.csv').write_bytes(b'sellers,prices\nA,90\n')
+    (tmp_path / 'b.csv').write_bytes(b'sellers,prices\nA,90\n')
+
+    first = store(conn, folder, tmp_path / 'a.csv')
+    second = store(conn, folder, tmp_path / 'b.csv')
+
+    assert not first['deduplicated'] and second['deduplicated']
+    assert first['sha256'] == second['sha256']
+    assert [p.name for p in folder.iterdir()] == [f"{first['sha256']}.csv.gz"]
+    assert extract_blob(folder, first['sha256'], '.csv', tmp_path, 'out.csv').read_bytes() == \
+        b'sellers,prices\nA,90\n'
+
+
+def test_compressed_export_is_stored_as_uploaded(conn, tmp_path):
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    payload = gzip.compress(b'sellers,prices\nA,90\n')
+    (tmp_path / 'export.csv.gz').write_bytes(payload)
+
+    blob = store(conn, folder, tmp_path / 'export.csv.gz')
+
+    path = blob_path(folder, blob['sha256'], '.csv.gz')
+    assert path.name == f"{blob['sha256']}.csv.gz"
+    assert path.read_bytes() == payload
+    assert blob['stored_size'] == blob['size'] == len(payload)
+    assert extract_blob(folder, blob['sha256'], '.csv.gz', tmp_path, 'out.csv.gz').read_bytes() == payload
+
+
+def test_legacy_double_compressed_blob_still_extracts(tmp_path):
+    payload = gzip.compress(b'sellers,prices\nA,90\n')
+    (tmp_path / 'abc.csv.gz.gz').write_bytes(gzip.compress(payload))
+
+    assert blob_path(tmp_path, 'abc', '.csv.gz').name == 'abc.csv.gz.gz'
+    assert extract_blob(tmp_path, 'abc', '.csv.gz', tmp_path, 'out.csv.gz').read_bytes() == payload
+
+
+def test_same_bytes_under_another_extension_reuse_the_blob(conn, tmp_path):
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    (tmp_path / 'export.csv').write_bytes(b'sellers,prices\nA,90\n')
+    (tmp_path / 'export.txt.csv.gz').write_bytes(b'sellers,prices\nA,90\n')
+
+    first = store(conn, folder, tmp_path / 'export.csv')
+    second = store(conn, folder, tmp_path / 'export.txt.csv.gz', today=date(2026, 6, 2))
+
+    assert second['deduplicated'] and second['ext'] == '.csv'
+    assert len(list(folder.iterdir())) == 1
+    assert tuple(conn.execute('SELECT ext, last_used_date FROM upload_blobs').fetchone()) == ('.csv', '2026-06-02')
+
+    # Pruning the only row leaves no file behind
+    with conn:
+        result = prune(conn, folder, retention_days=0, today=date(2026, 7, 1))
+    assert result['paths'] == [str(blob_path(folder, first['sha256'], '.csv'))]
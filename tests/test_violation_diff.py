@@ -0,0 +1,90 @@
+from datetime import date
+
+from violation_diff import apply_diff, compute_diff, load_snapshot
+
+DAY1 = date(2026, 3, 2)
+DAY2 = date(2026, 3, 3)
+
+
+def classes(diff):
+    return {(row.seller_name, row.sku): row.change for row in diff.itertuples()}
+
+
+def sync(conn, frame, today):
+    with conn:
+        return apply_diff(conn, compute_diff(frame, load_snapshot(conn)), today)
+
+
+def test_empty_tracker_classifies_everything_new(conn, make_violations):
+    diff = compute_diff(make_violations([('A', '1', 90), ('B', '2', 80)]), load_snapshot(conn))
+
+    assert classes(diff) == {('A', '1'): 'new', ('B', '2'): 'new'}
+
+
+def test_classification_against_tracker(conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90), ('A', '2', 90), ('B', '3', 80), ('C', '4', 70)]), DAY1)
+    conn.execute("UPDATE violations SET status = 'RESOLVED' WHERE seller_name = 'C'")
+
+    today = make_violations([
+        ('A', '1', 90),             # same price
+        ('A', '2', 85),             # repriced
+        ('C', '4', 70),             # back after being resolved
+        ('D', '5', 60),             # first seen
+    ])                              # B/3 is gone
+    diff = compute_diff(today, load_snapshot(conn))
+
+    assert classes(diff) == {
+        ('A', '1'): 'persisting',
+        ('A', '2'): 'price_changed',
+        ('C', '4'): 'reactivated',
+        ('D', '5'): 'new',
+        ('B', '3'): 'resolved',
+    }
+
+
+def test_description_change_is_rewritten_but_persisting(conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90, 'Widget')]), DAY1)
+
+    diff = compute_diff(make_violations([('A', '1', 90, 'Widget, blue')]), load_snapshot(conn))
+
+    assert classes(diff) == {('A', '1'): 'persisting'}
+    assert bool(diff.loc[0, 'rewrite'])
+
+
+def test_sku_matched_as_text(conn, make_violations):
+    sync(conn, make_violations([('A', '00123', 90)]), DAY1)
+
+    diff = compute_diff(make_violations([('A', '00123', 90)]), load_snapshot(conn))
+
+    assert classes(diff) == {('A', '00123'): 'persisting'}
+
+
+def test_duplicate_rows_keep_the_last(conn, make_violations):
+    diff = compute_diff(make_violations([('A', '1', 90), ('A', '1', 80)]), load_snapshot(conn))
+
+    assert len(diff) == 1
+    assert diff.loc[0, 'new_price'] == 80
+
+
+def test_apply_diff_ages_and_resolves(conn, make_violations):
+    sync(conn, make_violations([('A', '1', 90), ('B', '2', 80)]), DAY1)
+    counts = sync(conn, make_violations([('A', '1', 95)]), DAY2)
+
+    assert counts == {'new': 0, 'reactivated': 0, 'price_changed': 1, 'persisting': 0, 'resolved': 1}
+    rows = {row['seller_name']: row for row in conn.execute('SELECT * FROM violations')}
+    assert rows['A']['status'] == 'ACTIVE'
+    assert rows['A']['current_price'] == 95
+    assert rows['A']['days_active'] == 1
+    assert rows['A']['last_seen_date'] == DAY2.isoformat()
+    assert rows['B']['status'] == 'RESOLVED'
+    assert rows['B']['last_seen_date'] == DAY1.isoformat()
+
+
+def test_same_day_resync_writes_nothing(conn, make_violations):
+    frame = make_violations([('A', '1', 90), ('B', '2', 80)])
+    sync(conn, frame, DAY1)
+
+    before = conn.total_changes
+    sync(conn, frame, DAY1)
+
+    assert conn.total_changes == before
@@ -0,0 +1,153 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+import app_flask
+from violation_store import ViolationStore, summarize_seller
+
+DAY = date(2026, 5, 4)
+
+
+@pytest.fixture
+def store(conn, db_path, make_violations):
+    """Store over A (2 rows), B (1 row) and a RESOLVED row of C, loaded"""
+    with conn:
+        app_flask._sync_violations(conn, make_violations([('A', '1', 90), ('A', '2', 80), ('B', '3', 70),
+                                                          ('C', '4', 60)]), DAY)
+        app_flask._sync_violations(conn, make_violations([('A', '1', 90), ('A', '2', 80), ('B', '3', 70)]), DAY)
+        app_flask.bump_data_version(conn)
+    store = ViolationStore(db_path)
+    store.grouped()
+    return store
+
+
+def write(db_path, sql, params=()):
+    """One committed write through get_db (bumps the data version); returns the new stamp"""
+    with app_flask.get_db(db_path) as conn:
+        conn.execute(sql, params)
+    return stamp(db_path)
+
+
+def stamp(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def ids(records):
+    return sorted(record.id for record in records)
+
+
+def violation_id(db_path, sku):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT id FROM violations WHERE sku = ?', (sku,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_load_groups_active_violations(store):
+    grouped = store.grouped()
+
+    assert list(grouped) == ['A', 'B']
+    assert [record.sku for record in grouped['A']] == ['1', '2']
+    assert len(store) == 3
+    assert store.by_day(0) == grouped['A'] + grouped['B']
+    assert store.seller('C') == ()
+
+
+def test_refresh_sellers_patches_in_place_after_own_write(store, db_path):
+    before = store.grouped()
+    new_stamp = write(db_path, "UPDATE violations SET pending_approval = 1 WHERE seller_name = 'A'")
+    assert new_stamp == store.data_version + 1
+
+    store.refresh_sellers(['A'], data_version=new_stamp)
+
+    grouped = store.grouped()
+    assert all(record.pending_approval == 1 for record in grouped['A'])
+    assert grouped['B'] is before['B']  # untouched seller kept, not reloaded
+    assert store.data_version == new_stamp
+
+
+def test_refresh_sellers_reloads_after_another_write(store, db_path):
+    before = store.grouped()
+    write(db_path, "UPDATE violations SET current_price = 65 WHERE seller_name = 'B'")  # someone else
+    new_stamp = write(db_path, "UPDATE violations SET pending_approval = 1 WHERE seller_name = 'A'")
+
+    store.refresh_sellers(['A'], data_version=new_stamp)
+
+    grouped = store.grouped()
+    assert grouped['B'] is not before['B']
+    assert grouped['B'][0].current_price == 65
+    assert all(record.pending_approval == 1 for record in grouped['A'])
+    assert store.data_version == new_stamp
+
+
+def test_refresh_ids_after_delete(store, db_path):
+    deleted = violation_id(db_path, '2')
+    new_stamp = write(db_path, 'DELETE FROM violations WHERE id = ?', (deleted,))
+
+    store.refresh_ids([deleted], data_version=new_stamp)
+
+    assert ids(store.seller('A')) == [violation_id(db_path, '1')]
+    assert store.get(deleted) is None
+
+
+def test_refresh_ids_after_move_to_another_seller(store, db_path):
+    moved = violation_id(db_path, '2')
+    new_stamp = write(db_path, "UPDATE violations SET seller_name = 'B' WHERE id = ?", (moved,))
+
+    store.refresh_ids([moved], data_version=new_stamp)
+
+    assert moved not in ids(store.seller('A'))
+    assert moved in ids(store.seller('B'))
+    assert store.get(moved).seller_name == 'B'
+
+
+def test_reload_when_another_connection_bumps_the_stamp(store, db_path):
+    version = store.version
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE violations SET status = 'RESOLVED' WHERE seller_name = 'B'")
+        app_flask.bump_data_version(conn)
+    conn.close()
+
+    assert list(store.grouped()) == ['A']
+    assert store.version > version
+    assert store.data_version == stamp(db_path)
+
+
+def test_unchanged_stamp_serves_from_memory(store):
+    grouped = store.grouped()
+    version = store.version
+
+    assert store.grouped() is grouped
+    assert store.version == version
+
+
+def test_summaries_reuse_untouched_sellers(store, db_path):
+    first = store.summaries()
+    assert first['A'] == summarize_seller(store.seller('A'))
+
+    new_stamp = write(db_path, "UPDATE violations SET first_email_sent_date = '2026-05-04' WHERE seller_name = 'A'")
+    store.refresh_sellers(['A'], data_version=new_stamp)
+    second = store.summaries()
+
+    assert second['B'] is first['B']
+    assert second['A'] is not first['A']
+    assert second['A']['first_emails_sent'] == 2
+
+
+def test_invalidate_reloads_on_next_read(store, db_path):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE violations SET current_price = 50 WHERE seller_name = 'B'")  # no stamp bump
+    conn.close()
+    assert store.seller('B')[0].current_price == 70
+
+    store.invalidate()
+
+    assert store.seller('B')[0].current_price == 50
@@ -0,0 +1,197 @@
+"""Content-addressed, compressed archive of uploaded workbooks
+
+Uploads used to be saved as uploads/<original filename>: same-named files
+overwrote each other and the folder grew forever. Every synced workbook is now
+stored once, gzip-compressed, under its SHA-256:
+
+    uploads/<sha256>.<ext>.gz
+    uploads/<sha256>.csv.gz        already compressed exports, stored as uploaded
+
+- upload_blobs: one row per distinct content (sizes, last day it was used)
+- upload_files: one row per file of each upload day, linked to upload_log by
+  upload_date and kept even after the blob itself is pruned
+
+Identical files uploaded under different names (or extensions) share one
+blob. prune() drops
+blobs not used for `retention_days` and then the least recently used ones
+until the archive fits in `budget_bytes`.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+from datetime import date, timedelta
+from pathlib import Path
+
+from input_formats import file_extension
+
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_BUDGET_BYTES = 2 * 1024 ** 3  # 2 GB
+
+CHUNK_SIZE = 1024 * 1024
+
+# Stored as uploaded: gzip would only add a second layer
+COMPRESSED_EXTENSIONS = ('.csv.gz',)
+
+
+def init_upload_archive_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS upload_blobs (
+            sha256 TEXT PRIMARY KEY,
+            ext TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            created_date TEXT NOT NULL,
+            last_used_date TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS upload_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upload_date TEXT NOT NULL,
+            original_name TEXT NOT NULL,
+            sha256 TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_upload_files_date ON upload_files (upload_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_upload_blobs_used ON upload_blobs (last_used_date)')
+
+
+def blob_path(folder, sha256, ext):
+    """Stored file of a blob: <sha256><ext>.gz, or <sha256><ext> for compressed formats"""
+    if ext in COMPRESSED_EXTENSIONS:
+        path = Path(folder) / f'{sha256}{ext}'
+        # Blobs stored before compressed formats were kept as-is were gzipped twice
+        legacy = Path(folder) / f'{sha256}{ext}.gz'
+        return legacy if not path.exists() and legacy.exists() else path
+    return Path(folder) / f'{sha256}{ext}.gz'
+
+
+def store_blob(conn, folder, file_path, today=None):
+    """Hash and compress file_path into the archive (no-op copy if already stored)
+
+    The file is read once: hashing and compression share the same pass, into
+    a temp file that is atomically renamed to its content address. Already
+    compressed exports (.csv.gz) are stored as uploaded. Content already in
+    the archive under another extension reuses that blob (one file per
+    SHA-256, the one upload_blobs points to).
+
+    Returns:
+        dict: sha256, ext (of the stored blob), size, stored_size and
+              deduplicated (already stored)
+    """
+    today = (today or date.today()).isoformat()
+    ext = file_extension(file_path)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as raw, open(file_path, 'rb') as src:
+            # mtime=0 keeps the compressed bytes a pure function of the content
+            sink = (nullcontext(raw) if ext in COMPRESSED_EXTENSIONS
+                    else gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0))
+            with sink as out:
+                while chunk := src.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+        sha256 = digest.hexdigest()
+        row = conn.execute('SELECT ext FROM upload_blobs WHERE sha256 = ?', (sha256,)).fetchone()
+        if row is not None and blob_path(folder, sha256, row[0]).exists():
+            ext = row[0]
+        target = blob_path(folder, sha256, ext)
+        deduplicated = target.exists()
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    stored_size = target.stat().st_size
+    conn.execute('''
+        INSERT INTO upload_blobs (sha256, ext, size, stored_size, created_date, last_used_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (sha256) DO UPDATE SET
+            ext = excluded.ext, stored_size = excluded.stored_size, last_used_date = excluded.last_used_date
+    ''', (sha256, ext, size, stored_size, today, today))
+
+    return {'sha256': sha256, 'ext': ext, 'size': size,
+            'stored_size': stored_size, 'deduplicated': deduplicated}
+
+
+def link_upload(conn, upload_date, files):
+    """Record the files of an upload day (replaces the day's previous links,
+    like upload_log's INSERT OR REPLACE on a forced re-upload)
+
+    Args:
+        files (list): (original_name, sha256) pairs
+    """
+    conn.execute('DELETE FROM upload_files WHERE upload_date = ?', (upload_date,))
+    conn.executemany(
+        'INSERT INTO upload_files (upload_date, original_name, sha256) VALUES (?, ?, ?)',
+        [(upload_date, name, sha256) for name, sha256 in files])
+
+
+def prune(conn, folder, retention_days=DEFAULT_RETENTION_DAYS,
+          budget_bytes=DEFAULT_BUDGET_BYTES, today=None):
+    """Delete expired blobs, then least recently used ones while over budget
+
+    Only the rows are deleted here; remove the returned `paths` with
+    remove_files() once the transaction has committed.
+
+    Returns:
+        dict: removed (blobs), freed_bytes and paths
+    """
+    today = today or date.today()
+    cutoff = (today - timedelta(days=retention_days)).isoformat()
+
+    expired = conn.execute(
+        'SELECT sha256, ext, stored_size FROM upload_blobs WHERE last_used_date < ?', (cutoff,)
+    ).fetchall()
+    doomed = [tuple(row) for row in expired]
+
+    total = conn.execute(
+        'SELECT COALESCE(SUM(stored_size), 0) FROM upload_blobs WHERE last_used_date >= ?', (cutoff,)
+    ).fetchone()[0]
+    if total > budget_bytes:
+        for row in conn.execute('''
+            SELECT sha256, ext, stored_size FROM upload_blobs
+            WHERE last_used_date >= ?
+            ORDER BY last_used_date, created_date
+        ''', (cutoff,)).fetchall():
+            if total <= budget_bytes:
+                break
+            doomed.append(tuple(row))
+            total -= row[2]
+
+    conn.executemany('DELETE FROM upload_blobs WHERE sha256 = ?', [(row[0],) for row in doomed])
+    return {
+        'removed': len(doomed),
+        'freed_bytes': sum(row[2] for row in doomed),
+        'paths': [str(blob_path(folder, sha256, ext)) for sha256, ext, _ in doomed],
+    }
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def extract_blob(folder, sha256, ext, dest_dir, name=None):
+    """Restore a stored blob's original bytes into dest_dir; returns the extracted path"""
+    dest = Path(dest_dir) / (name or f'{sha256}{ext}')
+    path = blob_path(folder, sha256, ext)
+    opener = gzip.open if path.name.endswith(f'{ext}.gz') else open
+    with opener(path, 'rb') as src, open(dest, 'wb') as out:
+        shutil.copyfileobj(src, out, CHUNK_SIZE)
+    return dest
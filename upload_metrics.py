@@ -0,0 +1,227 @@
+"""Wall time and peak memory of each ingest stage, per upload
+
+Every upload records how long each stage of the pipeline took and the peak
+memory it traced (tracemalloc, above what was allocated when the stage
+started):
+
+    read      parse the workbooks (read_sheets)
+    validate  check the layout, keep rows below MAP, merge and dedupe files
+    separate  split included and excluded sellers
+    sync      update the tracker and upload_log
+    archive   store the workbooks in the upload archive, retention pass
+    respond   build, serialize and compress the dashboard response
+
+Several workbooks are parsed in worker processes at once: their read and
+validate stages report the slowest worker's wall time and the sum of the
+workers' peaks.
+
+Memory is only traced with UPLOAD_TRACE_MEMORY (MAP_UPLOAD_TRACE_MEMORY=1):
+tracemalloc makes allocation-heavy code (openpyxl parsing) a few times slower,
+so by default only wall times are recorded. Tracing is process-wide, so
+uploads running at once in one process share their peaks.
+"""
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+STAGES = ('read', 'validate', 'separate', 'sync', 'archive', 'respond')
+
+# Uploads tracing in this process; tracing stops with the last one (unless it
+# was already on before, e.g. python -X tracemalloc)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+class StageMetrics:
+    """Collect {stage: {'wall_ms', 'peak_bytes'}} for one upload
+
+    A stage entered twice accumulates its wall time and keeps the larger peak.
+    Call close() when the upload is done (stops tracing).
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._closed = not trace_memory
+        if trace_memory:
+            _start_tracing()
+
+    @contextmanager
+    def stage(self, name):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            peak = tracemalloc.get_traced_memory()[1] - base if tracing else None
+            self.add(name, wall_ms, peak)
+
+    def add(self, name, wall_ms, peak_bytes):
+        entry = self.stages.setdefault(name, {'wall_ms': 0.0, 'peak_bytes': None})
+        entry['wall_ms'] = round(entry['wall_ms'] + wall_ms, 2)
+        if peak_bytes is not None:
+            entry['peak_bytes'] = max(entry['peak_bytes'] or 0, peak_bytes)
+
+    def merge_parallel(self, runs, elapsed_ms=None):
+        """Add stages measured in worker processes that ran at the same time
+
+        Args:
+            runs (list): One stages dict per worker
+            elapsed_ms (float): Wall time of the whole pool seen by the parent;
+                what the workers did not measure (pool start-up, returning the
+                results) is counted in the first stage
+        """
+        merged = {}
+        for name in dict.fromkeys(name for run in runs for name in run):
+            entries = [run[name] for run in runs if name in run]
+            peaks = [entry['peak_bytes'] for entry in entries if entry['peak_bytes'] is not None]
+            merged[name] = (max(entry['wall_ms'] for entry in entries), sum(peaks) if peaks else None)
+        if merged and elapsed_ms is not None:
+            first = next(iter(merged))
+            overhead = max(elapsed_ms - sum(wall_ms for wall_ms, _ in merged.values()), 0)
+            merged[first] = (merged[first][0] + overhead, merged[first][1])
+        for name, (wall_ms, peak_bytes) in merged.items():
+            self.add(name, wall_ms, peak_bytes)
+
+    def totals(self):
+        """Wall time of all stages and the largest stage peak"""
+        peaks = [entry['peak_bytes'] for entry in self.stages.values() if entry['peak_bytes'] is not None]
+        return {'wall_ms': round(sum(entry['wall_ms'] for entry in self.stages.values()), 2),
+                'peak_bytes': max(peaks) if peaks else None}
+
+    def report(self):
+        return {'stages': self.stages, **self.totals()}
+
+    def close(self):
+        """Stop tracing for this upload; safe to call twice"""
+        if not self._closed:
+            self._closed = True
+            _stop_tracing()
+
+
+def measure(metrics, name):
+    """metrics.stage(name), or a no-op context when metrics is None"""
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+def init_upload_metrics_schema(conn):
+    """Create the per-upload and per-stage metrics tables"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS upload_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upload_date TEXT NOT NULL,
+            recorded_at TEXT NOT NULL,
+            filename TEXT,
+            files INTEGER,
+            status TEXT,
+            total_rows INTEGER,
+            violations INTEGER,
+            wall_ms REAL,
+            peak_bytes INTEGER,
+            release TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS upload_stage_metrics (
+            upload_id INTEGER NOT NULL REFERENCES upload_metrics (id),
+            stage TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            wall_ms REAL NOT NULL,
+            peak_bytes INTEGER,
+            PRIMARY KEY (upload_id, stage)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_upload_metrics_date
+        ON upload_metrics (upload_date)
+    ''')
+
+
+def record_upload_metrics(conn, metrics, filename, files, result, release=None, upload_date=None):
+    """Store one upload's stage metrics; returns the upload_metrics id
+
+    Args:
+        metrics (StageMetrics): Measured stages
+        filename (str): Display name of the upload
+        files (int): Workbooks in the upload
+        result (dict): ingest_workbooks() result (status, total_rows, violations)
+        release (str): Deployed release, to compare ingest cost across releases
+    """
+    now = datetime.now()
+    totals = metrics.totals()
+    upload_id = conn.execute('''
+        INSERT INTO upload_metrics
+            (upload_date, recorded_at, filename, files, status, total_rows, violations,
+             wall_ms, peak_bytes, release)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (upload_date or now.date().isoformat(), now.isoformat(timespec='seconds'), filename, files,
+          result.get('status'), result.get('total_rows'), result.get('violations'),
+          totals['wall_ms'], totals['peak_bytes'], release)).lastrowid
+    order = {name: i for i, name in enumerate(STAGES)}
+    conn.executemany('''
+        INSERT INTO upload_stage_metrics (upload_id, stage, position, wall_ms, peak_bytes)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(upload_id, name, order.get(name, len(STAGES)), entry['wall_ms'], entry['peak_bytes'])
+          for name, entry in metrics.stages.items()])
+    return upload_id
+
+
+def recent_upload_metrics(conn, limit=30):
+    """Latest uploads, newest first, each with its stages in pipeline order"""
+    uploads = [dict(row) for row in conn.execute('''
+        SELECT * FROM upload_metrics ORDER BY id DESC LIMIT ?
+    ''', (limit,))]
+    if not uploads:
+        return []
+
+    by_id = {upload['id']: dict(upload, stages={}) for upload in uploads}
+    placeholders = ', '.join('?' * len(by_id))
+    for row in conn.execute(f'''
+        SELECT upload_id, stage, wall_ms, peak_bytes FROM upload_stage_metrics
+        WHERE upload_id IN ({placeholders})
+        ORDER BY upload_id, position
+    ''', list(by_id)):
+        by_id[row['upload_id']]['stages'][row['stage']] = {'wall_ms': row['wall_ms'],
+                                                           'peak_bytes': row['peak_bytes']}
+    return list(by_id.values())
+
+
+def stage_summary(conn, since=None):
+    """Average and worst wall time, worst peak per release and stage (synced uploads)"""
+    rows = conn.execute('''
+        SELECT m.release, s.stage, COUNT(*) AS uploads,
+               ROUND(AVG(s.wall_ms), 2) AS avg_wall_ms, MAX(s.wall_ms) AS max_wall_ms,
+               MAX(s.peak_bytes) AS max_peak_bytes,
+               ROUND(AVG(s.wall_ms * 1000.0 / NULLIF(m.total_rows, 0)), 4) AS avg_ms_per_1k_rows
+        FROM upload_stage_metrics s
+        JOIN upload_metrics m ON m.id = s.upload_id
+        WHERE m.status = 'synced' AND (? IS NULL OR m.upload_date >= ?)
+        GROUP BY m.release, s.stage
+        ORDER BY m.release, MIN(s.position)
+    ''', (since, since)).fetchall()
+    return [dict(row) for row in rows]
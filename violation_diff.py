@@ -0,0 +1,249 @@
+"""Upload-to-upload diff of the violation set
+
+The tracker sync used to walk the incoming Excel row by row (one SELECT plus
+one UPDATE/INSERT per row, rewriting every column every day) and only printed
+aggregate counts. compute_diff() instead merges the incoming frame with the
+tracker snapshot in one pandas outer merge and classifies every seller/SKU:
+
+    new            not in the tracker yet
+    reactivated    in the tracker as RESOLVED, back in today's file
+    price_changed  ACTIVE, price or MAP differs from the tracker
+    persisting     ACTIVE, same price (description/link may still differ)
+    resolved       ACTIVE in the tracker, missing from today's file
+
+apply_diff() turns the classes into bulk writes: only new, reactivated,
+changed and resolved rows are written individually; last_seen_date and
+days_active of everything still active are set with one UPDATE. Those two
+columns change for every active row on a new day, so that statement writes
+the whole active set once a day (a same-day re-upload writes none of it).
+record_diff() keeps the non-persisting rows per upload day for the diff report.
+"""
+import json
+from datetime import datetime
+
+CHANGES = ('new', 'reactivated', 'price_changed', 'persisting', 'resolved')
+
+# Classes stored row by row for the report (persisting rows are only counted)
+RECORDED_CHANGES = ('new', 'reactivated', 'price_changed', 'resolved')
+
+_SNAPSHOT_QUERY = '''
+    SELECT id, seller_name, sku, status, current_price, map_price, product_description, seller_link
+    FROM violations
+'''
+
+_INCOMING_COLUMNS = ['seller_name', 'sku', 'new_price', 'new_map_price', 'new_description', 'new_link']
+
+
+def init_diff_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS upload_diff_runs (
+            upload_date TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            summary TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS upload_diffs (
+            upload_date TEXT NOT NULL,
+            change TEXT NOT NULL,
+            seller_name TEXT NOT NULL,
+            sku TEXT NOT NULL,
+            old_price REAL,
+            new_price REAL,
+            map_price REAL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_upload_diffs_date ON upload_diffs (upload_date, change)')
+
+
+def load_snapshot(conn):
+    """Current tracker rows (every status) as a DataFrame"""
+    import pandas as pd
+    return pd.read_sql_query(_SNAPSHOT_QUERY, conn)
+
+
+def _incoming_frame(violations_df):
+    """Normalize the Excel frame to tracker names and types
+
+    seller/SKU are compared as text, the way SQLite's TEXT affinity stored them.
+    Duplicated seller/SKU rows keep the last one (as the row-by-row sync did).
+    """
+    import pandas as pd
+
+    if violations_df.empty:
+        return pd.DataFrame(columns=_INCOMING_COLUMNS)
+
+    links = violations_df['seller_links'] if 'seller_links' in violations_df else ''
+    frame = pd.DataFrame({
+        'seller_name': violations_df['sellers'].map(str),
+        'sku': violations_df['SAP Material'].map(str),
+        'new_price': violations_df['prices'].astype(float),
+        'new_map_price': violations_df['U.S. MAP'].astype(float),
+        'new_description': violations_df['Description'],
+        'new_link': links,
+    })
+    return frame.drop_duplicates(['seller_name', 'sku'], keep='last')
+
+
+def incoming_keys(violations_df):
+    """(seller_name, sku) pairs of the Excel frame, normalized like the diff"""
+    frame = _incoming_frame(violations_df)
+    return list(zip(frame['seller_name'], frame['sku']))
+
+
+def compute_diff(violations_df, snapshot):
+    """Classify every seller/SKU of today's file against the tracker snapshot
+
+    Args:
+        violations_df (DataFrame): Included violations (Excel column names)
+        snapshot (DataFrame): load_snapshot() result
+
+    Returns:
+        DataFrame: One row per classified seller/SKU with `change`, the tracker
+                   id (NaN for new rows), old and new values, and `rewrite`
+                   (row content must be written)
+    """
+    import numpy as np
+
+    incoming = _incoming_frame(violations_df)
+    merged = incoming.merge(snapshot, on=['seller_name', 'sku'], how='outer', indicator=True)
+
+    in_file = merged['_merge'] != 'right_only'
+    in_tracker = merged['_merge'] != 'left_only'
+    both = in_file & in_tracker
+    active = merged['status'] == 'ACTIVE'
+
+    # Empty frames come back with object columns
+    prices = merged[['new_price', 'current_price', 'new_map_price', 'map_price']].astype(float)
+    same_price = (np.isclose(prices['new_price'], prices['current_price'])
+                  & np.isclose(prices['new_map_price'], prices['map_price']))
+    same_text = ((merged['new_description'].fillna('') == merged['product_description'].fillna(''))
+                 & (merged['new_link'].fillna('') == merged['seller_link'].fillna('')))
+
+    merged['change'] = np.select(
+        [~in_tracker, both & ~active, both & ~same_price, both, ~in_file & active],
+        ['new', 'reactivated', 'price_changed', 'persisting', 'resolved'],
+        default='',
+    )
+    merged['rewrite'] = both & ~(same_price & same_text)
+
+    diff = merged[merged['change'] != ''].drop(columns='_merge')
+    return diff.reset_index(drop=True)
+
+
+def _none_if_nan(values):
+    """Python objects with NaN turned into None (NULL for sqlite3)"""
+    import pandas as pd
+    return [None if pd.isna(value) else value for value in values]
+
+
+def apply_diff(conn, diff, today):
+    """Write a diff to the tracker inside the caller's transaction
+
+    Returns:
+        dict: Row count per change class
+    """
+    today_iso = today.isoformat()
+    change = diff['change']
+
+    new = diff[change == 'new']
+    conn.executemany('''
+        INSERT INTO violations
+        (seller_name, sku, product_description, current_price, map_price,
+         first_detected_date, last_seen_date, days_active, status,
+         seller_link, pending_approval)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 0, 'ACTIVE', ?, 0)
+    ''', zip(new['seller_name'], new['sku'], _none_if_nan(new['new_description']),
+             _none_if_nan(new['new_price']), _none_if_nan(new['new_map_price']),
+             [today_iso] * len(new), [today_iso] * len(new), _none_if_nan(new['new_link'])))
+
+    resolved = diff[change == 'resolved']
+    conn.executemany("UPDATE violations SET status = 'RESOLVED' WHERE id = ?",
+                     ((int(vid),) for vid in resolved['id']))
+
+    reactivated = diff[change == 'reactivated']
+    conn.executemany("UPDATE violations SET status = 'ACTIVE' WHERE id = ?",
+                     ((int(vid),) for vid in reactivated['id']))
+
+    # Only rows whose content differs are rewritten (unchanged text also
+    # leaves the full-text index alone)
+    rewrite = diff[diff['rewrite']]
+    conn.executemany('''
+        UPDATE violations
+        SET current_price = ?, map_price = ?, product_description = ?, seller_link = ?
+        WHERE id = ?
+    ''', zip(_none_if_nan(rewrite['new_price']), _none_if_nan(rewrite['new_map_price']),
+             _none_if_nan(rewrite['new_description']), _none_if_nan(rewrite['new_link']),
+             (int(vid) for vid in rewrite['id'])))
+
+    # The ACTIVE set now is exactly today's file: age it in one statement
+    # (rows already aged today are left alone)
+    conn.execute('''
+        UPDATE violations
+        SET last_seen_date = ?,
+            days_active = CAST(julianday(?) - julianday(first_detected_date) AS INTEGER)
+        WHERE status = 'ACTIVE'
+          AND (last_seen_date IS NOT ?
+               OR days_active IS NOT CAST(julianday(?) - julianday(first_detected_date) AS INTEGER))
+    ''', (today_iso, today_iso, today_iso, today_iso))
+
+    counts = change.value_counts()
+    return {name: int(counts.get(name, 0)) for name in CHANGES}
+
+
+def record_diff(conn, upload_date, diff, counts):
+    """Store the day's diff (replaces an earlier diff of the same day)"""
+    recorded = diff[diff['change'].isin(RECORDED_CHANGES)]
+    resolved_sellers = set(diff.loc[diff['change'] == 'resolved', 'seller_name'])
+    still_active = set(diff.loc[diff['change'] != 'resolved', 'seller_name'])
+
+    summary = {
+        'counts': counts,
+        # Sellers that had violations and have none in today's file
+        'cleaned_sellers': sorted(resolved_sellers - still_active),
+    }
+
+    conn.execute('DELETE FROM upload_diffs WHERE upload_date = ?', (upload_date,))
+    conn.executemany('''
+        INSERT INTO upload_diffs (upload_date, change, seller_name, sku, old_price, new_price, map_price)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', zip([upload_date] * len(recorded), recorded['change'], recorded['seller_name'], recorded['sku'],
+             _none_if_nan(recorded['current_price']), _none_if_nan(recorded['new_price']),
+             _none_if_nan(recorded['new_map_price'].fillna(recorded['map_price']))))
+    conn.execute('''
+        INSERT OR REPLACE INTO upload_diff_runs (upload_date, created_at, summary) VALUES (?, ?, ?)
+    ''', (upload_date, datetime.now().isoformat(timespec='seconds'), json.dumps(summary)))
+
+
+def diff_report(conn, upload_date=None):
+    """Stored diff of one upload day (latest by default), or None if there is none"""
+    if upload_date is None:
+        row = conn.execute('SELECT upload_date FROM upload_diff_runs ORDER BY upload_date DESC LIMIT 1').fetchone()
+        if row is None:
+            return None
+        upload_date = row[0]
+
+    run = conn.execute('SELECT created_at, summary FROM upload_diff_runs WHERE upload_date = ?',
+                       (upload_date,)).fetchone()
+    if run is None:
+        return None
+
+    changes = {name: [] for name in RECORDED_CHANGES}
+    for change, seller, sku, old_price, new_price, map_price in conn.execute('''
+        SELECT change, seller_name, sku, old_price, new_price, map_price FROM upload_diffs
+        WHERE upload_date = ?
+        ORDER BY seller_name, sku
+    ''', (upload_date,)):
+        changes[change].append({
+            'seller_name': seller, 'sku': sku,
+            'old_price': old_price, 'new_price': new_price, 'map_price': map_price,
+        })
+
+    summary = json.loads(run[1])
+    return {
+        'upload_date': upload_date,
+        'created_at': run[0],
+        'counts': summary['counts'],
+        'cleaned_sellers': summary['cleaned_sellers'],
+        'changes': changes,
+    }
@@ -0,0 +1,321 @@
+"""In-process read-through cache of ACTIVE violations
+
+Read endpoints used to re-query SQLite and turn every sqlite3.Row into a new
+dict, building the same seller grouping several times per request. The store
+keeps the active set in memory as compact __slots__ records, indexed by
+seller and by day bucket, and is kept current by the write paths:
+
+- a full tracker sync calls invalidate() (reload on next read)
+- single-seller / single-violation actions call refresh_sellers() or
+  refresh_ids(), which re-read only the affected sellers
+
+Every change bumps `version`, which callers can use as a cache key / ETag.
+Indexes are replaced copy-on-write, so readers never see a half-updated view.
+Per-seller summaries (summarize_seller) are kept with the records they were
+computed from, so after a refresh only the re-read sellers are summarized
+again and the seller list costs O(sellers), not O(violations).
+
+Several worker processes each hold their own store. Coherence between them
+goes through the `data_version` stamp in the app_meta table, which every
+write transaction increments: reads compare it with the stamp the store was
+loaded at and reload on mismatch, and a local refresh only patches in place
+when the stamp moved by exactly this process's own write.
+"""
+import sqlite3
+import sys
+import threading
+
+# Columns cached per violation (same order as the SELECT below)
+COLUMNS = (
+    'id', 'seller_name', 'sku', 'product_description', 'current_price', 'map_price',
+    'first_detected_date', 'last_seen_date', 'days_active', 'status', 'seller_link',
+    'pending_approval', 'first_email_sent_date', 'second_email_sent_date', 'dns_added_date',
+    'severity',
+)
+
+# Highly repeated string values are interned so records share one copy
+_INTERNED = ('seller_name', 'first_detected_date', 'last_seen_date', 'status',
+             'first_email_sent_date', 'second_email_sent_date', 'dns_added_date')
+_INTERNED_POSITIONS = tuple(COLUMNS.index(name) for name in _INTERNED)
+
+_SELECT_ACTIVE = f'''
+    SELECT {', '.join(COLUMNS)} FROM violations
+    WHERE status = 'ACTIVE'{{where}}
+    ORDER BY seller_name, days_active DESC, sku
+'''
+
+_SELECT_DATA_VERSION = "SELECT value FROM app_meta WHERE key = 'data_version'"
+
+DAY_BUCKETS = (0, 1, 2)  # DAY_1, DAY_2, DAY_3+
+
+
+class ViolationRecord:
+    """One ACTIVE violation; supports v['field'] / v.get() like the old row dicts"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, row):
+        values = list(row)
+        for i in _INTERNED_POSITIONS:
+            if isinstance(values[i], str):
+                values[i] = sys.intern(values[i])
+        for name, value in zip(COLUMNS, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return COLUMNS
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    @property
+    def day_bucket(self):
+        """0 = DAY_1, 1 = DAY_2, 2 = DAY_3+"""
+        return min(self.days_active or 0, 2)
+
+
+class ViolationStore:
+    """Cache of the ACTIVE violation set for one database"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.version = 0
+        self.data_version = None  # shared stamp the cached data corresponds to
+        self._lock = threading.Lock()
+        self._local = threading.local()  # per-thread connection for stamp checks and id lookups
+        self._loaded = False
+        self._by_seller = {}   # seller_name -> tuple of records (sorted by days desc, sku)
+        self._by_id = {}       # id -> record
+        self._by_day = None    # day bucket -> tuple of records, built on demand
+        self._summaries = {}   # seller_name -> (records, summarize_seller(records))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def grouped(self):
+        """Active violations grouped by seller (ordered by seller name)"""
+        self._ensure_loaded()
+        return self._by_seller
+
+    def seller(self, seller_name):
+        """Active violations of one seller (empty tuple if none)"""
+        self._ensure_loaded()
+        return self._by_seller.get(seller_name, ())
+
+    def by_day(self, bucket):
+        """Active violations in one day bucket (0 = DAY_1, 1 = DAY_2, 2 = DAY_3+)"""
+        self._ensure_loaded()
+        by_day = self._by_day
+        if by_day is None:
+            buckets = {day: [] for day in DAY_BUCKETS}
+            for records in self._by_seller.values():
+                for record in records:
+                    buckets[record.day_bucket].append(record)
+            by_day = self._by_day = {day: tuple(records) for day, records in buckets.items()}
+        return by_day[bucket]
+
+    def summaries(self):
+        """summarize_seller() of every seller with active violations (ordered by seller name)"""
+        self._ensure_loaded()
+        cached = self._summaries
+        fresh = {}
+        for name, records in self._by_seller.items():
+            entry = cached.get(name)
+            # Records tuples are replaced whenever a seller is re-read
+            fresh[name] = entry if entry is not None and entry[0] is records else (records, summarize_seller(records))
+        self._summaries = fresh
+        return {name: summary for name, (_, summary) in fresh.items()}
+
+    def get(self, violation_id):
+        self._ensure_loaded()
+        return self._by_id.get(violation_id)
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._by_id)
+
+    # ------------------------------------------------------------------
+    # Write notifications
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """Drop everything; the next read reloads the active set"""
+        with self._lock:
+            self._loaded = False
+            self.version += 1
+
+    def refresh_sellers(self, seller_names, data_version=None):
+        """Re-read the given sellers after a write that only touched them
+
+        data_version is the stamp the write committed; if anything else was
+        written since the store was loaded, everything is reloaded instead.
+        """
+        seller_names = {name for name in seller_names if name is not None}
+        if not seller_names:
+            return
+        with self._lock:
+            if not self._loaded:
+                self.version += 1
+                return
+            placeholders = ', '.join('?' * len(seller_names))
+            rows, current = self._fetch(f' AND seller_name IN ({placeholders})', tuple(seller_names))
+            # Patch in place only if this write is the sole change since the last read
+            if data_version is None:
+                stale = current != self.data_version
+            else:
+                stale = current != data_version or self.data_version != data_version - 1
+            if stale:
+                self._loaded = False
+                self.version += 1
+                return
+
+            fresh = _group(rows)
+            by_seller = {name: records for name, records in self._by_seller.items()
+                         if name not in seller_names}
+            by_seller.update(fresh)
+            by_id = {vid: record for vid, record in self._by_id.items()
+                     if record.seller_name not in seller_names}
+            for records in fresh.values():
+                for record in records:
+                    by_id[record.id] = record
+
+            self._publish(dict(sorted(by_seller.items())), by_id)
+            self.data_version = current
+
+    def refresh_ids(self, violation_ids, sellers=(), data_version=None):
+        """Re-read the sellers owning the given violations (also handles deletes)
+
+        Extra seller names can be passed so a mixed batch is refreshed in one go.
+        """
+        violation_ids = [vid for vid in violation_ids if vid is not None]
+        sellers = set(sellers)
+        if not violation_ids:
+            self.refresh_sellers(sellers, data_version)
+            return
+        # Indexes are replaced, never mutated: one reference is a consistent view
+        # even while another thread (re)loads
+        by_id = self._by_id
+        sellers.update(by_id[vid].seller_name for vid in violation_ids if vid in by_id)
+        placeholders = ', '.join('?' * len(violation_ids))
+        sellers.update(row[0] for row in self._connection().execute(
+            f'SELECT seller_name FROM violations WHERE id IN ({placeholders})', violation_ids))
+        self.refresh_sellers(sellers, data_version)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._loaded and self._stamp_unchanged():
+            return
+        with self._lock:
+            if self._loaded and self._stamp_unchanged():
+                return
+            rows, current = self._fetch('', ())
+            by_seller = _group(rows)
+            by_id = {record.id: record for records in by_seller.values() for record in records}
+            self._publish(by_seller, by_id)
+            self.data_version = current
+            self._loaded = True
+
+    def _connection(self):
+        """This thread's connection for stamp checks and id lookups"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path)
+        return conn
+
+    def _stamp_unchanged(self):
+        """True if no process has written since the cached data was read"""
+        return _read_data_version(self._connection()) == self.data_version
+
+    def _publish(self, by_seller, by_id):
+        self._by_seller = by_seller
+        self._by_id = by_id
+        self._by_day = None
+        self.version += 1
+
+    def _fetch(self, where, params):
+        """Rows and the data version they belong to, read in one snapshot"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            conn.execute('BEGIN')
+            rows = conn.execute(_SELECT_ACTIVE.format(where=where), params).fetchall()
+            current = _read_data_version(conn)
+            conn.execute('COMMIT')
+            return rows, current
+        finally:
+            conn.close()
+
+
+def _read_data_version(conn):
+    """Shared data version stamp (None on a database without app_meta)"""
+    try:
+        row = conn.execute(_SELECT_DATA_VERSION).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def summarize_seller(records):
+    """Day counts, workflow flags and email dates of one seller's active violations
+
+    Works on ViolationRecords and on plain row dicts alike.
+    """
+    day_counts = [0, 0, 0]
+    day3_pending = day3_in_dns = pending = in_dns = False
+    first_dates, second_dates, dns_dates = [], [], []
+    max_severity = None
+    for v in records:
+        bucket = min(v['days_active'] or 0, 2)
+        day_counts[bucket] += 1
+        is_pending, is_dns = bool(v['pending_approval']), v['dns_added_date'] is not None
+        pending |= is_pending
+        in_dns |= is_dns
+        if bucket == 2:
+            day3_pending |= is_pending
+            day3_in_dns |= is_dns
+        if v['first_email_sent_date'] is not None:
+            first_dates.append(v['first_email_sent_date'])
+        if v['second_email_sent_date'] is not None:
+            second_dates.append(v['second_email_sent_date'])
+        if is_dns:
+            dns_dates.append(v['dns_added_date'])
+        if v['severity'] is not None and (max_severity is None or v['severity'] > max_severity):
+            max_severity = v['severity']
+
+    return {
+        'product_count': sum(day_counts),
+        'day_1_count': day_counts[0],
+        'day_2_count': day_counts[1],
+        'day_3_count': day_counts[2],
+        'day_3_pending': day3_pending,
+        'day_3_in_dns': day3_in_dns,
+        'pending_approval': pending,
+        'in_dns': in_dns,
+        'first_emails_sent': len(first_dates),
+        'second_emails_sent': len(second_dates),
+        'first_email_date': max(first_dates, default=None),
+        'second_email_date': max(second_dates, default=None),
+        'dns_added_date': max(dns_dates, default=None),
+        'max_severity': max_severity,
+    }
+
+
+def _group(rows):
+    """Group rows (already ordered by seller) into seller -> tuple of records"""
+    grouped = {}
+    for row in rows:
+        record = ViolationRecord(row)
+        grouped.setdefault(record.seller_name, []).append(record)
+    return {seller: tuple(records) for seller, records in grouped.items()}
@@ -0,0 +1,19 @@
+"""Production WSGI entry point
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker imports this module, builds its own app and runs the schema
+migration; init_database() serializes that behind a file lock, so concurrent
+worker start-up is safe. Paths can be overridden with MAP_DB_PATH,
+MAP_UPLOAD_FOLDER and MAP_OUTPUT_FOLDER.
+"""
+import os
+
+from app_flask import create_app, init_database
+
+config = {key: os.environ[f'MAP_{key}']
+          for key in ('DB_PATH', 'UPLOAD_FOLDER', 'OUTPUT_FOLDER')
+          if f'MAP_{key}' in os.environ}
+
+app = create_app(config)
+init_database(app.config['DB_PATH'])